@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Structured answer parser against the line-scanning step extractor it replaced.
+
+Usage (from backend/):
+    python benchmarks/bench_answer_parser.py [--runs 200] [--chunk-size 16] [--repeat 1,8]
+
+For every response in answer_corpus/ (and the whole corpus concatenated
+`--repeat` times, standing in for long answers) two timings are compared:
+
+    whole     parse the complete response once
+    stream    the response arrives in --chunk-size pieces and completed steps
+              are emitted as they appear. The old extractor had to re-parse the
+              text received so far on every chunk containing a newline; the
+              parser consumes each chunk once.
+
+Times are the median per response in microseconds.
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.answer_parser import AnswerParser, parse_answer  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "answer_corpus")
+
+
+def legacy_extract_steps(solution_text: str) -> List[str]:
+    """AIService._extract_steps before the structured parser, kept as the baseline"""
+    steps = []
+    lines = solution_text.split('\n')
+    current_step = ""
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if (line.startswith(('Step', 'step', '1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.')) or
+                line.startswith(('•', '-', '*')) or
+                'step' in line.lower()[:10]):
+            if current_step:
+                steps.append(current_step.strip())
+            current_step = line
+        else:
+            if current_step:
+                current_step += " " + line
+            elif line and len(steps) < 6:
+                steps.append(line)
+
+    if current_step:
+        steps.append(current_step.strip())
+
+    if not steps:
+        sentences = [s.strip() for s in solution_text.split('.') if s.strip()]
+        steps = sentences[:6]
+
+    cleaned_steps = []
+    for step in steps[:8]:
+        if len(step) > 10 and step not in cleaned_steps:
+            cleaned_steps.append(step)
+
+    return cleaned_steps if cleaned_steps else ["Solution provided above with detailed explanation"]
+
+
+def legacy_completed_steps(partial_text: str) -> List[str]:
+    complete_lines = partial_text[:partial_text.rfind("\n") + 1]
+    if not complete_lines.strip():
+        return []
+    return legacy_extract_steps(complete_lines)[:-1]
+
+
+def legacy_stream(text: str, chunk_size: int):
+    chunks, emitted = [], 0
+    for start in range(0, len(text), chunk_size):
+        chunk = text[start:start + chunk_size]
+        chunks.append(chunk)
+        if "\n" in chunk:
+            emitted = max(emitted, len(legacy_completed_steps("".join(chunks))))
+    return legacy_extract_steps("".join(chunks))
+
+
+def parser_stream(text: str, chunk_size: int):
+    parser = AnswerParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    return parser.finish()
+
+
+def median_us(fn: Callable, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200, help="timed runs per measurement")
+    parser.add_argument("--chunk-size", type=int, default=16, help="characters per streamed chunk")
+    parser.add_argument("--repeat", default="1,8", help="comma separated sizes of the concatenated-corpus response")
+    args = parser.parse_args()
+
+    responses = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md"))):
+        with open(path, encoding="utf-8") as handle:
+            responses.append((os.path.basename(path)[:-3], handle.read()))
+    corpus_text = "\n\n".join(text for _, text in responses)
+    for repeat in (int(n) for n in args.repeat.split(",") if n):
+        responses.append((f"corpus x{repeat}", "\n\n".join([corpus_text] * repeat)))
+
+    print(
+        f"{'response':<42}{'chars':>7}{'legacy':>10}{'parser':>10}{'speedup':>9}"
+        f"{'legacy strm':>13}{'parser strm':>13}{'speedup':>9}"
+    )
+    for name, text in responses:
+        legacy_whole = median_us(lambda: legacy_extract_steps(text), args.runs)
+        parser_whole = median_us(lambda: parse_answer(text), args.runs)
+        legacy_streamed = median_us(lambda: legacy_stream(text, args.chunk_size), args.runs)
+        parser_streamed = median_us(lambda: parser_stream(text, args.chunk_size), args.runs)
+        print(
+            f"{name:<42}{len(text):>7}{legacy_whole:>10.1f}{parser_whole:>10.1f}{legacy_whole / parser_whole:>8.2f}x"
+            f"{legacy_streamed:>13.1f}{parser_streamed:>13.1f}{legacy_streamed / parser_streamed:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+OCR accuracy vs latency vs upload bytes for ImageNormalizer settings.
+
+Usage (from backend/):
+    python benchmarks/bench_image_normalization.py [--runs 3]
+
+Renders a worksheet as a 12 MP phone photo (JPEG, stored sideways with an
+EXIF orientation tag) and runs it through ImageNormalizer + OCRService for a
+range of IMAGE_OCR_MAX_PIXELS values. Normalize time covers decoding and
+building the LLM copy. Word accuracy is the share of ground
+truth words found in the OCR output.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ocr_corpus import load_font, word_accuracy  # noqa: E402
+from services.image_normalizer import ImageNormalizer  # noqa: E402
+from services.ocr_service import OCRService  # noqa: E402
+
+GROUND_TRUTH = [
+    "Exercise 4.2",
+    "1. Solve for x: 3x + 7 = 22",
+    "2. Find the area of a circle with radius 14 cm",
+    "3. A car travels 150 km in 3 hours. Find its speed",
+    "4. Simplify (2a + 3b) - (a - 4b)",
+    "5. Factorise x^2 + 5x + 6",
+]
+
+MAX_PIXEL_SETTINGS = [0, 8_000_000, 4_000_000, 2_000_000, 1_000_000]
+
+
+def render_phone_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """Worksheet photo with sensor noise, stored rotated with EXIF orientation 6"""
+    font = load_font(96)
+
+    page = Image.new("RGB", (width, height), color=(236, 232, 224))
+    draw = ImageDraw.Draw(page)
+    for i, line in enumerate(GROUND_TRUTH):
+        draw.text((220, 260 + 300 * i), line, fill=(30, 30, 40), font=font)
+
+    rng = np.random.default_rng(7)
+    pixels = np.asarray(page, dtype=np.int16) + rng.normal(0, 8, (height, width, 3)).astype(np.int16)
+    page = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    # Sensor data is stored landscape-rotated; orientation 6 tells viewers to rotate it back
+    stored = page.transpose(Image.ROTATE_90)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    stored.save(buffer, format="JPEG", quality=92, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per setting")
+    args = parser.parse_args()
+
+    photo = render_phone_photo()
+    ocr_service = OCRService()
+    print(f"input: {len(photo) / 1024:.0f} KiB JPEG, backend {ocr_service.backend.name}\n")
+    print(f"{'max pixels':>11}{'ocr size':>12}{'normalize ms':>14}{'ocr ms':>9}{'accuracy':>10}{'llm KiB':>9}")
+
+    for max_pixels in MAX_PIXEL_SETTINGS:
+        normalizer = ImageNormalizer()
+        normalizer.ocr_max_pixels = max_pixels
+
+        normalize_ms, ocr_ms = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            image = normalizer.load(photo)
+            image.llm_bytes
+            normalize_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            result = ocr_service.extract_text_from_image(image.array)
+            ocr_ms.append((time.perf_counter() - start) * 1000)
+
+        info = image.info()
+        size = f"{info['ocr_size'][0]}x{info['ocr_size'][1]}"
+        print(
+            f"{max_pixels or 'off':>11}{size:>12}{statistics.median(normalize_ms):>14.0f}"
+            f"{statistics.median(ocr_ms):>9.0f}{word_accuracy(result['extracted_text'], ' '.join(GROUND_TRUTH)):>10.2f}"
+            f"{info['llm_bytes'] / 1024:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
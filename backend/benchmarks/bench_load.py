@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Load test for the /api/questions endpoints of a running backend.
+
+Usage (from backend/):
+    LLM_BACKEND=fake uvicorn server:app --port 8001 --workers 4   # no Gemini quota used
+    python benchmarks/bench_load.py [--base-url http://localhost:8001] [--endpoint text]
+                                    [--requests 2000] [--concurrency 200] [--distinct 500]
+                                    [--image page.png] [--bypass-cache]
+
+Registers a throwaway user, then keeps --concurrency requests in flight until
+--requests have completed. Questions are drawn from --distinct variants
+mixing bare arithmetic and proofs, so the answer cache and every model tier
+see traffic; --bypass-cache sends every text question to the model.
+
+    text          POST /api/questions/text
+    text-stream   POST /api/questions/text/stream; also reports time to the
+                  first token event
+    image         POST /api/questions/image with --image as the upload
+    image-stream  POST /api/questions/image/stream
+
+Start the server with the fake backend's knobs (FAKE_LLM_LATENCY_MS,
+FAKE_LLM_ERROR_RATE, FAKE_LLM_RATE_LIMIT_RATE, FAKE_LLM_HANG_RATE, see
+services/llm_backend.py) to see how deadlines, the breaker and the
+scheduler behave under load. The server's /api/metrics are printed at the end
+(unless METRICS_ALLOWED_EMAILS on the server leaves out the throwaway user).
+"""
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+import aiohttp
+
+QUESTIONS = [
+    "What is {a} * {b}?",
+    "Solve {a}x + {b} = {c}",
+    "A train travels {a} km in {b} hours. What is its average speed?",
+    "Prove that the sum of the first {a} odd numbers is {a}^2 using induction",
+    "Find the derivative of x^{a} + {b}x and the integral of {c}x dx",
+]
+
+
+def make_question(index: int) -> str:
+    rng = random.Random(index)
+    template = QUESTIONS[index % len(QUESTIONS)]
+    return template.format(a=rng.randint(2, 99), b=rng.randint(2, 99), c=rng.randint(100, 999))
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.api = args.base_url.rstrip("/") + "/api"
+        self.headers: Dict[str, str] = {}
+        self.image: Optional[bytes] = None
+        if args.endpoint.startswith("image"):
+            with open(args.image, "rb") as handle:
+                self.image = handle.read()
+        self.latencies: List[float] = []
+        self.first_tokens: List[float] = []
+        self.outcomes: Counter = Counter()
+
+    async def login(self, session: aiohttp.ClientSession):
+        user = {"name": "Load Test", "email": f"load-{uuid.uuid4().hex[:12]}@example.com", "password": "load-test-password"}
+        async with session.post(f"{self.api}/auth/register", json=user) as response:
+            response.raise_for_status()
+            self.headers = {"Authorization": f"Bearer {(await response.json())['access_token']}"}
+
+    async def request(self, session: aiohttp.ClientSession, index: int):
+        question = make_question(index % self.args.distinct)
+        endpoint = self.args.endpoint
+        path = "/questions/" + endpoint.replace("-", "/")
+        if endpoint.startswith("image"):
+            data = aiohttp.FormData()
+            content_type = mimetypes.guess_type(self.args.image)[0] or "image/png"
+            data.add_field("file", self.image, filename=os.path.basename(self.args.image), content_type=content_type)
+            data.add_field("question", question)
+            data.add_field("subject", "mathematics")
+            kwargs = {"data": data}
+        else:
+            kwargs = {"json": {"question": question, "subject": "mathematics", "bypass_cache": self.args.bypass_cache}}
+
+        started = time.perf_counter()
+        try:
+            async with session.post(self.api + path, headers=self.headers, **kwargs) as response:
+                if response.status != 200:
+                    await response.read()
+                    self.outcomes[f"http {response.status}"] += 1
+                    return
+                if endpoint.endswith("stream"):
+                    outcome = await self.read_stream(response, started)
+                else:
+                    outcome = (await response.json()).get("status", "ok")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.outcomes[type(e).__name__] += 1
+            return
+        self.latencies.append(time.perf_counter() - started)
+        self.outcomes[outcome] += 1
+
+    async def read_stream(self, response: aiohttp.ClientResponse, started: float) -> str:
+        """Read Server-Sent Events to the end; the outcome is the last event's name"""
+        event = "none"
+        first_token = None
+        async for line in response.content:
+            line = line.decode("utf-8").strip()
+            if not line.startswith("event:"):
+                continue
+            event = line[len("event:"):].strip()
+            if event == "token" and first_token is None:
+                first_token = time.perf_counter() - started
+        if first_token is not None:
+            self.first_tokens.append(first_token)
+        return event
+
+    async def run(self):
+        timeout = aiohttp.ClientTimeout(total=self.args.timeout)
+        connector = aiohttp.TCPConnector(limit=self.args.concurrency)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await self.login(session)
+            next_index = iter(range(self.args.requests))
+
+            async def worker():
+                for index in next_index:
+                    await self.request(session, index)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+            async with session.get(f"{self.api}/metrics", headers=self.headers) as response:
+                metrics = await response.json() if response.status == 200 else None
+
+        self.report(elapsed, metrics)
+
+    def report(self, elapsed: float, metrics: Optional[dict]):
+        done = sum(self.outcomes.values())
+        print(f"{done} requests in {elapsed:.1f}s: {done / elapsed:.0f} req/s at concurrency {self.args.concurrency}")
+        for outcome, count in self.outcomes.most_common():
+            print(f"  {outcome:<24}{count:>8}")
+        for name, samples in (("latency", self.latencies), ("first token", self.first_tokens)):
+            if samples:
+                print(
+                    f"{name + ' ms':<16}p50 {percentile(samples, 0.5) * 1000:8.1f}   p90 {percentile(samples, 0.9) * 1000:8.1f}"
+                    f"   p99 {percentile(samples, 0.99) * 1000:8.1f}   mean {statistics.mean(samples) * 1000:8.1f}"
+                )
+        if metrics is not None:
+            print("\n/api/metrics:")
+            print(json.dumps(metrics, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("LOAD_TEST_URL", "http://localhost:8001"))
+    parser.add_argument(
+        "--endpoint", default="text", choices=["text", "text-stream", "image", "image-stream"], help="endpoint to load"
+    )
+    parser.add_argument("--requests", type=int, default=2000, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=200, help="requests kept in flight")
+    parser.add_argument("--distinct", type=int, default=500, help="number of distinct questions")
+    parser.add_argument("--image", help="image to upload for the image endpoints")
+    parser.add_argument("--bypass-cache", action="store_true", help="ask the model even for cached text questions")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout in seconds")
+    args = parser.parse_args()
+    if args.endpoint.startswith("image") and not args.image:
+        parser.error("--image is required for the image endpoints")
+
+    asyncio.run(LoadTest(args).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+OCR speed and quality over the synthetic worksheet corpus.
+
+Usage (from backend/):
+    python benchmarks/bench_ocr.py [--per-category 3] [--runs 1]
+        [--categories typed,noisy] [--methods threshold,enhanced]
+        [--save-corpus /tmp/ocr_corpus] [--json results.json]
+
+Two tables are printed:
+
+    per method    every preprocessing variant run on its own (preprocess + OCR),
+                  grouped by corpus category: median latency, peak Python-side
+                  memory and mean word accuracy
+    pipeline      extract_text_from_base64 end to end per sample, with the method
+                  it picked and the accuracy of the text it returned
+
+Peak memory comes from tracemalloc, which sees numpy/OpenCV buffers but not the
+tesseract process itself. Word accuracy is the share of ground-truth words found
+in the OCR output (see ocr_corpus.word_accuracy). The corpus is seeded, so
+numbers from two checkouts are directly comparable.
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ocr_corpus import CATEGORIES, Sample, build_corpus, save_corpus, word_accuracy  # noqa: E402
+from services.ocr_service import OCRService  # noqa: E402
+
+
+def encode_base64(sample: Sample) -> str:
+    ok, buffer = cv2.imencode(".png", sample.image)
+    return base64.b64encode(buffer.tobytes()).decode("utf-8")
+
+
+def measure(fn: Callable, runs: int) -> Tuple[object, float, int]:
+    """Run `fn` `runs` times; returns (last result, median ms, peak traced bytes)"""
+    timings, peak, result = [], 0, None
+    for _ in range(runs):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    return result, statistics.median(timings), peak
+
+
+def bench_methods(service: OCRService, samples: List[Sample], methods: List[str], runs: int) -> List[Dict]:
+    rows = []
+    for sample in samples:
+        gray = service._convert_to_grayscale(sample.image)
+        for method_name, _, make_image in service._preprocessing_variants(sample.image, gray):
+            if methods and method_name not in methods:
+                continue
+            result, ms, peak = measure(lambda: service._run_variant(method_name, make_image), runs)
+            rows.append({
+                "sample": sample.name,
+                "category": sample.category,
+                "method": method_name,
+                "ms": ms,
+                "peak_bytes": peak,
+                "accuracy": word_accuracy(result["extracted_text"], sample.ground_truth) if result else 0.0,
+                "confidence": result["average_confidence"] if result else 0.0
+            })
+    return rows
+
+
+def bench_pipeline(service: OCRService, samples: List[Sample], runs: int) -> List[Dict]:
+    rows = []
+    for sample in samples:
+        image_base64 = encode_base64(sample)
+        result, ms, peak = measure(lambda: service.extract_text_from_base64(image_base64), runs)
+        rows.append({
+            "sample": sample.name,
+            "category": sample.category,
+            "size": f"{sample.image.shape[1]}x{sample.image.shape[0]}",
+            "picked": result.get("preprocessing_used") or "failed",
+            "methods_completed": result.get("pipeline", {}).get("methods_completed", 0),
+            "ms": ms,
+            "peak_bytes": peak,
+            "accuracy": word_accuracy(result.get("extracted_text", ""), sample.ground_truth),
+            "confidence": result.get("average_confidence", 0)
+        })
+    return rows
+
+
+def print_method_table(rows: List[Dict]):
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["category"], row["method"])].append(row)
+
+    print(f"{'category':<14}{'method':<16}{'median ms':>11}{'peak MiB':>10}{'accuracy':>10}{'conf':>7}")
+    for (category, method), group in groups.items():
+        print(
+            f"{category:<14}{method:<16}{statistics.median(r['ms'] for r in group):>11.1f}"
+            f"{max(r['peak_bytes'] for r in group) / 2 ** 20:>10.1f}"
+            f"{statistics.mean(r['accuracy'] for r in group):>10.2f}"
+            f"{statistics.mean(r['confidence'] for r in group):>7.1f}"
+        )
+
+
+def print_pipeline_table(rows: List[Dict]):
+    print(f"{'sample':<18}{'size':>11}  {'picked':<18}{'tried':>6}{'ms':>9}{'peak MiB':>10}{'accuracy':>10}")
+    for row in rows:
+        print(
+            f"{row['sample']:<18}{row['size']:>11}  {row['picked']:<18}{row['methods_completed']:>6}"
+            f"{row['ms']:>9.1f}{row['peak_bytes'] / 2 ** 20:>10.1f}{row['accuracy']:>10.2f}"
+        )
+
+    picked = defaultdict(int)
+    for row in rows:
+        picked[row["picked"]] += 1
+    print(
+        f"\nmean accuracy {statistics.mean(r['accuracy'] for r in rows):.2f}, "
+        f"median {statistics.median(r['ms'] for r in rows):.1f} ms, "
+        f"picked: " + ", ".join(f"{name} x{count}" for name, count in sorted(picked.items()))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-category", type=int, default=3, help="samples per corpus category")
+    parser.add_argument("--categories", default=",".join(CATEGORIES), help="comma separated corpus categories")
+    parser.add_argument("--methods", default="", help="comma separated preprocessing methods (default: all)")
+    parser.add_argument("--runs", type=int, default=1, help="timed runs per measurement")
+    parser.add_argument("--seed", type=int, default=1234, help="corpus seed")
+    parser.add_argument("--skip-methods", action="store_true", help="only run the end-to-end pipeline")
+    parser.add_argument("--skip-pipeline", action="store_true", help="only run the per-method table")
+    parser.add_argument("--save-corpus", metavar="DIR", help="also write the corpus images and ground truth here")
+    parser.add_argument("--json", metavar="PATH", help="write raw results as JSON")
+    args = parser.parse_args()
+
+    samples = build_corpus(args.per_category, args.categories.split(","), args.seed)
+    if args.save_corpus:
+        save_corpus(samples, args.save_corpus)
+
+    service = OCRService()
+    methods = [name for name in args.methods.split(",") if name]
+    print(
+        f"{len(samples)} samples, backend {service.backend.name}, "
+        f"pipeline {service.pipeline_mode} x{service.pipeline_workers}, strategy {service.ocr_strategy}\n"
+    )
+
+    # Warm-up so tesseract start-up and model loading are not charged to the first sample
+    service.extract_text_from_base64(encode_base64(samples[0]))
+
+    results = {}
+    tracemalloc.start()
+    try:
+        if not args.skip_methods:
+            results["methods"] = bench_methods(service, samples, methods, args.runs)
+            print_method_table(results["methods"])
+            print()
+        if not args.skip_pipeline:
+            results["pipeline"] = bench_pipeline(service, samples, args.runs)
+            print_pipeline_table(results["pipeline"])
+    finally:
+        tracemalloc.stop()
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
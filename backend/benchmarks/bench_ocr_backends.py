@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Per-image OCR latency for each available OCR backend.
+
+Usage (from backend/):
+    python benchmarks/bench_ocr_backends.py [--runs 10]
+
+Every backend runs the same OCRService pipeline (sequential, no early exit)
+over the same rendered worksheet images, so only the Tesseract binding differs.
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ocr_service import OCRService, PytesseractBackend, TesserocrBackend  # noqa: E402
+
+SAMPLES = {
+    "equation": "2x + 5 = 15\nSolve for x",
+    "word_problem": (
+        "A train travels 120 km in 2 hours.\n"
+        "What is its average speed in km/h?\n"
+        "How far does it go in 5 hours?"
+    ),
+    "worksheet": "\n".join(f"{i}. Simplify {i}x + {i + 3}x - {2 * i}" for i in range(1, 9)),
+}
+
+
+def render_sample(text: str, width: int = 900) -> np.ndarray:
+    """Render text in black on white and return it as a BGR array"""
+    try:
+        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 28)
+    except OSError:
+        font = ImageFont.load_default()
+
+    lines = text.split("\n")
+    img = Image.new("RGB", (width, 60 + 44 * len(lines)), color="white")
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((30, 30 + 44 * i), line, fill="black", font=font)
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+
+
+def encode_base64(image: np.ndarray) -> str:
+    ok, buffer = cv2.imencode(".png", image)
+    return base64.b64encode(buffer.tobytes()).decode("utf-8")
+
+
+def available_backends() -> List:
+    backends = [PytesseractBackend()]
+    try:
+        backends.append(TesserocrBackend())
+    except Exception as e:
+        print(f"tesserocr backend skipped: {e}")
+    return backends
+
+
+def bench_backend(backend, images: Dict[str, str], runs: int) -> Dict[str, List[float]]:
+    service = OCRService(backend=backend)
+    service.pipeline_mode = "sequential"
+    service.target_word_count = 0
+
+    # Warm-up run so one-off model loading is not counted
+    for image_base64 in images.values():
+        service.extract_text_from_base64(image_base64)
+
+    timings = {}
+    for name, image_base64 in images.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            service.extract_text_from_base64(image_base64)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[name] = samples
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per image")
+    args = parser.parse_args()
+
+    images = {name: encode_base64(render_sample(text)) for name, text in SAMPLES.items()}
+
+    print(f"{'backend':<14}{'image':<16}{'median ms':>12}{'p95 ms':>10}{'mean ms':>10}")
+    for backend in available_backends():
+        for name, samples in bench_backend(backend, images, args.runs).items():
+            samples.sort()
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{backend.name:<14}{name:<16}{statistics.median(samples):>12.1f}{p95:>10.1f}{statistics.mean(samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
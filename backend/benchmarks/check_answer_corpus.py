@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Golden-file check for the structured answer parser.
+
+Usage (from backend/):
+    python benchmarks/check_answer_corpus.py [--update] [--chunk-sizes 1,7,64]
+
+Every answer_corpus/*.md is a model response; the .json next to it holds the
+StructuredAnswer it must parse into. Each response is parsed whole and also
+fed in chunks of the given sizes, which must give the same structure, with
+the steps `feed` returned along the way being a prefix of the final steps.
+
+--update rewrites the .json files from the current parser; review the diff
+before committing it.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.answer_parser import AnswerParser, parse_answer  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "answer_corpus")
+
+
+def corpus_paths():
+    return sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md")))
+
+
+def parse_streamed(text: str, chunk_size: int):
+    parser = AnswerParser()
+    streamed = []
+    for start in range(0, len(text), chunk_size):
+        streamed.extend(parser.feed(text[start:start + chunk_size]))
+    return parser.finish().dict(), streamed
+
+
+def check(path: str, chunk_sizes) -> list:
+    with open(path, encoding="utf-8") as handle:
+        text = handle.read()
+    with open(path[:-3] + ".json", encoding="utf-8") as handle:
+        expected = json.load(handle)
+
+    problems = []
+    if parse_answer(text).dict() != expected:
+        problems.append("whole-text parse differs from golden file")
+    for chunk_size in chunk_sizes:
+        parsed, streamed = parse_streamed(text, chunk_size)
+        if parsed != expected:
+            problems.append(f"chunked parse (size {chunk_size}) differs from golden file")
+        if streamed != expected["steps"][:len(streamed)]:
+            problems.append(f"steps streamed in chunks of {chunk_size} are not a prefix of the final steps")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="rewrite the golden files from the current parser")
+    parser.add_argument("--chunk-sizes", default="1,7,64", help="comma separated stream chunk sizes to check")
+    args = parser.parse_args()
+    chunk_sizes = [int(size) for size in args.chunk_sizes.split(",") if size]
+
+    failed = 0
+    for path in corpus_paths():
+        name = os.path.basename(path)[:-3]
+        if args.update:
+            with open(path, encoding="utf-8") as handle:
+                structured = parse_answer(handle.read()).dict()
+            with open(path[:-3] + ".json", "w", encoding="utf-8") as handle:
+                json.dump(structured, handle, indent=2, ensure_ascii=False)
+                handle.write("\n")
+            print(f"updated  {name}")
+            continue
+
+        problems = check(path, chunk_sizes)
+        failed += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<9}{name}")
+        for problem in problems:
+            print(f"         {problem}")
+
+    if failed:
+        print(f"\n{failed} golden file(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Reproducible synthetic worksheet corpus for OCR benchmarks.
+
+Every sample is rendered from a fixed seed, so two runs (or two machines)
+benchmark exactly the same pixels. Categories:
+
+    typed          clean black-on-white screenshot text
+    handwritten    per-character jitter, rotation and size variation
+    rotated        typed page photographed with a few degrees of skew
+    noisy          sensor noise plus salt-and-pepper specks
+    low_contrast   grey ink on a grey, unevenly lit page
+    large          typed page at phone-camera resolution (12 MP)
+"""
+
+import random
+from collections import Counter
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+CATEGORIES = ["typed", "handwritten", "rotated", "noisy", "low_contrast", "large"]
+
+PROBLEMS = [
+    ["Solve for x: 2x + 5 = 15"],
+    ["Find the area of a circle", "with radius 7 cm"],
+    ["A train travels 120 km in 2 hours.", "What is its average speed?"],
+    ["Simplify (3a + 2b) - (a - 5b)"],
+    ["Factorise x^2 + 7x + 12"],
+    ["If 4 pens cost 36 rupees,", "how much do 9 pens cost?"],
+    ["Find the value of 3/4 + 5/6"],
+    ["The sum of two numbers is 45", "and their difference is 9.", "Find the numbers."],
+    ["Convert 0.375 into a fraction"],
+    ["Find the perimeter of a rectangle", "of length 12 m and width 8 m"],
+]
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+]
+
+
+def load_font(size: int) -> ImageFont.ImageFont:
+    for path in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+class Sample:
+    def __init__(self, name: str, category: str, image: np.ndarray, ground_truth: str):
+        self.name = name
+        self.category = category
+        self.image = image  # BGR
+        self.ground_truth = ground_truth
+
+
+def word_accuracy(text: str, ground_truth: str) -> float:
+    """Share of ground-truth words (case-insensitive, as a multiset) present in `text`"""
+    expected = Counter(word.lower() for word in ground_truth.split())
+    found = Counter(word.lower() for word in text.split())
+    if not expected:
+        return 1.0
+    matched = sum(min(count, found[word]) for word, count in expected.items())
+    return matched / sum(expected.values())
+
+
+def _render_typed(lines: List[str], font_size: int = 32, scale: float = 1.0,
+                  ink=(20, 20, 20), paper=(255, 255, 255)) -> Image.Image:
+    font = load_font(int(font_size * scale))
+    line_height = int(font_size * 1.6 * scale)
+    margin = int(40 * scale)
+    width = int(max(font.getlength(line) for line in lines) + 2 * margin)
+    height = line_height * len(lines) + 2 * margin
+    page = Image.new("RGB", (width, height), color=paper)
+    draw = ImageDraw.Draw(page)
+    for i, line in enumerate(lines):
+        draw.text((margin, margin + i * line_height), line, fill=ink, font=font)
+    return page
+
+
+def _render_handwritten(lines: List[str], rng: random.Random) -> Image.Image:
+    """Glyph-by-glyph rendering with jitter, so no two characters sit the same way"""
+    margin, line_height = 40, 60
+    page = Image.new("RGB", (1100, line_height * len(lines) + 2 * margin), color=(250, 248, 240))
+    for row, line in enumerate(lines):
+        x = margin + rng.randint(-5, 5)
+        baseline = margin + row * line_height
+        for char in line:
+            font = load_font(rng.randint(28, 36))
+            if char == " ":
+                x += rng.randint(10, 18)
+                continue
+            glyph = Image.new("L", (60, 70), color=0)
+            ImageDraw.Draw(glyph).text((10, 10), char, fill=255, font=font)
+            glyph = glyph.rotate(rng.uniform(-10, 10), resample=Image.BICUBIC)
+            ink = Image.new("RGB", glyph.size, color=(25, 30, 80))
+            page.paste(ink, (x - 10, baseline + rng.randint(-4, 4) - 10), glyph)
+            x += int(font.getlength(char)) + rng.randint(-1, 3)
+    return page
+
+
+def _to_bgr(image: Image.Image) -> np.ndarray:
+    return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+
+def _rotate(image: np.ndarray, angle: float) -> np.ndarray:
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), borderValue=(255, 255, 255))
+
+
+def _add_noise(image: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    noisy = image.astype(np.int16) + rng.normal(0, 18, image.shape).astype(np.int16)
+    noisy = np.clip(noisy, 0, 255).astype(np.uint8)
+    specks = rng.random(image.shape[:2])
+    noisy[specks < 0.01] = 0
+    noisy[specks > 0.99] = 255
+    return noisy
+
+
+def _uneven_lighting(image: np.ndarray) -> np.ndarray:
+    height, width = image.shape[:2]
+    gradient = np.linspace(0.75, 1.0, width, dtype=np.float32)[None, :, None]
+    return np.clip(image.astype(np.float32) * gradient, 0, 255).astype(np.uint8)
+
+
+def build_sample(category: str, index: int, seed: int = 1234) -> Sample:
+    rng = random.Random(f"{seed}-{category}-{index}")
+    np_rng = np.random.default_rng(rng.randrange(2 ** 32))
+    lines = PROBLEMS[rng.randrange(len(PROBLEMS))]
+
+    if category == "typed":
+        image = _to_bgr(_render_typed(lines))
+    elif category == "handwritten":
+        image = _to_bgr(_render_handwritten(lines, rng))
+    elif category == "rotated":
+        image = _rotate(_to_bgr(_render_typed(lines)), rng.choice([-1, 1]) * rng.uniform(3, 7))
+    elif category == "noisy":
+        image = _add_noise(_to_bgr(_render_typed(lines)), np_rng)
+    elif category == "low_contrast":
+        image = _uneven_lighting(_to_bgr(_render_typed(lines, ink=(120, 120, 120), paper=(175, 175, 170))))
+    elif category == "large":
+        # Text block placed on a 4032x3024 page, as a phone camera would capture it
+        block = _to_bgr(_render_typed(lines, scale=3.0, paper=(236, 232, 224)))
+        image = np.full((3024, 4032, 3), (224, 232, 236), dtype=np.uint8)
+        height, width = min(block.shape[0], 3024 - 400), min(block.shape[1], 4032 - 400)
+        image[400:400 + height, 400:400 + width] = block[:height, :width]
+    else:
+        raise ValueError(f"Unknown category: {category}")
+
+    return Sample(f"{category}_{index:02d}", category, image, " ".join(lines))
+
+
+def build_corpus(per_category: int = 3, categories: Optional[List[str]] = None, seed: int = 1234) -> List[Sample]:
+    return [
+        build_sample(category, index, seed)
+        for category in (categories or CATEGORIES)
+        for index in range(per_category)
+    ]
+
+
+def save_corpus(samples: List[Sample], directory: str) -> Dict[str, str]:
+    """Write PNGs plus a ground-truth .txt next to each; returns name -> path"""
+    import os
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for sample in samples:
+        path = os.path.join(directory, f"{sample.name}.png")
+        cv2.imwrite(path, sample.image)
+        with open(os.path.join(directory, f"{sample.name}.txt"), "w") as handle:
+            handle.write(sample.ground_truth + "\n")
+        paths[sample.name] = path
+    return paths
@@ -4,9 +4,30 @@ from datetime import datetime
 import uuid
 
 
+class AnswerSection(BaseModel):
+    title: str  # "" for text before the first heading
+    content: str
+
+class StructuredAnswer(BaseModel):
+    sections: List[AnswerSection] = []
+    steps: List[str] = []
+    math_blocks: List[str] = []  # display math ($$...$$, \[...\], latex fences)
+    final_answer: Optional[str] = None
+
+class LLMUsage(BaseModel):
+    tier: str  # model tier picked by the router
+    model: str
+    max_tokens: int
+    difficulty: str  # "easy", "medium" or "hard", as estimated by the router
+    latency_ms: float  # wall time of the AI call, queueing included
+    input_tokens: int  # estimated from prompt length and image count
+    output_tokens: int  # estimated from response length
+
 class DoubtAnswer(BaseModel):
     solution: str
     steps: List[str]
+    structured: Optional[StructuredAnswer] = None
+    usage: Optional[LLMUsage] = None  # how the answer was generated
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Doubt(BaseModel):
@@ -16,7 +37,12 @@ class Doubt(BaseModel):
     subject: str
     question_type: str  # "text" or "image"
     image_data: Optional[str] = None  # base64 encoded image
+    additional_images: Optional[List[str]] = None  # further pages of a multi-page question
     ocr_data: Optional[Dict[str, Any]] = None  # OCR extraction results
+    image_phash: Optional[str] = None  # perceptual hash (hex) for near-duplicate lookup
+    image_phash_bands: Optional[List[str]] = None  # indexed bands of image_phash
+    reused_from: Optional[str] = None  # doubt whose answer was reused
+    llm_payload: Optional[Dict[str, Any]] = None  # what an image doubt sent the LLM (see ImagePayload.summary)
     answer: Optional[DoubtAnswer] = None
     status: str = "processing"  # "processing", "answered", "failed"
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -38,8 +64,10 @@ class DoubtResponse(BaseModel):
     subject: str
     question_type: str
     image_data: Optional[str] = None
+    additional_images: Optional[List[str]] = None
     ocr_data: Optional[Dict[str, Any]] = None
     answer: Optional[DoubtAnswer] = None
+    reused_from: Optional[str] = None
     status: str
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
@@ -1,12 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, status, File, UploadFile, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from models.doubt import DoubtCreate, DoubtResponse, ImageQuestionCreate
 from models.user import UserResponse
 from services.doubt_service import DoubtService
-from services.ocr_service import OCRService
-from typing import List, Optional
+from services.ocr_engine import AsyncOCREngine
+from services.image_normalizer import ImageNormalizer
+from services.image_input import ImageInput
+from typing import Any, Dict, List, Optional
 import logging
-import base64
+import asyncio
+import json
 import aiofiles
 import tempfile
 import os
@@ -17,6 +22,7 @@ logger = logging.getLogger(__name__)
 class TextQuestionRequest(BaseModel):
     question: str
     subject: str
+    bypass_cache: bool = False  # always ask the AI, ignoring cached answers (authenticated routes only)
 
 class ImageUploadResponse(BaseModel):
     success: bool
@@ -27,10 +33,45 @@ class ImageUploadResponse(BaseModel):
 
 logger = logging.getLogger(__name__)
 
-def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRouter:
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+def merge_page_results(page_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-page OCR results into one result, keeping page order"""
+    if len(page_results) == 1:
+        return page_results[0]
+    
+    texts = []
+    confidence_scores = []
+    pages = []
+    for number, result in enumerate(page_results, start=1):
+        if result["success"] and result["extracted_text"]:
+            texts.append(f"[Page {number}]\n{result['extracted_text']}")
+            confidence_scores.extend(result["confidence_scores"])
+        pages.append({
+            "page": number,
+            "success": result["success"],
+            "word_count": result.get("word_count", 0),
+            "average_confidence": result.get("average_confidence", 0),
+            "preprocessing_used": result["preprocessing_used"]
+        })
+    
+    return {
+        "extracted_text": "\n\n".join(texts),
+        "confidence_scores": confidence_scores,
+        "preprocessing_used": "batch",
+        "success": bool(texts),
+        "word_count": sum(page["word_count"] for page in pages),
+        "average_confidence": sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0,
+        "pages": pages
+    }
+
+def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user, ocr_engine: Optional[AsyncOCREngine] = None) -> APIRouter:
     router = APIRouter(prefix="/questions", tags=["questions"])  # Changed prefix to match requirements
-    doubt_service = DoubtService(db)
-    ocr_service = OCRService()
+    ocr_engine = ocr_engine or AsyncOCREngine()
+    doubt_service = DoubtService(db, ocr_engine)
+    image_normalizer = ImageNormalizer()
     
     @router.post("/text", response_model=DoubtResponse)
     async def create_text_question(
@@ -44,7 +85,7 @@ def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRoute
                 subject=request.subject,
                 question_type="text"
             )
-            doubt = await doubt_service.create_doubt(current_user.id, doubt_data)
+            doubt = await doubt_service.create_doubt(current_user.id, doubt_data, bypass_cache=request.bypass_cache)
             return doubt
             
         except Exception as e:
@@ -54,6 +95,147 @@ def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRoute
                 detail="Failed to process text question"
             )
     
+    def stream_doubt_response(user_id: str, doubt_data: DoubtCreate, **kwargs) -> StreamingResponse:
+        """Answer a doubt as a text/event-stream (see DoubtService.stream_doubt for the events)"""
+        async def events():
+            try:
+                async for event, data in doubt_service.stream_doubt(user_id, doubt_data, **kwargs):
+                    yield sse_event(event, data)
+            except Exception as e:
+                logger.error(f"Error streaming question: {str(e)}")
+                yield sse_event("error", {"detail": "Failed to process question"})
+        
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            # Proxies must pass tokens through as they arrive
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    @router.post("/text/stream")
+    async def stream_text_question(
+        request: TextQuestionRequest,
+        current_user: UserResponse = Depends(get_current_user)
+    ):
+        """Streaming variant of /text that sends the answer as Server-Sent Events"""
+        doubt_data = DoubtCreate(
+            question=request.question,
+            subject=request.subject,
+            question_type="text"
+        )
+        return stream_doubt_response(current_user.id, doubt_data, bypass_cache=request.bypass_cache)
+    
+    allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/bmp', 'image/tiff']
+    max_upload_bytes = 10 * 1024 * 1024  # 10MB
+    max_batch_pages = int(os.getenv("BATCH_MAX_PAGES", "10"))
+    
+    async def read_upload(file: UploadFile, allow_pdf: bool = False, max_pages: Optional[int] = None) -> List[ImageInput]:
+        """Validate an uploaded file and decode it (one image, or every page of a PDF up to `max_pages`)"""
+        is_pdf = allow_pdf and file.content_type == "application/pdf"
+        
+        # Validate file type
+        if file.content_type not in allowed_types and not is_pdf:
+            allowed = allowed_types + (["application/pdf"] if allow_pdf else [])
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported file type: {file.content_type}. Allowed: {', '.join(allowed)}"
+            )
+        
+        # Check file size (10MB limit)
+        content = await file.read()
+        if len(content) > max_upload_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File size too large. Maximum allowed: 10MB"
+            )
+        
+        # Validate and decode once; OCR, storage and the AI call all reuse these images
+        try:
+            if is_pdf:
+                return await asyncio.to_thread(
+                    image_normalizer.load_pdf, content, max_batch_pages if max_pages is None else max_pages
+                )
+            return [await asyncio.to_thread(image_normalizer.load, content)]
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid {'PDF' if is_pdf else 'image'} file: {str(e)}"
+            )
+    
+    async def ocr_image(image: ImageInput, encode: bool = True) -> Dict[str, Any]:
+        """OCR an image in the process pool and, unless the caller encodes it, prepare its upload copy"""
+        ocr_result = await ocr_engine.extract_text_from_image(
+            image.array, cache_key=image_normalizer.cache_key(image)
+        )
+        if encode:
+            # Base64 only for storage and the LLM upload
+            await asyncio.to_thread(lambda: image.llm_base64)
+        ocr_result["image_normalization"] = image.info()
+        return ocr_result
+    
+    def build_image_question(question: str, extracted_text: str) -> str:
+        """Combine the student's question with the OCR text"""
+        final_question = question.strip()
+        if extracted_text:
+            if final_question:
+                final_question += f"\n\nExtracted text from image: {extracted_text}"
+            else:
+                final_question = f"Please solve this problem from the image: {extracted_text}"
+        elif not final_question:
+            final_question = "Please analyze and solve the problem shown in this image."
+        return final_question
+    
+    async def prepare_image_question(file: UploadFile, question: str, subject: str):
+        """
+        Decode and OCR an uploaded question image, finding an answered near-duplicate when enabled.
+        
+        Returns (doubt_data, ocr, image, similar) where `ocr` holds the keyword
+        arguments for create_doubt: the finished `ocr_result`, or in the
+        speculative pipeline the still running `ocr_task`. The question is then
+        not extended with the OCR text; the AI call gets whatever OCR has by
+        the end of the grace period as context.
+        """
+        image = (await read_upload(file))[0]
+        
+        # A re-photographed, already answered problem reuses that doubt's answer (only
+        # when the image is the whole question). The match is confirmed against the
+        # OCR text, so OCR always runs first here.
+        ocr_result = None
+        similar = None
+        if not question.strip() and doubt_service.image_dedup_enabled:
+            ocr_result = await ocr_image(image)
+            similar = await doubt_service.find_similar_image_doubt(image, subject, ocr_result)
+        
+        if ocr_result is None and doubt_service.image_pipeline_mode == "speculative":
+            # The upload copy is encoded here, once, while OCR runs
+            ocr_task = asyncio.ensure_future(ocr_image(image, encode=False))
+            await asyncio.to_thread(lambda: image.llm_base64)
+            doubt_data = DoubtCreate(
+                question=build_image_question(question, ""),
+                subject=subject,
+                question_type="image",
+                image_data=image.llm_base64
+            )
+            return doubt_data, {"ocr_task": ocr_task}, image, None
+        if ocr_result is None:
+            # Extract text using OCR (runs in the OCR process pool)
+            ocr_result = await ocr_image(image)
+        
+        # Prepare question text
+        final_question = build_image_question(
+            question, ocr_result["extracted_text"] if ocr_result["success"] else ""
+        )
+        
+        # Create doubt with image and OCR data
+        doubt_data = DoubtCreate(
+            question=final_question,
+            subject=subject,
+            question_type="image",
+            image_data=image.llm_base64
+        )
+        
+        return doubt_data, {"ocr_result": ocr_result}, image, similar
+    
     @router.post("/image", response_model=DoubtResponse)
     async def create_image_question(
         file: UploadFile = File(...),
@@ -63,64 +245,94 @@ def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRoute
     ):
         """Process an image-based question with OCR (POST /api/questions/image)"""
         try:
-            # Validate file type
-            allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/bmp', 'image/tiff']
-            if file.content_type not in allowed_types:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Unsupported file type: {file.content_type}. Allowed: {', '.join(allowed_types)}"
-                )
-            
-            # Check file size (10MB limit)
-            content = await file.read()
-            if len(content) > 10 * 1024 * 1024:  # 10MB
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="File size too large. Maximum allowed: 10MB"
-                )
-            
-            # Convert to base64
-            image_base64 = base64.b64encode(content).decode('utf-8')
+            doubt_data, ocr, image, similar = await prepare_image_question(file, question, subject)
+            doubt = await doubt_service.create_doubt(
+                current_user.id, doubt_data, image=image, reuse_from=similar, **ocr
+            )
+            return doubt
             
-            # Validate image
-            validation_result = ocr_service.validate_image(image_base64)
-            if not validation_result["valid"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid image file: {validation_result.get('error', 'Unknown error')}"
-                )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error creating image question: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to process image question"
+            )
+    
+    @router.post("/image/stream")
+    async def stream_image_question(
+        file: UploadFile = File(...),
+        question: str = Form(""),
+        subject: str = Form("mathematics"),
+        current_user: UserResponse = Depends(get_current_user)
+    ):
+        """Streaming variant of /image; upload and OCR errors are reported before the stream starts"""
+        try:
+            doubt_data, ocr, image, similar = await prepare_image_question(file, question, subject)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error preparing image question: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to process image question"
+            )
+        
+        return stream_doubt_response(current_user.id, doubt_data, image=image, reuse_from=similar, **ocr)
+    
+    @router.post("/batch", response_model=DoubtResponse)
+    async def create_batch_question(
+        files: List[UploadFile] = File(...),
+        question: str = Form(""),
+        subject: str = Form("mathematics"),
+        current_user: UserResponse = Depends(get_current_user)
+    ):
+        """Process one question spread over several images or a PDF (POST /api/questions/batch)"""
+        try:
+            pages: List[ImageInput] = []
+            for file in files:
+                # Check the page budget before decoding another file, not after
+                remaining = max_batch_pages - len(pages)
+                if remaining <= 0:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Too many pages. Maximum allowed: {max_batch_pages}"
+                    )
+                pages.extend(await read_upload(file, allow_pdf=True, max_pages=remaining))
             
-            # Extract text using OCR
-            ocr_result = ocr_service.extract_text_from_base64(image_base64)
+            # OCR all pages concurrently; the engine bounds how many run at once
+            page_results = await asyncio.gather(*(ocr_image(page) for page in pages))
+            ocr_result = merge_page_results(page_results)
             
-            # Prepare question text
-            final_question = question.strip()
-            if ocr_result["success"] and ocr_result["extracted_text"]:
-                if final_question:
-                    final_question += f"\n\nExtracted text from image: {ocr_result['extracted_text']}"
-                else:
-                    final_question = f"Please solve this problem from the image: {ocr_result['extracted_text']}"
-            elif not final_question:
-                final_question = "Please analyze and solve the problem shown in this image."
+            final_question = build_image_question(
+                question, ocr_result["extracted_text"] if ocr_result["success"] else ""
+            )
             
-            # Create doubt with image and OCR data
+            # One doubt and one AI call for the whole question
             doubt_data = DoubtCreate(
                 question=final_question,
                 subject=subject,
                 question_type="image",
-                image_data=image_base64
+                image_data=pages[0].llm_base64
             )
             
-            doubt = await doubt_service.create_doubt(current_user.id, doubt_data)
+            doubt = await doubt_service.create_doubt(
+                current_user.id,
+                doubt_data,
+                ocr_result=ocr_result,
+                image=pages[0],
+                additional_images=[page.llm_base64 for page in pages[1:]] or None
+            )
             return doubt
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error creating image question: {str(e)}")
+            logger.error(f"Error creating batch question: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to process image question"
+                detail="Failed to process batch question"
             )
     
     @router.get("/user/{user_id}", response_model=List[DoubtResponse])
@@ -155,6 +367,30 @@ def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRoute
                 detail="Failed to get question history"
             )
     
+    @router.get("/{doubt_id}/status")
+    async def get_doubt_status(
+        doubt_id: str,
+        current_user: UserResponse = Depends(get_current_user)
+    ):
+        """Processing status of a doubt, including its background job when queued"""
+        try:
+            doubt_status = await doubt_service.get_processing_status(doubt_id, current_user.id)
+            if not doubt_status:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Doubt not found"
+                )
+            return doubt_status
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting doubt status: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to get doubt status"
+            )
+    
     @router.get("/{doubt_id}", response_model=DoubtResponse)
     async def get_doubt(
         doubt_id: str,
@@ -214,7 +450,8 @@ def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRoute
         try:
             # Use a demo user ID
             demo_user_id = "demo_user"
-            doubt = await doubt_service.create_doubt(demo_user_id, doubt_data)
+            # Always answered inline: the demo user cannot poll the status endpoint
+            doubt = await doubt_service.create_doubt(demo_user_id, doubt_data, background=False)
             return doubt
             
         except Exception as e:
@@ -224,4 +461,7 @@ def create_doubts_router(db: AsyncIOMotorDatabase, get_current_user) -> APIRoute
                 detail="Failed to create demo doubt"
             )
     
+    # Export the service for startup hooks
+    router.doubt_service = doubt_service
+    
     return router
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -14,6 +14,9 @@ from datetime import datetime
 from routes.auth import create_auth_router
 from routes.doubts import create_doubts_router
 from routes.chat import create_chat_router
+from services.ocr_engine import AsyncOCREngine
+from services.ocr_cache import OCRCache
+from models.user import UserResponse
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -55,15 +58,27 @@ async def get_status_checks():
     status_checks = await db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
+# OCR runs in a shared process pool so it never blocks the event loop
+ocr_engine = AsyncOCREngine(cache=OCRCache(db))
+
 # Create and include routers
 auth_router = create_auth_router(db)
-doubts_router = create_doubts_router(db, auth_router.get_current_user)
+doubts_router = create_doubts_router(db, auth_router.get_current_user, ocr_engine)
 chat_router = create_chat_router(db, auth_router.get_current_user)
 
 api_router.include_router(auth_router)
 api_router.include_router(doubts_router)
 api_router.include_router(chat_router)
 
+# Comma-separated emails allowed to read /api/metrics; empty lets any signed-in user
+metrics_emails = {email.strip().lower() for email in os.getenv("METRICS_ALLOWED_EMAILS", "").split(",") if email.strip()}
+
+@api_router.get("/metrics")
+async def get_metrics(current_user: UserResponse = Depends(auth_router.get_current_user)):
+    if metrics_emails and current_user.email.lower() not in metrics_emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read metrics")
+    return await doubts_router.doubt_service.get_metrics()
+
 # Include the main router in the app
 app.include_router(api_router)
 
@@ -87,9 +102,19 @@ async def startup_event():
     logger.info("DoubSolver API starting up...")
     logger.info(f"Connected to MongoDB: {mongo_url}")
     logger.info(f"Database: {os.environ['DB_NAME']}")
-    logger.info("AI Service: Google Gemini 2.0-flash")
+    ai_service = doubts_router.doubt_service.ai_service
+    tiers = ", ".join(f"{name}={config['model']}" for name, config in ai_service.router.tiers.items())
+    logger.info(f"AI Service: {ai_service.backend.name} backend, model tiers {tiers}")
+    logger.info(f"OCR Engine: {ocr_engine.max_workers} worker processes")
+    await ocr_engine.cache.ensure_indexes()
+    await doubts_router.doubt_service.ensure_indexes()
+    indexed = await doubts_router.doubt_service.rebuild_question_index()
+    logger.info(f"Question index: {indexed} answered questions")
+    doubts_router.doubt_service.start_workers()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await doubts_router.doubt_service.stop_workers()
+    ocr_engine.shutdown()
     client.close()
     logger.info("Database connection closed")
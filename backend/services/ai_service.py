@@ -1,24 +1,28 @@
 import os
 import base64
+import asyncio
+import hashlib
 import tempfile
-from typing import Dict, List, Optional
-import uuid
-from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
-from models.doubt import DoubtAnswer
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from emergentintegrations.llm.chat import UserMessage, ImageContent
+from models.doubt import DoubtAnswer, LLMUsage
+from services.answer_cache import normalize_question
+from services.answer_parser import AnswerParser, parse_answer
+from services.single_flight import SingleFlight
+from services.llm_scheduler import CHARS_PER_TOKEN, LLMScheduler, SchedulerRejected, estimate_tokens, rate_limit_delay
+from services.llm_backend import LLMBackend, create_llm_backend
+from services.llm_client_pool import ChatClientPool
+from services.model_router import ModelRouter, RouteDecision
+from services.llm_resilience import CircuitBreaker, DeadlineExceeded, LatencyTracker, hedged_call
 import logging
 
 logger = logging.getLogger(__name__)
 
-class AIService:
-    def __init__(self):
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-    
-    def _create_chat_session(self) -> LlmChat:
-        """Create a new chat session for each request"""
-        session_id = f"doubt_session_{uuid.uuid4()}"
-        system_message = """You are an expert AI tutor specializing in educational content. Your role is to help students understand concepts by providing clear, step-by-step explanations.
+# Bump whenever the prompts or model change, so cached answers from the old ones are not served
+PROMPT_VERSION = "2"
+
+SYSTEM_MESSAGE = """You are an expert AI tutor specializing in educational content. Your role is to help students understand concepts by providing clear, step-by-step explanations.
 
 Guidelines:
 1. Always provide detailed, step-by-step solutions
@@ -36,129 +40,368 @@ For each response, provide:
 
 Format your response to be educational and easy to follow."""
 
-        chat = LlmChat(
-            api_key=self.api_key,
-            session_id=session_id,
-            system_message=system_message
-        )
-        
-        # Configure for Gemini 2.0-flash
-        chat.with_model("gemini", "gemini-2.0-flash")
-        chat.with_max_tokens(4096)
-        
-        return chat
-    
-    async def process_text_question(self, question: str, subject: str) -> DoubtAnswer:
-        """Process a text-based question"""
-        try:
-            chat = self._create_chat_session()
-            
-            # Create educational prompt
-            prompt = f"""Subject: {subject}
+TEXT_PROMPT = """Subject: {subject}
 Question: {question}
 
-Please provide a comprehensive, step-by-step solution to this {subject.lower()} question. Make sure to:
+Please provide a comprehensive, step-by-step solution to this {subject_lower} question. Make sure to:
 1. Explain the approach clearly
 2. Show all working steps
 3. Provide educational context
 4. Make it easy for a student to understand
 
-Please format your response with clear sections and steps."""
-            
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
-            
-            # Parse the response into solution and steps
-            solution_text = response.strip()
-            steps = self._extract_steps(solution_text)
-            
-            return DoubtAnswer(
-                solution=solution_text,
-                steps=steps
-            )
-            
-        except Exception as e:
-            logger.error(f"Error processing text question: {str(e)}")
-            raise Exception(f"Failed to process question: {str(e)}")
-    
-    async def process_image_question(self, question: str, subject: str, image_data: str) -> DoubtAnswer:
-        """Process a question with an uploaded image"""
-        try:
-            chat = self._create_chat_session()
-            
-            # Create educational prompt for image analysis
-            prompt = f"""Subject: {subject}
-Question: {question if question.strip() else 'Please analyze this image and solve the problem shown.'}
+Please format your response with clear sections and steps.""".format
 
-I've uploaded an image that contains a {subject.lower()} problem. Please:
+IMAGE_PROMPT = """Subject: {subject}
+Question: {question}
+
+I've uploaded {upload_description}. Please:
 1. Describe what you see in the image
 2. Identify the specific problem or question
 3. Provide a step-by-step solution
 4. Explain each step clearly for educational understanding
 
-Make your response comprehensive and educational."""
-            
-            # Create image content from base64 data
-            image_content = ImageContent(image_base64=image_data)
-            
-            user_message = UserMessage(
-                text=prompt,
-                file_contents=[image_content]
-            )
-            
+Make your response comprehensive and educational.""".format
+
+SINGLE_IMAGE_DESCRIPTION = "an image that contains a {subject_lower} problem".format
+MULTI_IMAGE_DESCRIPTION = "{count} images, in page order, that together contain a {subject_lower} problem".format
+DEFAULT_IMAGE_QUESTION = "Please analyze this image and solve the problem shown."
+# Sent as a text question when OCR alone carries an image doubt (see ImagePayloadPolicy)
+TRANSCRIBED_IMAGE_QUESTION = """{question}
+
+The problem, transcribed from the student's photo:
+{text}""".format
+NO_STEPS_PLACEHOLDER = "Solution provided above with detailed explanation"
+
+class AIService:
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        # The provider, or a local fake with LLM_BACKEND=fake (see create_llm_backend)
+        self.backend = backend or create_llm_backend()
+        # Identical questions asked at the same time share one model call
+        self._single_flight = SingleFlight()
+        # Concurrency and rate budgets for every model call
+        self.scheduler = LLMScheduler()
+        self.expected_output_tokens = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1024"))
+        # Model and token budget per question (see ModelRouter)
+        self.router = ModelRouter()
+        # Configured clients are reused, one pool per model tier; at most one
+        # client per concurrent call is ever needed
+        pool_size = int(os.getenv("LLM_CLIENT_POOL_SIZE", self.scheduler.max_concurrency))
+        self._clients = {
+            tier: ChatClientPool(lambda config=config: self._create_chat_client(config), max_idle=pool_size)
+            for tier, config in self.router.tiers.items()
+        }
+        # Whole-request time budget; each call gets whatever is left of it
+        self.request_budget = float(os.getenv("LLM_REQUEST_BUDGET_SECONDS", "60"))
+        # Send a duplicate call when the first is slower than the recent p95 latency
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+        self.hedge_min_delay = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+        self.latency = {tier: LatencyTracker() for tier in self.router.tiers}
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+        )
+        self.calls = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+    
+    def _create_chat_client(self, tier: Dict[str, Any]) -> Any:
+        """Build a configured chat client; the pool gives each request a fresh session on it"""
+        return self.backend.create_client(tier, SYSTEM_MESSAGE)
+    
+    def _text_message(self, question: str, subject: str) -> UserMessage:
+        return UserMessage(text=TEXT_PROMPT(subject=subject, question=question, subject_lower=subject.lower()))
+    
+    def _image_message(
+        self,
+        question: str,
+        subject: str,
+        image_data: str,
+        additional_images: Optional[List[str]] = None
+    ) -> UserMessage:
+        images = [image_data] + list(additional_images or [])
+        if len(images) > 1:
+            upload_description = MULTI_IMAGE_DESCRIPTION(count=len(images), subject_lower=subject.lower())
+        else:
+            upload_description = SINGLE_IMAGE_DESCRIPTION(subject_lower=subject.lower())
+        
+        prompt = IMAGE_PROMPT(
+            subject=subject,
+            question=question if question.strip() else DEFAULT_IMAGE_QUESTION,
+            upload_description=upload_description
+        )
+        
+        # Create image content from base64 data
+        return UserMessage(
+            text=prompt,
+            file_contents=[ImageContent(image_base64=image) for image in images]
+        )
+    
+    def build_answer(
+        self,
+        response: str,
+        parser: Optional[AnswerParser] = None,
+        usage: Optional[LLMUsage] = None
+    ) -> DoubtAnswer:
+        """
+        Parse a complete response into solution, steps and structure.
+        
+        Pass the parser that was fed the response while it streamed, so the
+        text is not parsed a second time.
+        """
+        solution_text = response.strip()
+        structured = parser.finish() if parser is not None else parse_answer(solution_text)
+        return DoubtAnswer(
+            solution=solution_text,
+            steps=structured.steps or [NO_STEPS_PLACEHOLDER],
+            structured=structured,
+            usage=usage
+        )
+    
+    async def _stream_response(self, chat: Any, user_message: UserMessage) -> AsyncIterator[str]:
+        """
+        Yield the response text as it is generated.
+        
+        Uses the client's `stream_message` when it provides one; otherwise the
+        whole response arrives as a single chunk once it is complete.
+        """
+        stream_message = getattr(chat, "stream_message", None)
+        if stream_message is None:
+            yield await chat.send_message(user_message)
+            return
+        
+        async for chunk in stream_message(user_message):
+            if chunk:
+                yield chunk
+    
+    def _estimate_tokens(self, user_message: UserMessage, route: RouteDecision, images: int = 0) -> float:
+        return estimate_tokens(user_message.text, images) + min(self.expected_output_tokens, route.max_tokens)
+    
+    def _usage(self, route: RouteDecision, started: float, user_message: UserMessage, images: int, response_chars: int) -> LLMUsage:
+        return LLMUsage(
+            tier=route.tier,
+            model=route.model,
+            max_tokens=route.max_tokens,
+            difficulty=route.difficulty,
+            latency_ms=(time.monotonic() - started) * 1000,
+            input_tokens=round(estimate_tokens(user_message.text, images)),
+            output_tokens=round(response_chars / CHARS_PER_TOKEN)
+        )
+    
+    async def _send_leased(self, user_message: UserMessage, route: RouteDecision) -> str:
+        started = time.monotonic()
+        with self._clients[route.tier].lease() as chat:
             response = await chat.send_message(user_message)
+        self.latency[route.tier].record(time.monotonic() - started)
+        return response
+    
+    def _hedge_delay(self, route: RouteDecision) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        delay = self.latency[route.tier].percentile(self.hedge_percentile, min_samples=20)
+        return None if delay is None else max(delay, self.hedge_min_delay)
+    
+    async def _send_with_deadline(
+        self,
+        user_message: UserMessage,
+        route: RouteDecision,
+        estimated: float,
+        user_id: Optional[str],
+        deadline: float
+    ) -> str:
+        """One admitted call: hedged when enabled, bounded by the request deadline"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("AI request budget exhausted before the call started")
+        
+        def start_hedge():
+            release = self.scheduler.try_extra_slot(user_id, estimated)
+            if release is not None:
+                self.hedges_sent += 1
+            return release
+        
+        self.calls += 1
+        try:
+            response, hedge_won = await asyncio.wait_for(
+                hedged_call(lambda: self._send_leased(user_message, route), self._hedge_delay(route), start_hedge),
+                timeout=remaining
+            )
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            raise DeadlineExceeded(f"AI call did not finish within its {remaining:.1f}s budget")
+        self.hedge_wins += int(hedge_won)
+        return response
+    
+    async def _send(
+        self,
+        user_message: UserMessage,
+        route: RouteDecision,
+        images: int = 0,
+        user_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> DoubtAnswer:
+        started = time.monotonic()
+        deadline = deadline or started + self.request_budget
+        estimated = self._estimate_tokens(user_message, route, images)
+        
+        # Fail fast while the provider is degraded instead of queueing more doomed calls
+        self.breaker.before_call()
+        try:
+            response = await self.scheduler.run(
+                lambda: self._send_with_deadline(user_message, route, estimated, user_id, deadline),
+                estimated_tokens=estimated,
+                actual_tokens=lambda text: estimate_tokens(user_message.text, images) + estimate_tokens(text),
+                flow=user_id
+            )
+        except (SchedulerRejected, asyncio.CancelledError):
+            self.breaker.record_ignored()
+            raise
+        except Exception as e:
+            if rate_limit_delay(e) is None:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_ignored()
+            raise
+        
+        self.breaker.record_success()
+        return self.build_answer(response, usage=self._usage(route, started, user_message, images, len(response)))
+    
+    async def process_text_question(self, question: str, subject: str, user_id: Optional[str] = None) -> DoubtAnswer:
+        """Process a text-based question (`user_id` sets the scheduler's fair-queuing flow)"""
+        try:
+            key = ("text", normalize_question(subject), normalize_question(question))
+            answer = await self._single_flight.do(
+                key, lambda: self._send(
+                    self._text_message(question, subject), self.router.route(question, subject), user_id=user_id
+                )
+            )
+            return answer.copy()
             
-            # Parse the response into solution and steps
-            solution_text = response.strip()
-            steps = self._extract_steps(solution_text)
-            
-            return DoubtAnswer(
-                solution=solution_text,
-                steps=steps
+        except Exception as e:
+            logger.error(f"Error processing text question: {str(e)}")
+            raise Exception(f"Failed to process question: {str(e)}")
+    
+    async def process_image_question(
+        self,
+        question: str,
+        subject: str,
+        image_data: str,
+        additional_images: Optional[List[str]] = None,
+        user_id: Optional[str] = None
+    ) -> DoubtAnswer:
+        """Process a question with an uploaded image (further pages go in additional_images)"""
+        try:
+            images_digest = hashlib.sha256()
+            for image in [image_data] + list(additional_images or []):
+                images_digest.update(image.encode("utf-8"))
+            key = ("image", normalize_question(subject), normalize_question(question), images_digest.hexdigest())
+            images = 1 + len(additional_images or [])
+            answer = await self._single_flight.do(
+                key, lambda: self._send(
+                    self._image_message(question, subject, image_data, additional_images),
+                    self.router.route(question, subject, images),
+                    images=images,
+                    user_id=user_id
+                )
             )
+            return answer.copy()
             
         except Exception as e:
             logger.error(f"Error processing image question: {str(e)}")
             raise Exception(f"Failed to process image question: {str(e)}")
     
-    def _extract_steps(self, solution_text: str) -> List[str]:
-        """Extract steps from the AI response"""
-        steps = []
-        
-        # Look for numbered steps, bullet points, or step indicators
-        lines = solution_text.split('\n')
-        current_step = ""
+    async def stream_text_question(
+        self,
+        question: str,
+        subject: str,
+        user_id: Optional[str] = None,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of process_text_question yielding response text chunks.
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check for step indicators
-            if (line.startswith(('Step', 'step', '1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.')) or
-                line.startswith(('•', '-', '*')) or
-                'step' in line.lower()[:10]):
-                if current_step:
-                    steps.append(current_step.strip())
-                current_step = line
-            else:
-                if current_step:
-                    current_step += " " + line
-                elif line and len(steps) < 6:  # Add first few meaningful lines as steps
-                    steps.append(line)
-        
-        if current_step:
-            steps.append(current_step.strip())
-        
-        # If no clear steps found, create basic steps from key sentences
-        if not steps:
-            sentences = [s.strip() for s in solution_text.split('.') if s.strip()]
-            steps = sentences[:6]  # Take first 6 meaningful sentences
-        
-        # Clean up steps
-        cleaned_steps = []
-        for step in steps[:8]:  # Limit to 8 steps max
-            if len(step) > 10 and step not in cleaned_steps:
-                cleaned_steps.append(step)
-        
-        return cleaned_steps if cleaned_steps else ["Solution provided above with detailed explanation"]
\ No newline at end of file
+        A `usage` dict is filled with the call's LLMUsage fields once the stream ends.
+        """
+        route = self.router.route(question, subject)
+        async for chunk in self._stream(self._text_message(question, subject), route, user_id=user_id, usage=usage):
+            yield chunk
+    
+    async def stream_image_question(
+        self,
+        question: str,
+        subject: str,
+        image_data: str,
+        additional_images: Optional[List[str]] = None,
+        user_id: Optional[str] = None,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Streaming variant of process_image_question yielding response text chunks (see stream_text_question)"""
+        images = 1 + len(additional_images or [])
+        user_message = self._image_message(question, subject, image_data, additional_images)
+        route = self.router.route(question, subject, images)
+        async for chunk in self._stream(user_message, route, images=images, user_id=user_id, usage=usage):
+            yield chunk
+    
+    async def _stream(
+        self,
+        user_message: UserMessage,
+        route: RouteDecision,
+        images: int = 0,
+        user_id: Optional[str] = None,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Scheduled, breaker-guarded stream; the request budget bounds the wait for each chunk"""
+        started = time.monotonic()
+        deadline = started + self.request_budget
+        response_chars = 0
+        self.breaker.before_call()
+        outcome = self.breaker.record_ignored
+        try:
+            async with self.scheduler.slot(self._estimate_tokens(user_message, route, images), flow=user_id):
+                with self._clients[route.tier].lease() as chat:
+                    chunks = self._stream_response(chat, user_message).__aiter__()
+                    while True:
+                        remaining = deadline - time.monotonic()
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, remaining))
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            self.deadline_exceeded += 1
+                            raise DeadlineExceeded("AI stream did not finish within the request budget")
+                        response_chars += len(chunk)
+                        yield chunk
+            outcome = self.breaker.record_success
+            self.latency[route.tier].record(time.monotonic() - started)
+            if usage is not None:
+                usage.update(self._usage(route, started, user_message, images, response_chars).dict())
+        except (SchedulerRejected, GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            if rate_limit_delay(e) is None:
+                outcome = self.breaker.record_failure
+            raise
+        finally:
+            outcome()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.get_stats(),
+            "single_flight": self._single_flight.get_stats(),
+            "scheduler": self.scheduler.get_stats(),
+            "routing": self.router.get_stats(),
+            "client_pool": {tier: pool.get_stats() for tier, pool in self._clients.items()},
+            "breaker": self.breaker.get_stats(),
+            "calls": self.calls,
+            "deadline_exceeded": self.deadline_exceeded,
+            "latency_p95_ms": {tier: (tracker.percentile(0.95) or 0.0) * 1000 for tier, tracker in self.latency.items()},
+            "hedging": {
+                "enabled": self.hedge_enabled,
+                "sent": self.hedges_sent,
+                "wins": self.hedge_wins,
+                "win_rate": self.hedge_wins / self.hedges_sent if self.hedges_sent else 0.0,
+                # Extra provider calls per original call
+                "cost_overhead": self.hedges_sent / self.calls if self.calls else 0.0
+            }
+        }
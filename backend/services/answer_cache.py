@@ -0,0 +1,110 @@
+import hashlib
+import os
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.doubt import DoubtAnswer
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Case, Unicode form and whitespace differences do not change the question"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def served_answer(answer_doc: Dict[str, Any]) -> DoubtAnswer:
+    """A stored answer given to another doubt; no model call was made for it, so it carries no usage"""
+    return DoubtAnswer(**{**answer_doc, "usage": None})
+
+
+class AnswerCache:
+    """
+    Exact-match cache of AI answers to text questions.
+
+    Keys are a SHA-256 of the normalized subject, question text and prompt
+    version, so changing the prompts invalidates every entry. Lookups hit an
+    in-process LRU first and, when a database is given and ANSWER_CACHE_PERSIST
+    is enabled, fall back to the `answer_cache` collection.
+    """
+
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None):
+        self.memory = TTLCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "604800"))
+        )
+        persist = os.getenv("ANSWER_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+        self.collection = db.answer_cache if db is not None and persist else None
+        self.persistent_hits = 0
+        self.bypasses = 0
+
+    @staticmethod
+    def make_key(subject: str, question: str, prompt_version: str) -> str:
+        material = "\x00".join((prompt_version, normalize_question(subject), normalize_question(question)))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def ensure_indexes(self):
+        """Create the lookup index and let Mongo expire entries after the TTL"""
+        if self.collection is None:
+            return
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index(
+            "created_at", expireAfterSeconds=int(self.memory.ttl_seconds)
+        )
+
+    async def get(self, key: str) -> Optional[DoubtAnswer]:
+        answer = self.memory.get(key)
+        if answer is not None:
+            return served_answer(answer)
+
+        if self.collection is None:
+            return None
+
+        try:
+            doc = await self.collection.find_one({"key": key})
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {str(e)}")
+            return None
+
+        if not doc:
+            return None
+
+        self.persistent_hits += 1
+        self.memory.set(key, doc["answer"])
+        return served_answer(doc["answer"])
+
+    async def set(self, key: str, answer: DoubtAnswer, subject: str, prompt_version: str):
+        answer_doc = answer.dict()
+        self.memory.set(key, answer_doc)
+        if self.collection is None:
+            return
+
+        try:
+            await self.collection.update_one(
+                {"key": key},
+                {"$set": {
+                    "answer": answer_doc,
+                    "subject": subject,
+                    "prompt_version": prompt_version,
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Answer cache write failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.memory.get_stats()
+        stats["persistent"] = self.collection is not None
+        stats["persistent_hits"] = self.persistent_hits
+        stats["bypasses"] = self.bypasses
+        return stats
@@ -0,0 +1,236 @@
+import re
+from typing import List, Optional, Set
+
+from models.doubt import AnswerSection, StructuredAnswer
+
+# Shorter steps are stray fragments ("1.", "Step 2:") rather than content
+MIN_STEP_LENGTH = 11
+# Sentences used as steps when the response has no step markers at all
+MAX_FALLBACK_STEPS = 6
+
+# One alternation classifies each line; the first matching group wins, so the
+# order matters: "---" is a rule not a bullet, "**Step 1**" a step not a heading,
+# "**Answer:**" alone a heading but "**Answer:** 42" the final answer
+_LINE = re.compile(r"""
+    (?P<fence>```|~~~)
+  | (?P<math>\$\$|\\\[)
+  | (?P<rule>(?:[-*_]\s*){3,}$)
+  | (?P<step>(?:\#{1,6}\s*)?[*_]{0,2}\s*(?:step\s*\d+|\d{1,2}[.)](?!\d)))
+  | (?P<heading>\#{1,6}\s|(?:\*\*|__)[^*_]+(?:\*\*|__):?$)
+  | (?P<final>[*_]{0,2}(?:final\s+)?answer[*_\s]*[:=\-–](?=.*\w))
+  | (?P<bullet>[-*•+]\s)
+""", re.IGNORECASE | re.VERBOSE)
+
+_FINAL_TITLE = re.compile(r"^(?:the\s+)?(?:final\s+)?(?:answer|result)s?$", re.IGNORECASE)
+_BOXED = re.compile(r"\\boxed\{((?:[^{}]|\{[^{}]*\})*)\}")
+_HEADING_MARKUP = re.compile(r"^[#\s]+|[#\s]+$|^(?:\*\*|__)|(?:\*\*|__):?$")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+_MATH_FENCES = frozenset(("latex", "tex", "math", "katex"))
+
+
+class AnswerParser:
+    """
+    Single-pass parser turning a model response into a StructuredAnswer.
+
+    Lines are classified once, as they arrive, so the same parser serves a
+    complete response and a token stream: `feed` returns the steps that later
+    text can no longer change, and `finish` returns the whole structure.
+
+    A step starts at "Step N" or "N." / "N)" (decimals like "3.14" are not
+    markers) and runs until the next step, heading, rule or final answer line.
+    A bullet starts a step only outside a numbered step, otherwise it is part
+    of it, and ends with its paragraph. Display math ($$...$$, \\[...\\] and
+    latex fences) is collected whole. The final answer is the last
+    "Final answer: ..." line, else the first line under an "Answer" heading,
+    else the last \\boxed{...}.
+    """
+
+    def __init__(self):
+        self.steps: List[str] = []
+        self._seen_steps: Set[str] = set()
+        self._step: Optional[List[str]] = None
+        self._step_numbered = False
+
+        self._sections: List[AnswerSection] = []
+        self._section_title = ""
+        self._section_lines: List[str] = []
+
+        self.math_blocks: List[str] = []
+        self._math_closer: Optional[str] = None  # "$$", "\\]" or a fence while inside a block
+        self._math_lines: Optional[List[str]] = None  # None inside a non-math code fence
+
+        self._final_answer: Optional[str] = None
+        self._final_from_heading = False
+        self._awaiting_final = False
+        self._boxed: Optional[str] = None
+
+        self._text: List[str] = []
+        self._partial: List[str] = []
+        self._result: Optional[StructuredAnswer] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume a chunk of response text; returns the steps it completed"""
+        self._text.append(chunk)
+        if "\n" not in chunk:
+            self._partial.append(chunk)
+            return []
+
+        completed = []
+        lines = chunk.split("\n")
+        lines[0] = "".join(self._partial) + lines[0]
+        self._partial = [lines.pop()]
+        for line in lines:
+            self._line(line, completed)
+        return completed
+
+    def finish(self) -> StructuredAnswer:
+        if self._result is not None:
+            return self._result
+
+        completed: List[str] = []
+        self._line("".join(self._partial), completed)
+        self._partial = []
+        self._close_step(completed)
+        self._close_section()
+        if self._math_closer is not None and self._math_lines:
+            # Unterminated block at the end of the response
+            self.math_blocks.append("\n".join(self._math_lines).strip())
+        if not self.steps:
+            self._fallback_steps()
+
+        self._result = StructuredAnswer(
+            sections=self._sections,
+            steps=self.steps,
+            math_blocks=self.math_blocks,
+            final_answer=self._final_answer or self._boxed
+        )
+        return self._result
+
+    def _line(self, raw: str, completed: List[str]):
+        raw = raw.rstrip()
+        line = raw.strip()
+        self._section_lines.append(raw)
+        if not line:
+            if self._step is not None and not self._step_numbered and self._math_closer is None:
+                # A bullet ends at the end of its paragraph
+                self._close_step(completed)
+            return
+        if "\\boxed" in line:
+            boxed = _BOXED.findall(line)
+            if boxed:
+                self._boxed = boxed[-1].strip()
+
+        if self._math_closer is not None:
+            if self._awaiting_final and self._math_lines is not None:
+                self._take_heading_answer(line)
+            self._inside_block(line)
+            return
+
+        match = _LINE.match(line)
+        kind = match.lastgroup if match else None
+        if self._awaiting_final and kind not in ("heading", "rule", "fence", "final"):
+            self._take_heading_answer(line)
+
+        if kind == "fence":
+            language = line[3:].strip().lower()
+            self._math_closer = line[:3]
+            self._math_lines = [] if language in _MATH_FENCES else None
+            self._continue_step(line)
+        elif kind == "math":
+            self._open_math(line)
+            self._continue_step(line)
+        elif kind == "rule":
+            self._close_step(completed)
+        elif kind == "step":
+            self._close_step(completed)
+            self._step, self._step_numbered = [line], True
+        elif kind == "heading":
+            self._close_step(completed)
+            self._section_lines.pop()
+            self._close_section()
+            self._section_title = _HEADING_MARKUP.sub("", line).strip().rstrip(":")
+            self._awaiting_final = bool(_FINAL_TITLE.match(self._section_title))
+        elif kind == "bullet" and not (self._step is not None and self._step_numbered):
+            self._close_step(completed)
+            self._step, self._step_numbered = [line], False
+        elif kind == "final":
+            self._close_step(completed)
+            self._final_answer = line[match.end():].strip(" *_")
+            self._final_from_heading = False
+            self._awaiting_final = False
+        else:
+            self._continue_step(line)
+
+    def _take_heading_answer(self, line: str):
+        boxed = _BOXED.search(line)
+        answer = boxed.group(1).strip() if boxed else line.strip("$\\[] ")
+        if not answer:
+            return
+        self._awaiting_final = False
+        if self._final_answer is None or self._final_from_heading:
+            self._final_answer = answer
+            self._final_from_heading = True
+
+    def _open_math(self, line: str):
+        closer = "$$" if line.startswith("$$") else "\\]"
+        body = line[2:]
+        if body.rstrip().endswith(closer):
+            block = body.rstrip()[:-2].strip()
+            if block:
+                self.math_blocks.append(block)
+            return
+        self._math_closer = closer
+        self._math_lines = [body] if body.strip() else []
+
+    def _inside_block(self, line: str):
+        closer = self._math_closer
+        fence = closer in ("```", "~~~")
+        ended = line.startswith(closer) if fence else line.endswith(closer)
+        if ended:
+            if not fence:
+                self._math_lines.append(line[:-2])
+            if self._math_lines:
+                block = "\n".join(self._math_lines).strip()
+                if block:
+                    self.math_blocks.append(block)
+            self._math_closer = None
+            self._math_lines = None
+        elif self._math_lines is not None:
+            self._math_lines.append(line)
+        self._continue_step(line)
+
+    def _continue_step(self, line: str):
+        if self._step is not None:
+            self._step.append(line)
+
+    def _close_step(self, completed: List[str]):
+        if self._step is None:
+            return
+        step = " ".join(self._step)
+        self._step = None
+        self._add_step(step, completed)
+
+    def _add_step(self, step: str, completed: List[str]):
+        if len(step) >= MIN_STEP_LENGTH and step not in self._seen_steps:
+            self._seen_steps.add(step)
+            self.steps.append(step)
+            completed.append(step)
+
+    def _close_section(self):
+        content = "\n".join(self._section_lines).strip()
+        if content or self._section_title:
+            self._sections.append(AnswerSection(title=self._section_title, content=content))
+        self._section_title = ""
+        self._section_lines = []
+
+    def _fallback_steps(self):
+        sentences = _SENTENCE_BREAK.split("".join(self._text), maxsplit=MAX_FALLBACK_STEPS)
+        for sentence in sentences[:MAX_FALLBACK_STEPS]:
+            self._add_step(" ".join(sentence.split()), [])
+
+
+def parse_answer(text: str) -> StructuredAnswer:
+    parser = AnswerParser()
+    parser.feed(text)
+    return parser.finish()
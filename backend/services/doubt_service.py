@@ -1,111 +1,644 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models.doubt import Doubt, DoubtCreate, DoubtResponse
-from services.ai_service import AIService
-from services.ocr_service import OCRService
-from typing import List, Optional
+from models.doubt import Doubt, DoubtAnswer, DoubtCreate, DoubtResponse, LLMUsage
+from services.ai_service import AIService, DEFAULT_IMAGE_QUESTION, PROMPT_VERSION, TRANSCRIBED_IMAGE_QUESTION
+from services.answer_cache import AnswerCache, served_answer
+from services.answer_parser import AnswerParser
+from services.question_index import QuestionIndex, same_problem
+from services.job_queue import DoubtJobQueue, JobWorkerPool
+from services.ocr_engine import AsyncOCREngine
+from services.ocr_service import ocr_failure_result
+from services.image_input import ImageInput
+from services.image_normalizer import ImageNormalizer
+from services.image_payload import ImagePayloadPolicy
+from services.image_hash import BAND_COUNT, hamming_distance, hash_bands, hash_to_hex
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import os
 import logging
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class DoubtService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, ocr_engine: Optional[AsyncOCREngine] = None):
         self.db = db
         self.ai_service = AIService()
-        self.ocr_service = OCRService()
+        self.answer_cache = AnswerCache(db)
+        self.ocr_engine = ocr_engine or AsyncOCREngine()
+        self.image_normalizer = ImageNormalizer()
+        # Sends image doubts to the LLM as OCR text or a cropped copy when that is enough
+        self.payload_policy = ImagePayloadPolicy()
+        # "serial" finishes OCR before the AI call; "speculative" (with an ocr_task) starts the
+        # AI call once OCR is done or the grace period is over, whichever comes first
+        self.image_pipeline_mode = os.getenv("IMAGE_PIPELINE_MODE", "serial").lower()
+        self.ocr_grace_seconds = float(os.getenv("IMAGE_OCR_GRACE_MS", "300")) / 1000
+        self.ocr_in_grace = 0
+        self.ocr_late = 0
+        # Photos of an already answered problem whose perceptual hashes differ by at
+        # most this many bits are reuse candidates (capped so band lookup stays exact).
+        # The pHash of a worksheet mostly captures its layout, so a candidate's answer
+        # is only reused when the OCR text also poses the same problem; off by default.
+        self.image_dedup_enabled = os.getenv("IMAGE_DEDUP_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.image_dedup_max_distance = min(int(os.getenv("IMAGE_DEDUP_MAX_DISTANCE", "6")), BAND_COUNT - 1)
+        self.image_dedup_min_text_similarity = float(os.getenv("IMAGE_DEDUP_MIN_TEXT_SIMILARITY", "0.8"))
+        self.image_dedup_confirmed = 0
+        self.image_dedup_rejected = 0
+        # "inline" answers inside the request, "queue" hands doubts to the job workers
+        self.processing_mode = os.getenv("DOUBT_PROCESSING_MODE", "inline").lower()
+        self.job_queue = DoubtJobQueue(db)
+        self.worker_pool = JobWorkerPool(self.job_queue, self.process_job, on_give_up=self._give_up_job)
+        # Reworded text questions (same numbers and operators, similar wording) reuse an earlier answer
+        self.question_index_enabled = os.getenv("QUESTION_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.question_index = QuestionIndex(
+            threshold=float(os.getenv("QUESTION_INDEX_THRESHOLD", "0.75")),
+            max_entries=int(os.getenv("QUESTION_INDEX_MAX_ENTRIES", "50000"))
+        )
     
-    async def create_doubt(self, user_id: str, doubt_data: DoubtCreate) -> DoubtResponse:
-        """Create a new doubt and process it with AI"""
+    async def ensure_indexes(self):
+        """Create the indexes the doubt lookups rely on"""
+        await self.db.doubts.create_index([("image_phash_bands", 1), ("subject", 1)])
+        await self.answer_cache.ensure_indexes()
+        await self.job_queue.ensure_indexes()
+    
+    async def get_metrics(self) -> Dict[str, Any]:
+        try:
+            queue_stats = await self.job_queue.get_stats()
+        except Exception as e:
+            logger.warning(f"Job queue stats unavailable: {str(e)}")
+            queue_stats = {}
+        queue_stats.update(mode=self.processing_mode, **self.worker_pool.get_stats())
+        
+        return {
+            "answer_cache": self.answer_cache.get_stats(),
+            "question_index": self.question_index.get_stats(),
+            "job_queue": queue_stats,
+            "image_payload": self.payload_policy.get_stats(),
+            "image_pipeline": {
+                "mode": self.image_pipeline_mode,
+                "ocr_grace_ms": self.ocr_grace_seconds * 1000,
+                "ocr_in_grace": self.ocr_in_grace,
+                "ocr_late": self.ocr_late
+            },
+            "image_dedup": {
+                "enabled": self.image_dedup_enabled,
+                "confirmed": self.image_dedup_confirmed,
+                "rejected": self.image_dedup_rejected
+            },
+            "ai": self.ai_service.get_stats(),
+            "ocr": self.ocr_engine.get_stats()
+        }
+    
+    async def answer_text_question(
+        self,
+        question: str,
+        subject: str,
+        bypass_cache: bool = False,
+        user_id: Optional[str] = None
+    ) -> DoubtAnswer:
+        """Answer a text question, serving identical (normalized) questions from the answer cache"""
+        key = self.answer_cache.make_key(subject, question, PROMPT_VERSION)
+        if bypass_cache:
+            self.answer_cache.bypasses += 1
+        else:
+            answer = await self.answer_cache.get(key)
+            if answer is not None:
+                logger.info("Answer cache hit for text question")
+                return answer
+        
+        answer = await self.ai_service.process_text_question(question, subject, user_id=user_id)
+        await self.answer_cache.set(key, answer, subject, PROMPT_VERSION)
+        return answer
+    
+    async def rebuild_question_index(self) -> int:
+        """Load the most recent answered text doubts into the question index"""
+        if not self.question_index_enabled:
+            return 0
+        
+        cursor = self.db.doubts.find(
+            {"question_type": "text", "status": "answered", "reused_from": None},
+            {"_id": 0, "id": 1, "question": 1, "subject": 1}
+        ).sort("created_at", -1).limit(self.question_index.max_entries)
+        docs = await cursor.to_list(length=None)
+        
+        def build():
+            self.question_index.clear()
+            # Oldest first, so the newest doubts are the last to be evicted
+            for doubt_doc in reversed(docs):
+                self.question_index.add(doubt_doc["id"], doubt_doc["question"], doubt_doc["subject"])
+        
+        await asyncio.to_thread(build)
+        return len(self.question_index)
+    
+    async def find_similar_text_doubt(self, question: str, subject: str) -> Optional[Dict[str, Any]]:
+        """Find an answered text doubt whose question is a rewording of `question`"""
+        if not self.question_index_enabled:
+            return None
+        
         try:
-            # Initialize OCR data
-            ocr_data = None
-            
-            # If it's an image question, extract OCR data for additional context
-            if doubt_data.question_type == "image" and doubt_data.image_data:
-                ocr_result = self.ocr_service.extract_text_from_base64(doubt_data.image_data)
-                if ocr_result["success"]:
-                    ocr_data = {
-                        "extracted_text": ocr_result["extracted_text"],
-                        "confidence_scores": ocr_result["confidence_scores"],
-                        "preprocessing_used": ocr_result["preprocessing_used"],
-                        "average_confidence": ocr_result.get("average_confidence", 0)
-                    }
-                    logger.info(f"OCR extraction successful: {len(ocr_result['extracted_text'])} characters extracted")
-            
-            # Create doubt instance
-            doubt = Doubt(
-                user_id=user_id,
-                question=doubt_data.question,
-                subject=doubt_data.subject,
-                question_type=doubt_data.question_type,
-                image_data=doubt_data.image_data,
-                ocr_data=ocr_data,
-                status="processing"
+            match = self.question_index.query(question, subject)
+            if match is None:
+                return None
+            
+            doubt_id, similarity = match
+            doubt_doc = await self.db.doubts.find_one(
+                {"id": doubt_id, "status": "answered"},
+                {"_id": 0, "id": 1, "answer": 1, "reused_from": 1}
             )
+            if not doubt_doc:
+                # Deleted since it was indexed
+                self.question_index.remove(doubt_id)
+                return None
             
-            # Insert into database
-            await self.db.doubts.insert_one(doubt.dict())
-            
-            # Process with AI in background (for now, process immediately)
-            try:
-                if doubt_data.question_type == "image" and doubt_data.image_data:
-                    # For image questions, use enhanced question with OCR context
-                    enhanced_question = doubt_data.question
-                    if ocr_data and ocr_data["extracted_text"]:
-                        context_info = f"\n\nOCR extracted text (confidence: {ocr_data.get('average_confidence', 0):.1f}%): {ocr_data['extracted_text']}"
-                        enhanced_question += context_info
-                    
-                    answer = await self.ai_service.process_image_question(
-                        enhanced_question,
-                        doubt_data.subject,
-                        doubt_data.image_data
-                    )
+            logger.info(f"Similar question found: doubt {doubt_id} at similarity {similarity:.2f}")
+            return doubt_doc
+            
+        except Exception as e:
+            logger.warning(f"Similar question lookup failed: {str(e)}")
+            return None
+    
+    async def find_similar_image_doubt(
+        self,
+        image: ImageInput,
+        subject: str,
+        ocr_result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find an answered single-image doubt showing the same problem as `image`.
+        
+        Candidates are near-duplicates by perceptual hash, nearest first; the
+        first whose stored OCR text poses the same problem as `ocr_result`
+        (see same_problem) is returned. Without OCR text nothing is reused.
+        """
+        if not self.image_dedup_enabled:
+            return None
+        text = ocr_result.get("extracted_text") if ocr_result.get("success") else ""
+        if not text:
+            return None
+        
+        try:
+            phash = await asyncio.to_thread(lambda: image.phash)
+            cursor = self.db.doubts.find(
+                {
+                    "image_phash_bands": {"$in": hash_bands(phash)},
+                    "subject": subject,
+                    "status": "answered",
+                    "additional_images": None
+                },
+                {"_id": 0, "id": 1, "image_phash": 1, "ocr_data": 1, "answer": 1, "reused_from": 1}
+            ).sort("created_at", -1).limit(50)
+            
+            candidates = []
+            async for doubt_doc in cursor:
+                distance = hamming_distance(phash, int(doubt_doc["image_phash"], 16))
+                if distance <= self.image_dedup_max_distance:
+                    candidates.append((distance, doubt_doc))
+            
+            candidates.sort(key=lambda candidate: candidate[0])
+            for distance, doubt_doc in candidates:
+                stored_text = (doubt_doc.get("ocr_data") or {}).get("extracted_text") or ""
+                if same_problem(text, stored_text, self.image_dedup_min_text_similarity):
+                    self.image_dedup_confirmed += 1
+                    logger.info(f"Near-duplicate image found: doubt {doubt_doc['id']} at distance {distance}")
+                    return doubt_doc
+            if candidates:
+                # Same layout, different problem
+                self.image_dedup_rejected += 1
+            return None
+            
+        except Exception as e:
+            logger.warning(f"Near-duplicate image lookup failed: {str(e)}")
+            return None
+    
+    async def _insert_doubt(
+        self,
+        user_id: str,
+        doubt_data: DoubtCreate,
+        ocr_result: Optional[Dict[str, Any]],
+        image: Optional[ImageInput],
+        reuse_from: Optional[Dict[str, Any]],
+        ocr_task: Optional[asyncio.Future] = None,
+        wait_for_ocr: bool = True,
+        additional_images: Optional[List[str]] = None,
+        bypass_cache: bool = False
+    ) -> Tuple[Doubt, Optional[Dict[str, Any]], Optional[asyncio.Future]]:
+        """Run OCR and the reuse lookups, then store the doubt as processing
+
+        `ocr_task` is OCR already running for the image. Unless `wait_for_ocr`,
+        it is awaited only for the grace period; when it is still running it is
+        returned (as the third value) for _finish_ocr to store later.
+        """
+        # Initialize OCR data
+        ocr_data = None
+        late_ocr = None
+        
+        # If it's an image question, extract OCR data for additional context
+        if doubt_data.question_type == "image" and doubt_data.image_data:
+            if image is None:
+                try:
+                    image = await asyncio.to_thread(self.image_normalizer.load_base64, doubt_data.image_data)
+                except ValueError as e:
+                    logger.warning(f"Could not decode image for OCR: {str(e)}")
+            if ocr_result is None and ocr_task is not None:
+                done, _ = await asyncio.wait({ocr_task}, timeout=None if wait_for_ocr else self.ocr_grace_seconds)
+                if done:
+                    ocr_result = self._ocr_task_result(ocr_task)
+                    if not wait_for_ocr:
+                        self.ocr_in_grace += 1
                 else:
-                    answer = await self.ai_service.process_text_question(
-                        doubt_data.question,
-                        doubt_data.subject
+                    self.ocr_late += 1
+                    late_ocr = ocr_task
+                    logger.info(f"OCR not done within {self.ocr_grace_seconds * 1000:.0f}ms, asking the AI without it")
+            elif ocr_result is None:
+                if image is not None:
+                    ocr_result = await self.ocr_engine.extract_text_from_image(
+                        image.array, cache_key=self.image_normalizer.cache_key(image)
                     )
-                
-                # Update doubt with answer
-                doubt.answer = answer
-                doubt.status = "answered"
-                doubt.updated_at = datetime.utcnow()
-                
-                # Update in database
-                await self.db.doubts.update_one(
-                    {"id": doubt.id},
-                    {"$set": {
-                        "answer": answer.dict(),
-                        "status": "answered",
-                        "updated_at": doubt.updated_at
-                    }}
-                )
-                
-            except Exception as ai_error:
-                logger.error(f"AI processing error: {str(ai_error)}")
-                doubt.status = "failed"
-                await self.db.doubts.update_one(
-                    {"id": doubt.id},
-                    {"$set": {"status": "failed", "updated_at": datetime.utcnow()}}
-                )
+                else:
+                    ocr_result = ocr_failure_result("Invalid image data")
+            if ocr_result is not None:
+                ocr_data = self._ocr_data(ocr_result)
+        
+        if doubt_data.question_type == "text" and reuse_from is None and not bypass_cache:
+            reuse_from = await self.find_similar_text_doubt(doubt_data.question, doubt_data.subject)
+        
+        # Create doubt instance
+        doubt = Doubt(
+            user_id=user_id,
+            question=doubt_data.question,
+            subject=doubt_data.subject,
+            question_type=doubt_data.question_type,
+            image_data=doubt_data.image_data,
+            additional_images=additional_images,
+            ocr_data=ocr_data,
+            status="processing"
+        )
+        if image is not None and not additional_images:
+            phash = await asyncio.to_thread(lambda: image.phash)
+            doubt.image_phash = hash_to_hex(phash)
+            doubt.image_phash_bands = hash_bands(phash)
+        if reuse_from:
+            doubt.reused_from = reuse_from.get("reused_from") or reuse_from["id"]
+        
+        # Insert into database
+        await self.db.doubts.insert_one(doubt.dict())
+        return doubt, reuse_from, late_ocr
+    
+    @staticmethod
+    def _ocr_data(ocr_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The part of an OCR result stored with the doubt, None when OCR failed"""
+        if not ocr_result["success"]:
+            return None
+        ocr_data = {
+            "extracted_text": ocr_result["extracted_text"],
+            "confidence_scores": ocr_result["confidence_scores"],
+            "preprocessing_used": ocr_result["preprocessing_used"],
+            "average_confidence": ocr_result.get("average_confidence", 0)
+        }
+        for key in ("image_normalization", "text_regions", "text_coverage", "pages"):
+            if ocr_result.get(key) is not None:
+                ocr_data[key] = ocr_result[key]
+        logger.info(f"OCR extraction successful: {len(ocr_result['extracted_text'])} characters extracted")
+        return ocr_data
+    
+    @staticmethod
+    def _ocr_task_result(ocr_task: asyncio.Future) -> Dict[str, Any]:
+        try:
+            return ocr_task.result()
+        except Exception as e:
+            logger.error(f"OCR extraction failed: {str(e)}")
+            return ocr_failure_result(str(e))
+    
+    async def _finish_ocr(self, doubt: Doubt, ocr_task: asyncio.Future):
+        """Wait for OCR that missed the grace period and store it with the doubt, for the record"""
+        await asyncio.wait({ocr_task})
+        ocr_data = self._ocr_data(self._ocr_task_result(ocr_task))
+        if ocr_data is None:
+            return
+        doubt.ocr_data = ocr_data
+        try:
+            await self.db.doubts.update_one({"id": doubt.id}, {"$set": {"ocr_data": ocr_data}})
+        except Exception as e:
+            logger.warning(f"Could not store late OCR for doubt {doubt.id}: {str(e)}")
+    
+    async def create_doubt(
+        self,
+        user_id: str,
+        doubt_data: DoubtCreate,
+        ocr_result: Optional[Dict[str, Any]] = None,
+        image: Optional[ImageInput] = None,
+        reuse_from: Optional[Dict[str, Any]] = None,
+        background: Optional[bool] = None,
+        ocr_task: Optional[asyncio.Future] = None,
+        additional_images: Optional[List[str]] = None,
+        bypass_cache: bool = False
+    ) -> DoubtResponse:
+        """Create a new doubt and process it with AI
+
+        Callers that already decoded the image or ran OCR on it pass `image` and
+        `ocr_result` so neither is done twice; with IMAGE_PIPELINE_MODE=speculative
+        they pass the running OCR as `ocr_task` instead, and the AI call starts
+        without waiting more than the grace period for it. `reuse_from` is an
+        answered doubt (see find_similar_image_doubt) whose answer is copied
+        instead of calling the AI. With `background` (default:
+        DOUBT_PROCESSING_MODE=queue) the doubt is returned still processing and
+        answered by the job workers. `additional_images` are the further pages
+        of a batch question, already validated by the batch route; they are not
+        part of DoubtCreate so public callers cannot attach unchecked images.
+        Likewise `bypass_cache` (always ask the AI) is only set by authenticated
+        routes, so the demo endpoint always goes through the answer cache.
+        """
+        try:
+            if background is None:
+                background = self.processing_mode == "queue"
             
-            return DoubtResponse(
-                id=doubt.id,
-                question=doubt.question,
-                subject=doubt.subject,
-                question_type=doubt.question_type,
-                image_data=doubt.image_data,
-                ocr_data=doubt.ocr_data,
-                answer=doubt.answer,
-                status=doubt.status,
-                created_at=doubt.created_at,
-                updated_at=doubt.updated_at
+            # Queued doubts are answered later anyway, so they keep the full OCR context
+            doubt, reuse_from, late_ocr = await self._insert_doubt(
+                user_id, doubt_data, ocr_result, image, reuse_from, ocr_task,
+                wait_for_ocr=background, additional_images=additional_images, bypass_cache=bypass_cache
             )
             
+            if reuse_from:
+                answer = served_answer(reuse_from["answer"])
+                logger.info(f"Reusing answer of doubt {doubt.reused_from}")
+                await self._save_answer(doubt, answer)
+            elif background:
+                # Answered by the worker pool; clients poll GET /questions/{id}/status
+                await self.job_queue.enqueue(doubt.id, {"bypass_cache": bypass_cache})
+            else:
+                try:
+                    answer = await self._generate_answer(doubt, bypass_cache=bypass_cache, image=image)
+                    await self._save_answer(doubt, answer)
+                except Exception as ai_error:
+                    logger.error(f"AI processing error: {str(ai_error)}")
+                    await self._mark_failed(doubt)
+            
+            if late_ocr is not None:
+                await self._finish_ocr(doubt, late_ocr)
+            return self._to_response(doubt)
+            
         except Exception as e:
             logger.error(f"Error creating doubt: {str(e)}")
             raise Exception("Failed to create doubt")
     
+    async def stream_doubt(
+        self,
+        user_id: str,
+        doubt_data: DoubtCreate,
+        ocr_result: Optional[Dict[str, Any]] = None,
+        image: Optional[ImageInput] = None,
+        reuse_from: Optional[Dict[str, Any]] = None,
+        ocr_task: Optional[asyncio.Future] = None,
+        bypass_cache: bool = False
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Create a doubt and yield its answer while it is generated, as (event, data) pairs
+
+        "doubt" once the doubt is stored, "token" for each chunk of response text,
+        "step" for each step as soon as later text can no longer change it, then
+        "done" with the stored doubt (whose steps are authoritative) or "error".
+        If the consumer stops early the doubt is marked failed.
+        """
+        doubt, reuse_from, late_ocr = await self._insert_doubt(
+            user_id, doubt_data, ocr_result, image, reuse_from, ocr_task,
+            wait_for_ocr=False, bypass_cache=bypass_cache
+        )
+        yield "doubt", {"id": doubt.id, "status": doubt.status}
+        
+        finished = False
+        try:
+            answer = None
+            cache_key = None
+            if reuse_from:
+                answer = served_answer(reuse_from["answer"])
+                logger.info(f"Reusing answer of doubt {doubt.reused_from}")
+            elif doubt.question_type == "text":
+                cache_key = self.answer_cache.make_key(doubt.subject, doubt.question, PROMPT_VERSION)
+                if bypass_cache:
+                    self.answer_cache.bypasses += 1
+                else:
+                    answer = await self.answer_cache.get(cache_key)
+            
+            emitted_steps = 0
+            if answer is None:
+                chunks = []
+                parser = AnswerParser()
+                usage = {}
+                async for chunk in self._stream_answer(doubt, image, usage):
+                    chunks.append(chunk)
+                    yield "token", {"text": chunk}
+                    for step in parser.feed(chunk):
+                        yield "step", {"index": emitted_steps, "step": step}
+                        emitted_steps += 1
+                
+                answer = self.ai_service.build_answer(
+                    "".join(chunks), parser, usage=LLMUsage(**usage) if usage else None
+                )
+                if cache_key is not None:
+                    await self.answer_cache.set(cache_key, answer, doubt.subject, PROMPT_VERSION)
+            else:
+                yield "token", {"text": answer.solution}
+            
+            for index in range(emitted_steps, len(answer.steps)):
+                yield "step", {"index": index, "step": answer.steps[index]}
+            
+            await self._save_answer(doubt, answer)
+            if late_ocr is not None:
+                await self._finish_ocr(doubt, late_ocr)
+                late_ocr = None
+            finished = True
+            yield "done", self._to_response(doubt).dict()
+            
+        except Exception as ai_error:
+            logger.error(f"AI streaming error: {str(ai_error)}")
+            await self._mark_failed(doubt)
+            finished = True
+            yield "error", {"id": doubt.id, "detail": "Failed to process question"}
+        
+        finally:
+            if not finished:
+                # Client went away mid-answer
+                await asyncio.shield(self._mark_failed(doubt))
+            if late_ocr is not None:
+                await asyncio.shield(self._finish_ocr(doubt, late_ocr))
+    
+    def _to_response(self, doubt: Doubt) -> DoubtResponse:
+        return DoubtResponse(
+            id=doubt.id,
+            question=doubt.question,
+            subject=doubt.subject,
+            question_type=doubt.question_type,
+            image_data=doubt.image_data,
+            additional_images=doubt.additional_images,
+            ocr_data=doubt.ocr_data,
+            answer=doubt.answer,
+            reused_from=doubt.reused_from,
+            status=doubt.status,
+            created_at=doubt.created_at,
+            updated_at=doubt.updated_at
+        )
+    
+    async def _image_request(self, doubt: Doubt, image: Optional[ImageInput]) -> Tuple[str, Optional[str]]:
+        """
+        Question and image data to send for an image doubt.
+        
+        The image data is None when the OCR text replaces the image, in which
+        case the question carries the transcription and goes down the text path.
+        """
+        # For image questions, use enhanced question with OCR context
+        enhanced_question = doubt.question
+        ocr_data = doubt.ocr_data
+        if ocr_data and ocr_data["extracted_text"]:
+            context_info = f"\n\nOCR extracted text (confidence: {ocr_data.get('average_confidence', 0):.1f}%): {ocr_data['extracted_text']}"
+            enhanced_question += context_info
+        
+        if not self.payload_policy.enabled or doubt.additional_images:
+            # The compact normalized copy when we decoded the image, else what we were given
+            llm_image_data = (
+                await asyncio.to_thread(lambda: image.llm_base64) if image is not None
+                else doubt.image_data
+            )
+            return enhanced_question, llm_image_data
+        
+        try:
+            if image is None:
+                # Queued doubts are answered without the request's decoded image
+                image = await asyncio.to_thread(self.image_normalizer.load_base64, doubt.image_data)
+            payload = await asyncio.to_thread(self.payload_policy.choose, image, doubt.question, ocr_data)
+        except Exception as e:
+            logger.warning(f"Image payload selection failed for doubt {doubt.id}, sending the image as is: {str(e)}")
+            if image is None:
+                return enhanced_question, doubt.image_data
+            return enhanced_question, await asyncio.to_thread(lambda: image.llm_base64)
+        
+        doubt.llm_payload = payload.summary()
+        logger.info(
+            f"Doubt {doubt.id} LLM payload: {payload.mode} ({payload.reason}), "
+            f"{payload.sent_bytes} of {payload.full_bytes} bytes, {payload.full_bytes - payload.sent_bytes} saved"
+        )
+        if payload.mode == "text":
+            question = TRANSCRIBED_IMAGE_QUESTION(
+                question=doubt.question.strip() or DEFAULT_IMAGE_QUESTION, text=ocr_data["extracted_text"]
+            )
+            return question, None
+        return enhanced_question, payload.image_base64
+    
+    async def _generate_answer(self, doubt: Doubt, bypass_cache: bool = False, image: Optional[ImageInput] = None) -> DoubtAnswer:
+        """Ask the AI (or the answer cache) for a stored doubt"""
+        if doubt.question_type == "image" and doubt.image_data:
+            enhanced_question, llm_image_data = await self._image_request(doubt, image)
+            if llm_image_data is None:
+                return await self.answer_text_question(
+                    enhanced_question, doubt.subject, bypass_cache=bypass_cache, user_id=doubt.user_id
+                )
+            return await self.ai_service.process_image_question(
+                enhanced_question,
+                doubt.subject,
+                llm_image_data,
+                additional_images=doubt.additional_images,
+                user_id=doubt.user_id
+            )
+        
+        return await self.answer_text_question(
+            doubt.question, doubt.subject, bypass_cache=bypass_cache, user_id=doubt.user_id
+        )
+    
+    async def _stream_answer(
+        self,
+        doubt: Doubt,
+        image: Optional[ImageInput] = None,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Streaming counterpart of _generate_answer (without the answer cache); `usage` is filled at the end"""
+        if doubt.question_type == "image" and doubt.image_data:
+            enhanced_question, llm_image_data = await self._image_request(doubt, image)
+            if llm_image_data is None:
+                stream = self.ai_service.stream_text_question(
+                    enhanced_question, doubt.subject, user_id=doubt.user_id, usage=usage
+                )
+            else:
+                stream = self.ai_service.stream_image_question(
+                    enhanced_question,
+                    doubt.subject,
+                    llm_image_data,
+                    additional_images=doubt.additional_images,
+                    user_id=doubt.user_id,
+                    usage=usage
+                )
+        else:
+            stream = self.ai_service.stream_text_question(
+                doubt.question, doubt.subject, user_id=doubt.user_id, usage=usage
+            )
+        
+        async for chunk in stream:
+            yield chunk
+    
+    async def _save_answer(self, doubt: Doubt, answer: DoubtAnswer):
+        doubt.answer = answer
+        doubt.status = "answered"
+        doubt.updated_at = datetime.utcnow()
+        
+        await self.db.doubts.update_one(
+            {"id": doubt.id},
+            {"$set": {
+                "answer": answer.dict(),
+                "status": "answered",
+                "llm_payload": doubt.llm_payload,
+                "updated_at": doubt.updated_at
+            }}
+        )
+        
+        if doubt.question_type == "text" and not doubt.reused_from and self.question_index_enabled:
+            self.question_index.add(doubt.id, doubt.question, doubt.subject)
+    
+    async def _mark_failed(self, doubt: Doubt):
+        doubt.status = "failed"
+        doubt.updated_at = datetime.utcnow()
+        await self.db.doubts.update_one(
+            {"id": doubt.id},
+            {"$set": {"status": "failed", "llm_payload": doubt.llm_payload, "updated_at": doubt.updated_at}}
+        )
+    
+    async def process_job(self, job: Dict[str, Any]):
+        """Job worker handler: answer a queued doubt (raises to have the job retried)"""
+        doubt_doc = await self.db.doubts.find_one({"id": job["doubt_id"]}, {"_id": 0})
+        if not doubt_doc or doubt_doc["status"] != "processing":
+            # Deleted, or answered by an earlier attempt that died before completing the job
+            return
+        
+        doubt = Doubt(**doubt_doc)
+        answer = await self._generate_answer(doubt, bypass_cache=job["payload"].get("bypass_cache", False))
+        await self._save_answer(doubt, answer)
+    
+    async def _give_up_job(self, job: Dict[str, Any], error: str):
+        doubt_doc = await self.db.doubts.find_one({"id": job["doubt_id"]}, {"_id": 0})
+        if doubt_doc and doubt_doc["status"] == "processing":
+            await self._mark_failed(Doubt(**doubt_doc))
+    
+    def start_workers(self):
+        if self.processing_mode == "queue":
+            self.worker_pool.start()
+    
+    async def stop_workers(self):
+        await self.worker_pool.stop()
+    
+    async def get_processing_status(self, doubt_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Doubt status plus, for queued doubts, the state of its job"""
+        doubt_doc = await self.db.doubts.find_one(
+            {"id": doubt_id, "user_id": user_id},
+            {"_id": 0, "id": 1, "status": 1, "updated_at": 1}
+        )
+        if not doubt_doc:
+            return None
+        
+        job = await self.job_queue.get_job(doubt_id)
+        if job:
+            doubt_doc["job"] = {
+                "status": job["status"],
+                "attempts": job["attempts"],
+                "last_error": job.get("last_error"),
+                "available_at": job.get("available_at")
+            }
+        return doubt_doc
+    
     async def get_user_doubts(self, user_id: str, skip: int = 0, limit: int = 50) -> List[DoubtResponse]:
         """Get all doubts for a user"""
         try:
@@ -121,8 +654,10 @@ class DoubtService:
                     subject=doubt_doc["subject"],
                     question_type=doubt_doc["question_type"],
                     image_data=doubt_doc.get("image_data"),
+                    additional_images=doubt_doc.get("additional_images"),
                     ocr_data=doubt_doc.get("ocr_data"),
                     answer=doubt_doc.get("answer"),
+                    reused_from=doubt_doc.get("reused_from"),
                     status=doubt_doc["status"],
                     created_at=doubt_doc["created_at"],
                     updated_at=doubt_doc["updated_at"]
@@ -152,8 +687,10 @@ class DoubtService:
                 subject=doubt_doc["subject"],
                 question_type=doubt_doc["question_type"],
                 image_data=doubt_doc.get("image_data"),
+                additional_images=doubt_doc.get("additional_images"),
                 ocr_data=doubt_doc.get("ocr_data"),
                 answer=doubt_doc.get("answer"),
+                reused_from=doubt_doc.get("reused_from"),
                 status=doubt_doc["status"],
                 created_at=doubt_doc["created_at"],
                 updated_at=doubt_doc["updated_at"]
@@ -170,6 +707,8 @@ class DoubtService:
                 "id": doubt_id,
                 "user_id": user_id
             })
+            if result.deleted_count:
+                self.question_index.remove(doubt_id)
             
             return result.deleted_count > 0
             
@@ -0,0 +1,98 @@
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "user_a=2,user_b=0.5" into {"user_a": 2.0, "user_b": 0.5}"""
+    weights = {}
+    for item in spec.split(","):
+        if "=" in item:
+            flow, weight = item.split("=", 1)
+            weights[flow.strip()] = float(weight)
+    return weights
+
+
+class FairQueue:
+    """
+    Weighted fair queue of waiters, one flow per user.
+
+    Start-time fair queuing: a waiter's start tag is the later of the current
+    virtual time and its flow's previous finish tag, and its finish tag adds
+    cost / weight. Waiters are served in start-tag order, so every backlogged
+    flow gets capacity in proportion to its weight no matter how many
+    requests it has queued, and an idle flow starts at the current virtual
+    time rather than with saved-up credit.
+    """
+
+    def __init__(self, default_weight: float = 1.0, weights: Optional[Dict[str, float]] = None, max_per_flow: int = 0):
+        self.default_weight = default_weight
+        self.weights = weights or {}
+        self.max_per_flow = max_per_flow
+        self._heap: List[Tuple[float, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._finish_tags: Dict[str, float] = {}
+        self._queued: Dict[str, int] = {}
+        self._virtual_time = 0.0
+        # Idle flows are swept from _finish_tags once it has doubled since the last sweep
+        self._sweep_at = 64
+
+    def weight(self, flow: str) -> float:
+        return self.weights.get(flow, self.default_weight)
+
+    def depth(self, flow: Optional[str] = None) -> int:
+        """Live waiters, for one flow or in total"""
+        if flow is not None:
+            return self._queued.get(flow, 0)
+        return sum(self._queued.values())
+
+    def push(self, flow: str, cost: float = 1.0) -> Optional[asyncio.Future]:
+        """Queue a waiter for `flow`; None when the flow already has max_per_flow waiting"""
+        if self.max_per_flow and self._queued.get(flow, 0) >= self.max_per_flow:
+            return None
+
+        start = max(self._virtual_time, self._finish_tags.get(flow, 0.0))
+        self._finish_tags[flow] = start + cost / self.weight(flow)
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiter.add_done_callback(lambda _, flow=flow: self._left(flow))
+        self._queued[flow] = self._queued.get(flow, 0) + 1
+        heapq.heappush(self._heap, (start, next(self._sequence), flow, waiter))
+        return waiter
+
+    def _left(self, flow: str):
+        self._queued[flow] -= 1
+        if not self._queued[flow]:
+            del self._queued[flow]
+
+    def pop(self, eligible: Callable[[str], bool] = lambda flow: True) -> Optional[Tuple[str, asyncio.Future]]:
+        """Remove and return the live waiter with the lowest start tag whose flow is eligible"""
+        skipped = []
+        found = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            start, _, flow, waiter = entry
+            if waiter.done():
+                continue
+            if not eligible(flow):
+                skipped.append(entry)
+                continue
+            self._virtual_time = max(self._virtual_time, start)
+            found = (flow, waiter)
+            break
+
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        if not self._heap or len(self._finish_tags) >= self._sweep_at:
+            self._forget_idle_flows()
+        return found
+
+    def _forget_idle_flows(self):
+        # A finish tag behind the virtual time of a flow with nothing queued carries no
+        # information any more: the flow's next waiter starts at the virtual time anyway
+        self._finish_tags = {
+            flow: tag for flow, tag in self._finish_tags.items()
+            if tag > self._virtual_time or flow in self._queued
+        }
+        self._sweep_at = max(64, 2 * len(self._finish_tags))
@@ -0,0 +1,46 @@
+from typing import List
+
+import cv2
+import numpy as np
+
+HASH_BITS = 64
+BAND_BITS = 8
+BAND_COUNT = HASH_BITS // BAND_BITS
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """
+    64-bit DCT perceptual hash (pHash) of a BGR or grayscale image.
+
+    The image is reduced to 32x32, transformed with a DCT, and the 8x8 lowest
+    frequencies (minus the DC term's influence, via the median) become the bits.
+    Re-photographing the same page with different exposure, scale or JPEG
+    quality flips only a few bits.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_frequencies = cv2.dct(small)[:8, :8].flatten()
+    bits = low_frequencies > np.median(low_frequencies[1:])
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def hash_to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hash_bands(value: int) -> List[str]:
+    """
+    Split a hash into 8 tagged 8-bit bands for an indexed lookup.
+
+    Two hashes within Hamming distance 7 always share at least one band
+    (pigeonhole), so an `$in` query over the bands finds every such candidate.
+    """
+    return [f"{i}:{(value >> (BAND_BITS * i)) & 0xFF:02x}" for i in range(BAND_COUNT)]
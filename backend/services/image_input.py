@@ -0,0 +1,116 @@
+import base64
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from services.image_hash import perceptual_hash
+
+
+class ImageInput:
+    """
+    An uploaded image decoded exactly once.
+
+    Carries the original encoded bytes, the upright BGR pixel array used for OCR
+    and the validated metadata. Derived forms (content hash, the compact LLM
+    JPEG and its base64) are produced on first use and then reused, so base64
+    only ever exists at the edges that need it: storage and the LLM call.
+    """
+
+    def __init__(
+        self,
+        data: bytes,
+        array: np.ndarray,
+        image_format: str,
+        original_size: Tuple[int, int],
+        exif_rotated: bool = False,
+        llm_max_edge: int = 0,
+        llm_jpeg_quality: int = 80,
+        digest: Optional[str] = None
+    ):
+        self.data = data
+        self.array = array
+        self.format = image_format
+        self.original_size = original_size
+        self.exif_rotated = exif_rotated
+        self.llm_max_edge = llm_max_edge
+        self.llm_jpeg_quality = llm_jpeg_quality
+        # Given explicitly for images that have no upload bytes of their own (PDF pages)
+        self._digest = digest
+        self._llm_bytes: Optional[bytes] = None
+        self._llm_base64: Optional[str] = None
+        self._phash: Optional[int] = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) of the decoded array"""
+        return self.array.shape[1], self.array.shape[0]
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the original upload bytes"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @property
+    def phash(self) -> int:
+        """Perceptual hash of the pixels, stable across re-photographs of the same page"""
+        if self._phash is None:
+            self._phash = perceptual_hash(self.array)
+        return self._phash
+
+    @property
+    def llm_bytes(self) -> bytes:
+        """Compact JPEG for the LLM, or the original upload when that is already smaller"""
+        if self._llm_bytes is None:
+            image = self.array
+            width, height = self.size
+            if self.llm_max_edge and max(width, height) > self.llm_max_edge:
+                scale = self.llm_max_edge / max(width, height)
+                image = cv2.resize(
+                    image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                    interpolation=cv2.INTER_AREA
+                )
+
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.llm_jpeg_quality])
+            if not ok:
+                raise ValueError("Could not encode image for upload")
+            llm_bytes = encoded.tobytes()
+
+            keep_original = (
+                self.format in ("jpeg", "png") and not self.exif_rotated and
+                image.shape[:2] == (self.original_size[1], self.original_size[0]) and
+                len(llm_bytes) >= len(self.data)
+            )
+            self._llm_bytes = bytes(self.data) if keep_original else llm_bytes
+        return self._llm_bytes
+
+    @property
+    def llm_base64(self) -> str:
+        if self._llm_base64 is None:
+            self._llm_base64 = base64.b64encode(self.llm_bytes).decode("utf-8")
+        return self._llm_base64
+
+    def validation_info(self) -> Dict[str, Any]:
+        """Same shape as OCRService.validate_image for a valid image"""
+        return {
+            "valid": True,
+            "format": self.format,
+            "size": self.original_size,
+            "mode": "RGB"
+        }
+
+    def info(self) -> Dict[str, Any]:
+        """Normalization summary stored with the doubt"""
+        info = {
+            "original_format": self.format,
+            "original_size": list(self.original_size),
+            "ocr_size": list(self.size),
+            "exif_rotated": self.exif_rotated,
+            "original_bytes": len(self.data)
+        }
+        if self._llm_bytes is not None:
+            info["llm_bytes"] = len(self._llm_bytes)
+        return info
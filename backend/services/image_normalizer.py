@@ -0,0 +1,178 @@
+import base64
+import io
+import math
+import os
+import logging
+import hashlib
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from services.image_input import ImageInput
+
+try:
+    import fitz  # PyMuPDF, used to rasterize PDF uploads
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+# cv2.imdecode flags that decode JPEGs directly at 1/2, 1/4 and 1/8 scale
+_REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+class ImageNormalizer:
+    """
+    Decodes and normalizes uploaded photos once, before OCR and the LLM see them.
+
+    - applies the EXIF orientation so sideways phone photos are upright
+    - caps the pixel count of the OCR copy (text stays well above Tesseract's
+      useful resolution while full-sensor photos stop dominating OCR time)
+    - re-encodes a smaller JPEG copy for the LLM upload
+    """
+
+    def __init__(self):
+        self.ocr_max_pixels = int(os.getenv("IMAGE_OCR_MAX_PIXELS", "4000000"))
+        self.llm_max_edge = int(os.getenv("IMAGE_LLM_MAX_EDGE", "1600"))
+        self.llm_jpeg_quality = int(os.getenv("IMAGE_LLM_JPEG_QUALITY", "80"))
+
+    @property
+    def signature(self) -> str:
+        """Identifies the settings, so cached OCR results follow configuration changes"""
+        return f"ocr{self.ocr_max_pixels}"
+
+    @staticmethod
+    def _fit_pixels(size: Tuple[int, int], max_pixels: int) -> Tuple[int, int]:
+        width, height = size
+        if max_pixels <= 0 or width * height <= max_pixels:
+            return width, height
+        scale = math.sqrt(max_pixels / (width * height))
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def cache_key(self, image: ImageInput) -> str:
+        """OCR cache key: upload content plus the settings that shaped the OCR copy"""
+        return f"{image.digest}:{self.signature}"
+
+    def load(self, image_bytes: bytes) -> ImageInput:
+        """
+        Validate and decode raw upload bytes into an ImageInput.
+
+        Raises ValueError when the bytes are not a decodable image.
+        """
+        try:
+            # Header only: format, size and EXIF orientation, no pixel decoding
+            header = Image.open(io.BytesIO(image_bytes))
+            image_format = header.format.lower() if header.format else "unknown"
+            original_size = header.size
+            orientation = header.getexif().get(0x0112, 1)
+        except Exception as e:
+            raise ValueError(str(e))
+
+        target_size = self._fit_pixels(original_size, self.ocr_max_pixels)
+        flags = cv2.IMREAD_COLOR
+        if image_format == "jpeg":
+            # Decode at the smallest DCT scale that still covers the target size
+            for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+                if original_size[0] // factor >= target_size[0] and original_size[1] // factor >= target_size[1]:
+                    flags = reduced_flag
+                    break
+
+        # np.frombuffer wraps the upload bytes without copying them
+        array = cv2.imdecode(np.frombuffer(memoryview(image_bytes), dtype=np.uint8), flags)
+        if array is None:
+            raise ValueError(f"Could not decode {image_format} image")
+
+        # OpenCV has already applied the EXIF orientation, so orient the target the same way
+        if orientation in (5, 6, 7, 8):
+            target_size = (target_size[1], target_size[0])
+        if (array.shape[1], array.shape[0]) != target_size:
+            array = cv2.resize(array, target_size, interpolation=cv2.INTER_AREA)
+
+        image = ImageInput(
+            data=image_bytes,
+            array=array,
+            image_format=image_format,
+            original_size=original_size,
+            exif_rotated=orientation != 1,
+            llm_max_edge=self.llm_max_edge,
+            llm_jpeg_quality=self.llm_jpeg_quality
+        )
+        # Hash while we are off the event loop anyway
+        image.digest
+        logger.info(
+            f"Image decoded: {image_format} {original_size[0]}x{original_size[1]} -> "
+            f"{image.size[0]}x{image.size[1]} for OCR"
+        )
+        return image
+
+    def load_base64(self, image_base64: str) -> ImageInput:
+        """load() for images that arrive base64 encoded in a JSON body"""
+        try:
+            image_bytes = base64.b64decode(image_base64)
+        except Exception as e:
+            raise ValueError(f"Invalid base64 image: {str(e)}")
+        return self.load(image_bytes)
+
+    def _pdf_zoom(self, width_points: float, height_points: float, dpi: int) -> float:
+        """Scale from PDF points (1/72 inch) to pixels: `dpi`, lowered until the page fits ocr_max_pixels"""
+        if width_points <= 0 or height_points <= 0:
+            raise ValueError("PDF page has an empty page box")
+        zoom = dpi / 72
+        if self.ocr_max_pixels > 0:
+            zoom = min(zoom, math.sqrt(self.ocr_max_pixels / (width_points * height_points)))
+        return zoom
+
+    def load_pdf(self, pdf_bytes: bytes, max_pages: int) -> List[ImageInput]:
+        """
+        Rasterize the pages of a PDF into ImageInputs, in page order.
+
+        Raises ValueError for unreadable PDFs, PDFs with more than `max_pages`
+        pages, or when PyMuPDF is not installed.
+        """
+        if fitz is None:
+            raise ValueError("PDF uploads are not supported on this server")
+
+        try:
+            document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception as e:
+            raise ValueError(f"Could not read PDF: {str(e)}")
+
+        with document:
+            if document.page_count == 0:
+                raise ValueError("PDF has no pages")
+            if document.page_count > max_pages:
+                raise ValueError(f"PDF has {document.page_count} pages. Maximum allowed: {max_pages}")
+
+            pdf_digest = hashlib.sha256(pdf_bytes).hexdigest()
+            dpi = int(os.getenv("PDF_RENDER_DPI", "200"))
+            pages = []
+            for page in document:
+                # Render straight into a numpy view of the pixmap samples, at a resolution that
+                # already fits the OCR pixel cap, so a page with a huge MediaBox stays small
+                zoom = self._pdf_zoom(page.rect.width, page.rect.height, dpi)
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+                array = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, 3)
+                array = cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+
+                target_size = self._fit_pixels((pixmap.width, pixmap.height), self.ocr_max_pixels)
+                if target_size != (pixmap.width, pixmap.height):
+                    array = cv2.resize(array, target_size, interpolation=cv2.INTER_AREA)
+
+                pages.append(ImageInput(
+                    data=b"",
+                    array=array,
+                    image_format="pdf",
+                    original_size=(pixmap.width, pixmap.height),
+                    llm_max_edge=self.llm_max_edge,
+                    llm_jpeg_quality=self.llm_jpeg_quality,
+                    digest=f"{pdf_digest}-p{page.number}"
+                ))
+
+        logger.info(f"PDF rasterized: {len(pages)} pages at {dpi} DPI")
+        return pages
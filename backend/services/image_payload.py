@@ -0,0 +1,170 @@
+import base64
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from services.image_input import ImageInput
+from services.ocr_service import OCRService
+
+# Wording that points at something only the picture shows
+_VISUAL_CUES = re.compile(
+    r"\b(?:fig(?:ure)?|diagram|graph|plot|chart|sketch|drawing|shown|shaded|circuit|"
+    r"picture|table|map|labell?ed|axes|grid)\b",
+    re.IGNORECASE
+)
+# A letter or bracket run into a digit ("x2", "(a+b)2") is how OCR flattens exponents and subscripts
+_FLATTENED_SCRIPT = re.compile(r"[A-Za-z)\]]\d")
+# Tokens that are formula rather than prose
+_MATH_TOKEN = re.compile(r"\d|[=+*/^<>\u00b2\u00b3\u221a\u222b\u2211\u03c0]|^-|-$")
+
+
+class ImagePayload:
+    """What goes to the LLM for one image doubt: OCR text only ("text"), a cropped copy ("crop") or the full image"""
+
+    def __init__(self, mode: str, reason: str, image_base64: Optional[str], full_bytes: int, sent_bytes: int):
+        self.mode = mode
+        self.reason = reason
+        self.image_base64 = image_base64
+        self.full_bytes = full_bytes
+        self.sent_bytes = sent_bytes
+
+    def summary(self) -> Dict[str, Any]:
+        """Stored with the doubt as `llm_payload`"""
+        return {
+            "mode": self.mode,
+            "reason": self.reason,
+            "full_bytes": self.full_bytes,
+            "sent_bytes": self.sent_bytes,
+            "bytes_saved": self.full_bytes - self.sent_bytes
+        }
+
+
+class ImagePayloadPolicy:
+    """
+    Picks the smallest LLM payload that still carries the problem.
+
+    When text-only mode is on (IMAGE_TEXT_ONLY_ENABLED, off by default), OCR
+    read the page confidently, the page is nearly all text, nothing refers to
+    a figure and the text is prose rather than equations (which OCR flattens,
+    "x²" reads as "x2"), the transcription replaces the image. Otherwise
+    the image is cropped to its content and downscaled: to the text blocks on a
+    text page, to all ink when the page also holds drawings, so diagrams are
+    never cut off. The full image is sent when the crop would not be smaller.
+    Sizes are base64 bytes, as uploaded to the provider.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("IMAGE_PAYLOAD_ADAPTIVE", "true").lower() in ("1", "true", "yes")
+        # Replacing the image by its OCR text is opt-in: a misread equation gets a confidently wrong answer
+        self.text_only_enabled = os.getenv("IMAGE_TEXT_ONLY_ENABLED", "false").lower() in ("1", "true", "yes")
+        # Text-only needs OCR this confident, this many words, and this share of the ink inside text blocks
+        self.text_min_confidence = float(os.getenv("IMAGE_TEXT_ONLY_MIN_CONFIDENCE", "85"))
+        self.text_min_words = int(os.getenv("IMAGE_TEXT_ONLY_MIN_WORDS", "5"))
+        self.text_min_coverage = float(os.getenv("IMAGE_TEXT_ONLY_MIN_COVERAGE", "0.9"))
+        # ...and at most this share of the OCR words may be formula
+        self.text_max_math_share = float(os.getenv("IMAGE_TEXT_ONLY_MAX_MATH_SHARE", "0.25"))
+        # The cropped copy is downscaled to this longest edge
+        self.crop_max_edge = int(os.getenv("IMAGE_CROP_MAX_EDGE", "1024"))
+        self.crop_jpeg_quality = int(os.getenv("IMAGE_CROP_JPEG_QUALITY", "75"))
+        self.decisions = {"text": 0, "crop": 0, "full": 0}
+        self.full_bytes = 0
+        self.sent_bytes = 0
+
+    def text_only_blocker(self, question: str, ocr_data: Optional[Dict[str, Any]], coverage: float) -> Optional[str]:
+        """Why the OCR text cannot stand in for the image, or None when it can"""
+        text = (ocr_data or {}).get("extracted_text") or ""
+        confidence = (ocr_data or {}).get("average_confidence", 0)
+        words = text.split()
+        if not self.text_only_enabled:
+            return "text-only mode disabled"
+        if not text.strip():
+            return "no OCR text"
+        if confidence < self.text_min_confidence:
+            return f"OCR confidence {confidence:.0f}"
+        if len(words) < self.text_min_words:
+            return "too few OCR words"
+        if coverage < self.text_min_coverage:
+            return f"text blocks hold {coverage:.0%} of the ink"
+        if _VISUAL_CUES.search(question) or _VISUAL_CUES.search(text):
+            return "refers to a figure"
+        if _FLATTENED_SCRIPT.search(text):
+            return "possible flattened exponent or subscript"
+        math_share = sum(1 for word in words if _MATH_TOKEN.search(word)) / len(words)
+        if math_share > self.text_max_math_share:
+            return f"{math_share:.0%} of the OCR words are formula"
+        return None
+
+    def choose(self, image: ImageInput, question: str, ocr_data: Optional[Dict[str, Any]]) -> ImagePayload:
+        """Blocking (OpenCV and JPEG encoding); run it off the event loop"""
+        full_base64 = image.llm_base64
+        full_bytes = len(full_base64)
+        gray = cv2.cvtColor(image.array, cv2.COLOR_BGR2GRAY) if image.array.ndim == 3 else image.array
+        detection = OCRService.detect_text_blocks(gray)
+        coverage = (ocr_data or {}).get("text_coverage")
+        if coverage is None:
+            coverage = detection["text_coverage"]
+
+        blocker = self.text_only_blocker(question, ocr_data, coverage)
+        if blocker is None:
+            reason = f"OCR confidence {ocr_data['average_confidence']:.0f}, text blocks hold {coverage:.0%} of the ink"
+            return self._record(ImagePayload("text", reason, None, full_bytes, 0))
+
+        cropped = self._crop(image.array, gray, detection, text_page=coverage >= self.text_min_coverage)
+        if len(cropped) >= full_bytes:
+            return self._record(ImagePayload("full", blocker, full_base64, full_bytes, full_bytes))
+        return self._record(ImagePayload("crop", blocker, cropped, full_bytes, len(cropped)))
+
+    def _record(self, payload: ImagePayload) -> ImagePayload:
+        self.decisions[payload.mode] += 1
+        self.full_bytes += payload.full_bytes
+        self.sent_bytes += payload.sent_bytes
+        return payload
+
+    @staticmethod
+    def _content_box(gray: np.ndarray, detection: Dict[str, Any], text_page: bool) -> Tuple[int, int, int, int]:
+        """(x0, y0, x1, y1) around the text blocks, or around all ink when the page has drawings"""
+        height, width = gray.shape[:2]
+        blocks = detection["blocks"]
+        if text_page and blocks:
+            x0 = min(x for x, _, _, _, _ in blocks)
+            y0 = min(y for _, y, _, _, _ in blocks)
+            x1 = max(x + w for x, _, w, _, _ in blocks)
+            y1 = max(y + h for _, y, _, h, _ in blocks)
+        else:
+            gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+            _, ink = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            points = cv2.findNonZero(ink)
+            if points is None:
+                return 0, 0, width, height
+            x0, y0, w, h = cv2.boundingRect(points)
+            x1, y1 = x0 + w, y0 + h
+
+        pad = max(8, max(width, height) // 50)
+        return max(0, x0 - pad), max(0, y0 - pad), min(width, x1 + pad), min(height, y1 + pad)
+
+    def _crop(self, array: np.ndarray, gray: np.ndarray, detection: Dict[str, Any], text_page: bool) -> str:
+        x0, y0, x1, y1 = self._content_box(gray, detection, text_page)
+        crop = array[y0:y1, x0:x1]
+        height, width = crop.shape[:2]
+        if self.crop_max_edge and max(width, height) > self.crop_max_edge:
+            scale = self.crop_max_edge / max(width, height)
+            crop = cv2.resize(
+                crop, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA
+            )
+        ok, encoded = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, self.crop_jpeg_quality])
+        if not ok:
+            raise ValueError("Could not encode cropped image")
+        return base64.b64encode(encoded.tobytes()).decode("utf-8")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "text_only_enabled": self.text_only_enabled,
+            "decisions": dict(self.decisions),
+            "full_bytes": self.full_bytes,
+            "sent_bytes": self.sent_bytes,
+            "bytes_saved": self.full_bytes - self.sent_bytes
+        }
@@ -0,0 +1,244 @@
+import asyncio
+import os
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class DoubtJobQueue:
+    """
+    Mongo-backed queue of doubts waiting for an AI answer (`doubt_jobs` collection).
+
+    Workers claim a job with an atomic find-and-update that sets a lease. A
+    worker that crashes or is killed simply stops renewing its lease, and the
+    job becomes claimable again once the lease expires. Failed attempts are
+    retried with exponential backoff up to DOUBT_JOB_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.doubt_jobs
+        self.lease_seconds = float(os.getenv("DOUBT_JOB_LEASE_SECONDS", "120"))
+        self.max_attempts = int(os.getenv("DOUBT_JOB_MAX_ATTEMPTS", "3"))
+        self.retry_delay = float(os.getenv("DOUBT_JOB_RETRY_DELAY_SECONDS", "5"))
+        # Finished jobs are kept this long for the status endpoint, then expired by Mongo
+        self.retention_seconds = int(os.getenv("DOUBT_JOB_RETENTION_SECONDS", "86400"))
+        # Wakes idle workers in this process as soon as a job is enqueued
+        self.new_job = asyncio.Event()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("doubt_id", unique=True)
+        await self.collection.create_index([("status", 1), ("available_at", 1)])
+        await self.collection.create_index([("status", 1), ("lease_expires_at", 1)])
+        await self.collection.create_index("finished_at", expireAfterSeconds=self.retention_seconds)
+
+    async def enqueue(self, doubt_id: str, payload: Optional[Dict[str, Any]] = None):
+        now = datetime.utcnow()
+        await self.collection.insert_one({
+            "id": str(uuid.uuid4()),
+            "doubt_id": doubt_id,
+            "payload": payload or {},
+            "status": "queued",
+            "attempts": 0,
+            "available_at": now,
+            "lease_expires_at": None,
+            "worker_id": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+        self.new_job.set()
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job: queued and due, or running with an expired lease"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "available_at": {"$lte": now}},
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew(self, job: Dict[str, Any]) -> bool:
+        """Extend the lease; False when another worker has taken the job over"""
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"], "status": "running"},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+        )
+        return result.matched_count > 0
+
+    async def complete(self, job: Dict[str, Any]):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"]},
+            {"$set": {"status": "done", "lease_expires_at": None, "finished_at": now, "updated_at": now}}
+        )
+
+    async def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """Record a failed attempt; returns True when the job will be retried"""
+        now = datetime.utcnow()
+        retry = job["attempts"] < self.max_attempts
+        update = {"lease_expires_at": None, "last_error": error, "updated_at": now}
+        if retry:
+            update["status"] = "queued"
+            update["available_at"] = now + timedelta(seconds=self.retry_delay * 2 ** (job["attempts"] - 1))
+        else:
+            update["status"] = "failed"
+            update["finished_at"] = now
+        await self.collection.update_one({"id": job["id"], "worker_id": job["worker_id"]}, {"$set": update})
+        return retry
+
+    async def release(self, job: Dict[str, Any]):
+        """Hand a job back untouched (worker shutting down), without using up an attempt"""
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"id": job["id"], "worker_id": job["worker_id"], "status": "running"},
+            {
+                "$set": {"status": "queued", "available_at": now, "lease_expires_at": None, "updated_at": now},
+                "$inc": {"attempts": -1}
+            }
+        )
+
+    async def get_job(self, doubt_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"doubt_id": doubt_id}, {"_id": 0, "payload": 0})
+
+    async def get_stats(self) -> Dict[str, Any]:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+
+        now = datetime.utcnow()
+        oldest = await self.collection.find_one(
+            {"status": "queued", "available_at": {"$lte": now}}, sort=[("available_at", 1)]
+        )
+        return {
+            "depth": counts["queued"] + counts["running"],
+            "by_status": counts,
+            "expired_leases": await self.collection.count_documents(
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ),
+            "oldest_wait_seconds": (now - oldest["available_at"]).total_seconds() if oldest else 0.0
+        }
+
+
+class JobWorkerPool:
+    """
+    A fixed number of asyncio workers that claim jobs from a DoubtJobQueue and
+    pass them to `handler`. The lease is renewed while the handler runs;
+    `on_give_up` is called once a job has used up its attempts.
+    """
+
+    def __init__(
+        self,
+        queue: DoubtJobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        on_give_up: Optional[Callable[[Dict[str, Any], str], Awaitable[None]]] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.on_give_up = on_give_up
+        self.concurrency = concurrency or int(os.getenv("DOUBT_WORKERS", "4"))
+        self.poll_interval = poll_interval or float(os.getenv("DOUBT_JOB_POLL_SECONDS", "2"))
+        self.instance_id = uuid.uuid4().hex[:8]
+        self._tasks: List[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.instance_id}-{n}"), name=f"doubt-worker-{n}")
+            for n in range(self.concurrency)
+        ]
+        logger.info(f"Doubt worker pool started: {self.concurrency} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _wait_for_work(self):
+        self.queue.new_job.clear()
+        try:
+            await asyncio.wait_for(self.queue.new_job.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _keep_lease(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await self.queue.renew(job):
+                logger.warning(f"Lost lease on job {job['id']}")
+                return
+
+    async def _worker(self, worker_id: str):
+        while True:
+            try:
+                job = await self.queue.claim(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job claim failed: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                await self._wait_for_work()
+                continue
+
+            if job["attempts"] > self.queue.max_attempts:
+                # Leases kept expiring (worker crashes); give up on it
+                job["attempts"] = self.queue.max_attempts
+                await self._run_failed(job, "Job lease expired too many times")
+                continue
+
+            lease = asyncio.create_task(self._keep_lease(job))
+            try:
+                await self.handler(job)
+                await self.queue.complete(job)
+                self.processed += 1
+            except asyncio.CancelledError:
+                await asyncio.shield(self.queue.release(job))
+                raise
+            except Exception as e:
+                logger.error(f"Job {job['id']} for doubt {job['doubt_id']} failed (attempt {job['attempts']}): {str(e)}")
+                await self._run_failed(job, str(e))
+            finally:
+                lease.cancel()
+
+    async def _run_failed(self, job: Dict[str, Any], error: str):
+        try:
+            if not await self.queue.fail(job, error):
+                self.failed += 1
+                if self.on_give_up is not None:
+                    await self.on_give_up(job, error)
+        except Exception as e:
+            logger.error(f"Could not record failure of job {job['id']}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import glob
+import hashlib
+import math
+import os
+import logging
+import random
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from services.llm_scheduler import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Canned answers served by the fake backend unless FAKE_LLM_ANSWERS_DIR names another directory
+DEFAULT_ANSWERS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "answer_corpus")
+FALLBACK_ANSWER = """Step 1: Identify what the question asks for and list the given values.
+Step 2: Apply the relevant rule to the given values and simplify.
+Step 3: Check the result against the original question.
+
+Final answer: 42"""
+
+
+class LLMBackend:
+    """
+    Source of the chat clients AIService sends prompts to.
+
+    A client is configured once per model tier and leased from a
+    ChatClientPool, so it must keep its configuration in plain attributes
+    (the pool snapshots and restores them) and provide `send_message` and
+    optionally `stream_message`, as emergentintegrations' LlmChat does.
+    """
+
+    name = "base"
+
+    def create_client(self, tier: Dict[str, Any], system_message: str) -> Any:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"name": self.name}
+
+
+class GeminiBackend(LLMBackend):
+    """The real provider, through emergentintegrations; needs GEMINI_API_KEY"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+
+    def create_client(self, tier: Dict[str, Any], system_message: str) -> Any:
+        from emergentintegrations.llm.chat import LlmChat
+
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=f"doubt_session_{uuid.uuid4()}",
+            system_message=system_message
+        )
+        chat.with_model(tier["provider"], tier["model"])
+        chat.with_max_tokens(int(tier["max_tokens"]))
+        return chat
+
+
+class FakeLLMError(Exception):
+    """Injected provider failure"""
+
+    status_code = 500
+
+
+class FakeRateLimitError(Exception):
+    """Injected 429; rate_limit_delay reads `status_code` and `retry_after`"""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 rate limit exceeded (fake), retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Sampler of delays in seconds from a spec in milliseconds:
+    "fixed:MS", "uniform:LOW:HIGH", "normal:MEAN:STDDEV",
+    "lognormal:MEDIAN:SIGMA" or "exponential:MEAN". Samples never go below 0.
+    """
+    kind, _, args = spec.strip().lower().partition(":")
+    try:
+        values = [float(value) for value in args.split(":") if value]
+    except ValueError:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+
+    if kind == "fixed" and len(values) == 1:
+        sample = lambda rng: values[0]
+    elif kind == "uniform" and len(values) == 2:
+        sample = lambda rng: rng.uniform(values[0], values[1])
+    elif kind == "normal" and len(values) == 2:
+        sample = lambda rng: rng.gauss(values[0], values[1])
+    elif kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        sample = lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    elif kind == "exponential" and len(values) == 1 and values[0] > 0:
+        sample = lambda rng: rng.expovariate(1 / values[0])
+    else:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+    return lambda rng: max(0.0, sample(rng)) / 1000
+
+
+class FakeChatClient:
+    """Stands in for LlmChat; all behaviour comes from the FakeLLMBackend that built it"""
+
+    def __init__(self, backend: "FakeLLMBackend", tier: Dict[str, Any], system_message: str):
+        self.backend = backend
+        self.model = tier["model"]
+        self.max_tokens = int(tier["max_tokens"])
+        self.system_message = system_message
+        self.session_id = f"doubt_session_{uuid.uuid4()}"
+
+    async def send_message(self, user_message: Any) -> str:
+        return "".join([chunk async for chunk in self.stream_message(user_message)])
+
+    async def stream_message(self, user_message: Any) -> AsyncIterator[str]:
+        async for chunk in self.backend.generate(user_message.text, self.max_tokens):
+            yield chunk
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Local stand-in for the provider, for load tests and offline development.
+
+    Every call waits a first-token delay drawn from FAKE_LLM_LATENCY_MS, then
+    streams a canned answer in FAKE_LLM_CHUNK_CHARS pieces spaced by
+    FAKE_LLM_CHUNK_DELAY_MS, cut to the tier's max_tokens. The answer is
+    picked by a hash of the prompt, so the same question always gets the
+    same answer; with FAKE_LLM_SEED set, delays and injected faults repeat
+    for the same call order too.
+
+    Faults: FAKE_LLM_ERROR_RATE fails a call (at a random chunk when
+    streaming), FAKE_LLM_RATE_LIMIT_RATE answers 429 before the first token
+    and FAKE_LLM_HANG_RATE never answers, to exercise the request deadline.
+    No API key and no network are needed.
+    """
+
+    name = "fake"
+
+    def __init__(self, answers: Optional[List[str]] = None):
+        self.first_token_delay = parse_latency(os.getenv("FAKE_LLM_LATENCY_MS", "lognormal:400:0.5"))
+        self.chunk_delay = float(os.getenv("FAKE_LLM_CHUNK_DELAY_MS", "5")) / 1000
+        self.chunk_chars = max(1, int(os.getenv("FAKE_LLM_CHUNK_CHARS", "16")))
+        self.error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.rate_limit_rate = float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", "0"))
+        self.rate_limit_retry_after = float(os.getenv("FAKE_LLM_RETRY_AFTER_SECONDS", "1"))
+        self.hang_rate = float(os.getenv("FAKE_LLM_HANG_RATE", "0"))
+        seed = os.getenv("FAKE_LLM_SEED")
+        self._rng = random.Random(int(seed) if seed else None)
+        self.answers = answers or self._load_answers(os.getenv("FAKE_LLM_ANSWERS_DIR", DEFAULT_ANSWERS_DIR))
+
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.hangs = 0
+
+    @staticmethod
+    def _load_answers(directory: str) -> List[str]:
+        answers = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.md"))):
+            with open(path, encoding="utf-8") as handle:
+                answers.append(handle.read())
+        if not answers:
+            logger.warning(f"No canned answers in {directory}, the fake LLM will repeat a placeholder answer")
+        return answers or [FALLBACK_ANSWER]
+
+    def create_client(self, tier: Dict[str, Any], system_message: str) -> FakeChatClient:
+        return FakeChatClient(self, tier, system_message)
+
+    def answer_for(self, prompt: str, max_tokens: int) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).digest()
+        answer = self.answers[int.from_bytes(digest[:4], "big") % len(self.answers)]
+        return answer[:max_tokens * CHARS_PER_TOKEN]
+
+    async def generate(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        self.calls += 1
+        rng = self._rng
+        fault = rng.random()
+        await asyncio.sleep(self.first_token_delay(rng))
+
+        if fault < self.hang_rate:
+            self.hangs += 1
+            await asyncio.Event().wait()
+        fault -= self.hang_rate
+        if fault < self.rate_limit_rate:
+            self.rate_limited += 1
+            raise FakeRateLimitError(self.rate_limit_retry_after)
+        fault -= self.rate_limit_rate
+
+        answer = self.answer_for(prompt, max_tokens)
+        chunks = [answer[start:start + self.chunk_chars] for start in range(0, len(answer), self.chunk_chars)] or [""]
+        fail_at = rng.randrange(len(chunks)) if fault < self.error_rate else None
+        for index, chunk in enumerate(chunks):
+            if index == fail_at:
+                self.errors += 1
+                raise FakeLLMError("500 internal error (fake)")
+            if index and self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "answers": len(self.answers),
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "hangs": self.hangs
+        }
+
+
+def create_llm_backend(name: Optional[str] = None) -> LLMBackend:
+    """Build the LLM backend named by `name` or LLM_BACKEND: "gemini" (the default) or "fake" """
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if name == "fake":
+        logger.warning("LLM_BACKEND=fake: answers are canned, no model is called")
+        return FakeLLMBackend()
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM backend {name!r}")
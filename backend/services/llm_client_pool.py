@@ -0,0 +1,71 @@
+import copy
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+
+class ChatClientPool:
+    """
+    Pool of configured chat clients reused across requests.
+
+    Building a client (system message, model, token limit, provider client
+    and its HTTP connections) happens once per pooled instance instead of once
+    per question. The client's configured state is snapshotted right after
+    `factory()` builds it and restored, with a fresh session id, every time
+    it is leased, so no conversation history leaks from one request into the
+    next. Attributes holding objects other than plain containers (the
+    provider client and its connection pool) are restored by reference and
+    therefore stay shared.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_idle: int = 8, session_prefix: str = "doubt_session"):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.session_prefix = session_prefix
+        self._idle: List[Any] = []
+        self._snapshots: Dict[int, Dict[str, Any]] = {}
+        self.created = 0
+        self.reused = 0
+
+    def _create(self) -> Any:
+        client = self.factory()
+        self._snapshots[id(client)] = self._snapshot(client)
+        self.created += 1
+        return client
+
+    @staticmethod
+    def _snapshot(client: Any) -> Dict[str, Any]:
+        return {
+            name: copy.deepcopy(value) if isinstance(value, (list, dict, set)) else value
+            for name, value in vars(client).items()
+        }
+
+    def _reset(self, client: Any):
+        for name, value in self._snapshots[id(client)].items():
+            setattr(client, name, copy.deepcopy(value) if isinstance(value, (list, dict, set)) else value)
+        client.session_id = f"{self.session_prefix}_{uuid.uuid4()}"
+
+    @contextmanager
+    def lease(self):
+        """A client with clean, freshly configured state for one request"""
+        if self._idle:
+            client = self._idle.pop()
+            self.reused += 1
+        else:
+            client = self._create()
+        self._reset(client)
+
+        try:
+            yield client
+        finally:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(client)
+            else:
+                del self._snapshots[id(client)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "idle": len(self._idle),
+            "created": self.created,
+            "reused": self.reused
+        }
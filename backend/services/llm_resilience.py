@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the model answered"""
+
+
+class CircuitOpenError(Exception):
+    """The provider is failing; calls are refused until the breaker's cool-down ends"""
+
+
+class LatencyTracker:
+    """Recent successful call latencies, for picking the hedge delay"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int = 1) -> Optional[float]:
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures, or when at
+    least half of the last `window` calls failed. Open refuses calls for
+    `reset_seconds`, then half-open lets a single trial call through: its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30, window: int = 20):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.opens = 0
+        self.refused = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the provider now"""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.refused += 1
+        raise CircuitOpenError("AI provider is unavailable, try again shortly")
+
+    def record_success(self):
+        self._outcomes.append(True)
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self._outcomes.append(False)
+        self._consecutive_failures += 1
+        failures = self._outcomes.count(False)
+        window_full = len(self._outcomes) == self._outcomes.maxlen
+        if (
+            self._trial_in_flight or
+            self._consecutive_failures >= self.failure_threshold or
+            (window_full and failures * 2 >= len(self._outcomes))
+        ):
+            if self._opened_at is None or self._trial_in_flight:
+                self.opens += 1
+            self._opened_at = time.monotonic()
+            self._outcomes.clear()
+        self._trial_in_flight = False
+
+    def record_ignored(self):
+        """The call ended without saying anything about provider health (e.g. rate limited)"""
+        self._trial_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "opens": self.opens,
+            "refused": self.refused,
+            "consecutive_failures": self._consecutive_failures
+        }
+
+
+async def hedged_call(
+    call: Callable[[], Awaitable[Any]],
+    hedge_after: Optional[float],
+    start_hedge: Callable[[], Optional[Callable[[], None]]]
+) -> Tuple[Any, bool]:
+    """
+    Run `call()`; if it has not finished after `hedge_after` seconds and
+    `start_hedge()` grants capacity (returning a release callback), run a second
+    `call()` alongside it. The first success wins and the other is cancelled;
+    if both fail the first error is raised. Returns (result, hedge_won).
+    """
+    primary = asyncio.ensure_future(call())
+    hedge = None
+    pending = {primary}
+    try:
+        if hedge_after is not None:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if not done:
+                release = start_hedge()
+                if release is not None:
+                    hedge = asyncio.ensure_future(call())
+                    hedge.add_done_callback(lambda _: release())
+                    pending.add(hedge)
+
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task is hedge
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,292 @@
+import asyncio
+import os
+import logging
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from services.fair_queue import FairQueue, parse_weights
+
+logger = logging.getLogger(__name__)
+
+_RETRY_AFTER_PATTERN = re.compile(r"retry[ _-]?(?:after|in|delay)\D{0,12}(\d+(?:\.\d+)?)\s*(ms|s)?", re.IGNORECASE)
+
+
+# Rough Gemini costs, used only to pace the tokens-per-minute budget
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+
+
+def estimate_tokens(text: str, images: int = 0) -> float:
+    return len(text) / CHARS_PER_TOKEN + images * IMAGE_TOKENS
+
+
+class SchedulerRejected(Exception):
+    """The call could not be admitted within its queue wait budget"""
+
+
+def rate_limit_delay(error: Exception) -> Optional[float]:
+    """
+    Seconds the provider asked us to back off for, or None when `error` is not a rate limit.
+
+    Looks at a `retry_after` attribute, a Retry-After response header and finally
+    the error text, since the LLM client wraps provider errors inconsistently.
+    """
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    message = str(error)
+    lowered = message.lower()
+    if status_code != 429 and not any(
+        marker in lowered for marker in ("429", "rate limit", "ratelimit", "resource_exhausted", "quota")
+    ):
+        return None
+
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    if retry_after is None:
+        match = _RETRY_AFTER_PATTERN.search(message)
+        if match:
+            retry_after = float(match.group(1)) / (1000 if match.group(2) == "ms" else 1)
+    try:
+        return max(0.0, float(retry_after)) if retry_after is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously; a rate of 0 means unlimited"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.available = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        # A single request larger than the whole budget waits for a full bucket
+        deficit = min(amount, self.capacity) - self.available
+        return max(0.0, deficit * 60 / self.per_minute)
+
+    def take(self, amount: float):
+        """Consume `amount`; a negative amount returns an over-estimate"""
+        if self.per_minute <= 0:
+            return
+        self._refill()
+        self.available = min(self.capacity, self.available - amount)
+
+
+class LLMScheduler:
+    """
+    Admission control for model calls.
+
+    At most LLM_MAX_CONCURRENCY calls run at once. The rest wait, for at most
+    LLM_MAX_QUEUE_WAIT_SECONDS, in a weighted fair queue keyed by user, so a
+    user flooding requests only delays their own. Demo traffic
+    (LLM_DEMO_USER_IDS) is a low-priority class: it has a small weight and
+    never holds more than LLM_DEMO_MAX_CONCURRENCY slots, keeping capacity
+    free for signed-in users. Admitted calls also wait for the requests- and
+    tokens-per-minute budgets. When the provider answers with a rate limit
+    every call pauses for the requested Retry-After and the failed call is
+    retried, so throughput settles at the provider ceiling instead of failing
+    everything at once.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.max_queue = int(os.getenv("LLM_MAX_QUEUE", "200"))
+        self.max_queue_wait = float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "30"))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.default_retry_after = float(os.getenv("LLM_RETRY_AFTER_DEFAULT_SECONDS", "5"))
+        self.requests = TokenBucket(float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")))
+        self.tokens = TokenBucket(float(os.getenv("LLM_TOKENS_PER_MINUTE", "0")))
+
+        self.demo_flows = {flow.strip() for flow in os.getenv("LLM_DEMO_USER_IDS", "demo_user").split(",") if flow.strip()}
+        self.demo_max_concurrency = int(os.getenv("LLM_DEMO_MAX_CONCURRENCY", max(1, self.max_concurrency // 4)))
+        weights = {flow: float(os.getenv("LLM_DEMO_WEIGHT", "0.2")) for flow in self.demo_flows}
+        weights.update(parse_weights(os.getenv("LLM_USER_WEIGHTS", "")))
+        self._queue = FairQueue(
+            default_weight=float(os.getenv("LLM_USER_WEIGHT", "1")),
+            weights=weights,
+            max_per_flow=int(os.getenv("LLM_MAX_QUEUE_PER_USER", "20"))
+        )
+
+        self._active = 0
+        self._demo_active = 0
+        self._paused_until = 0.0
+        self._queue_waits: Dict[str, Deque[float]] = {"user": deque(maxlen=1000), "demo": deque(maxlen=1000)}
+        self.submitted = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def traffic_class(self, flow: str) -> str:
+        return "demo" if flow in self.demo_flows else "user"
+
+    def _eligible(self, flow: str) -> bool:
+        return flow not in self.demo_flows or self._demo_active < self.demo_max_concurrency
+
+    def _dispatch(self):
+        """Grant free slots to the fairest eligible waiters"""
+        while self._active < self.max_concurrency:
+            granted = self._queue.pop(self._eligible)
+            if granted is None:
+                return
+            flow, waiter = granted
+            self._active += 1
+            if flow in self.demo_flows:
+                self._demo_active += 1
+            waiter.set_result(None)
+
+    async def _acquire(self, deadline: float, flow: str):
+        if self._queue.depth() >= self.max_queue:
+            raise SchedulerRejected("LLM queue is full")
+        waiter = self._queue.push(flow)
+        if waiter is None:
+            raise SchedulerRejected("Too many queued LLM requests for this user")
+        self._dispatch()
+
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=max(0.0, deadline - time.monotonic()))
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self._release(flow)
+            else:
+                waiter.cancel()
+            raise
+        if not done:
+            waiter.cancel()
+            raise SchedulerRejected(f"No LLM capacity within {self.max_queue_wait:.0f}s")
+
+    def _release(self, flow: str):
+        self._active -= 1
+        if flow in self.demo_flows:
+            self._demo_active -= 1
+        self._dispatch()
+
+    def try_extra_slot(self, flow: Optional[str] = None, estimated_tokens: float = 0) -> Optional[Callable[[], None]]:
+        """
+        Take a slot and budget right now only if that delays nobody (no queue,
+        budgets available), for optional extra work like hedged calls.
+        Returns the release callback, or None when there is no spare capacity.
+        """
+        flow = flow or "anonymous"
+        spare = (
+            self._active < self.max_concurrency and not self._queue.depth() and self._eligible(flow) and
+            time.monotonic() >= self._paused_until and
+            self.requests.time_until(1) <= 0 and self.tokens.time_until(estimated_tokens) <= 0
+        )
+        if not spare:
+            return None
+
+        self._active += 1
+        if flow in self.demo_flows:
+            self._demo_active += 1
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+        return lambda: self._release(flow)
+
+    async def _wait_for_budget(self, tokens: float, deadline: float):
+        while True:
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self.requests.time_until(1), self.tokens.time_until(tokens))
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                return
+            if now + wait > deadline:
+                raise SchedulerRejected(f"LLM rate budget exhausted for the next {wait:.0f}s")
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: float = 0, flow: Optional[str] = None):
+        """Hold one admitted call for `flow` (a user id) for the duration of the block"""
+        flow = flow or "anonymous"
+        self.submitted += 1
+        queued_at = time.monotonic()
+        deadline = queued_at + self.max_queue_wait
+        try:
+            await self._acquire(deadline, flow)
+        except SchedulerRejected:
+            self.rejected += 1
+            raise
+        try:
+            await self._wait_for_budget(estimated_tokens, deadline)
+            self._queue_waits[self.traffic_class(flow)].append(time.monotonic() - queued_at)
+            yield
+        except SchedulerRejected:
+            self.rejected += 1
+            raise
+        finally:
+            self._release(flow)
+
+    def pause(self, seconds: float):
+        """Stop admitting calls to the provider for `seconds`"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def run(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        estimated_tokens: float = 0,
+        actual_tokens: Optional[Callable[[Any], float]] = None,
+        flow: Optional[str] = None
+    ) -> Any:
+        """
+        Run `fn()` once admitted, retrying provider rate limits.
+
+        `actual_tokens(result)` corrects the token budget after the call, since
+        the response length is only an estimate beforehand.
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(estimated_tokens, flow):
+                try:
+                    result = await fn()
+                except Exception as e:
+                    delay = rate_limit_delay(e)
+                    if delay is None:
+                        raise
+                    self.rate_limited += 1
+                    delay = delay or self.default_retry_after
+                    self.pause(delay)
+                    if attempt == self.max_retries:
+                        raise
+                    logger.warning(f"LLM rate limited, pausing {delay:.1f}s (retry {attempt + 1}/{self.max_retries})")
+                    self.retries += 1
+                    continue
+
+            if actual_tokens is not None:
+                self.tokens.take(actual_tokens(result) - estimated_tokens)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        def percentiles(samples: Deque[float]) -> Dict[str, float]:
+            waits = sorted(samples)
+
+            def percentile(p: float) -> float:
+                return waits[min(len(waits) - 1, int(len(waits) * p))] * 1000 if waits else 0.0
+
+            return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": percentile(1.0)}
+
+        return {
+            "active": self._active,
+            "demo_active": self._demo_active,
+            "queued": self._queue.depth(),
+            "max_concurrency": self.max_concurrency,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "paused_for_seconds": max(0.0, self._paused_until - time.monotonic()),
+            "queue_wait_ms": {name: percentiles(samples) for name, samples in self._queue_waits.items()}
+        }
@@ -0,0 +1,115 @@
+import json
+import os
+import re
+from typing import Any, Dict, List
+
+from services.question_index import question_tokens
+
+# Model and output budget per tier; LLM_MODEL_TIERS (JSON) overrides or adds tiers
+DEFAULT_TIERS: Dict[str, Dict[str, Any]] = {
+    "fast": {"provider": "gemini", "model": "gemini-2.0-flash-lite", "max_tokens": 1024},
+    "standard": {"provider": "gemini", "model": "gemini-2.0-flash", "max_tokens": 4096},
+    "deep": {"provider": "gemini", "model": "gemini-2.5-flash", "max_tokens": 8192},
+}
+
+# First matching row wins. A row matches when every condition it lists holds:
+# subjects, image (bool), difficulty, min_chars and max_chars of the question.
+# LLM_ROUTING_TABLE (JSON list) replaces it.
+DEFAULT_ROUTING_TABLE: List[Dict[str, Any]] = [
+    {"tier": "fast", "difficulty": ["easy"], "image": False, "max_chars": 200},
+    {"tier": "deep", "difficulty": ["hard"]},
+    {"tier": "standard"},
+]
+
+# Topics and wording that call for multi-step reasoning
+_HARD_CUES = re.compile(
+    r"\b(?:prove|proof|show that|derive|derivation|integra(?:l|te|tion)|differentia(?:l|te|tion)|"
+    r"limit|matri(?:x|ces)|eigen\w*|vectors?|series|induction|optimi[sz]\w*|maximi[sz]\w*|minimi[sz]\w*|"
+    r"probability|permutations?|combinations?|mechanism|equilibrium|thermodynamics?|quantum|"
+    r"complex numbers?|identity)\b|[∫∑∂√]",
+    re.IGNORECASE
+)
+_NUMBER_OR_OPERATOR = re.compile(r"\d+(?:\.\d+)?|[+\-*/=^<>%]")
+
+
+def estimate_difficulty(question: str) -> str:
+    """
+    "easy" for bare arithmetic or a one-variable expression ("what is 17 * 23",
+    "solve 2x + 5 = 15"), "hard" for several advanced cues or a long question
+    with one, "medium" otherwise.
+    """
+    words = len(question.split())
+    cues = len(_HARD_CUES.findall(question))
+    if cues >= 2 or (cues and words > 40) or words > 150:
+        return "hard"
+
+    tokens = question_tokens(question)
+    expression = [token for token in tokens if _NUMBER_OR_OPERATOR.fullmatch(token)]
+    if not cues and expression and all(len(token) == 1 or token in expression for token in tokens):
+        return "easy"
+    return "medium"
+
+
+class RouteDecision:
+    """The tier picked for one question, with the features that picked it"""
+
+    def __init__(self, tier: str, config: Dict[str, Any], difficulty: str, rule: int):
+        self.tier = tier
+        self.provider = config["provider"]
+        self.model = config["model"]
+        self.max_tokens = int(config["max_tokens"])
+        self.difficulty = difficulty
+        self.rule = rule  # index of the matching table row, -1 for the default tier
+
+
+class ModelRouter:
+    """
+    Picks a model tier per question from a routing table, so short arithmetic
+    gets a small, fast model and budget while proofs and long problems get
+    the strongest one. With LLM_ROUTING_ENABLED=false every question uses
+    LLM_DEFAULT_TIER.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_ROUTING_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.tiers = {name: dict(config) for name, config in DEFAULT_TIERS.items()}
+        for name, config in json.loads(os.getenv("LLM_MODEL_TIERS", "{}")).items():
+            self.tiers[name] = dict(self.tiers.get(name, {"provider": "gemini"}), **config)
+        table = os.getenv("LLM_ROUTING_TABLE")
+        self.table = json.loads(table) if table else DEFAULT_ROUTING_TABLE
+        self.default_tier = os.getenv("LLM_DEFAULT_TIER", "standard")
+
+        unknown = ({row["tier"] for row in self.table} | {self.default_tier}) - set(self.tiers)
+        if unknown:
+            raise ValueError(f"Unknown model tiers in the routing configuration: {sorted(unknown)}")
+        self.routed = {name: 0 for name in self.tiers}
+
+    @staticmethod
+    def _matches(row: Dict[str, Any], subject: str, chars: int, image: bool, difficulty: str) -> bool:
+        if "subjects" in row and subject.lower() not in {s.lower() for s in row["subjects"]}:
+            return False
+        if "image" in row and row["image"] != image:
+            return False
+        if "difficulty" in row and difficulty not in row["difficulty"]:
+            return False
+        if chars < row.get("min_chars", 0):
+            return False
+        return "max_chars" not in row or chars <= row["max_chars"]
+
+    def route(self, question: str, subject: str, images: int = 0) -> RouteDecision:
+        difficulty = estimate_difficulty(question)
+        tier, rule = self.default_tier, -1
+        if self.enabled:
+            for index, row in enumerate(self.table):
+                if self._matches(row, subject, len(question), images > 0, difficulty):
+                    tier, rule = row["tier"], index
+                    break
+        self.routed[tier] += 1
+        return RouteDecision(tier, self.tiers[tier], difficulty, rule)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "routed": dict(self.routed),
+            "tiers": {name: f"{config['model']} ({config['max_tokens']} tokens)" for name, config in self.tiers.items()}
+        }
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    OCR result cache keyed by a SHA-256 of the decoded image bytes.
+
+    Lookups hit an in-process LRU first and, when a database is given and
+    OCR_CACHE_PERSIST is enabled, fall back to the `ocr_cache` collection.
+    """
+
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None):
+        self.memory = TTLCache(
+            max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("OCR_CACHE_TTL_SECONDS", "86400"))
+        )
+        persist = os.getenv("OCR_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+        self.collection = db.ocr_cache if db is not None and persist else None
+        self.persistent_hits = 0
+
+    @staticmethod
+    def make_key(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    async def ensure_indexes(self):
+        """Create the lookup index and let Mongo expire entries after the TTL"""
+        if self.collection is None:
+            return
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index(
+            "created_at", expireAfterSeconds=int(self.memory.ttl_seconds)
+        )
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.memory.get(key)
+        if result is not None:
+            return dict(result)
+
+        if self.collection is None:
+            return None
+
+        try:
+            doc = await self.collection.find_one({"key": key})
+        except Exception as e:
+            logger.warning(f"OCR cache lookup failed: {str(e)}")
+            return None
+
+        if not doc:
+            return None
+
+        self.persistent_hits += 1
+        self.memory.set(key, doc["result"])
+        return dict(doc["result"])
+
+    async def set(self, key: str, result: Dict[str, Any]):
+        # Timeouts and crashes are not a property of the image, so never cache them
+        if "error" in result:
+            return
+
+        self.memory.set(key, dict(result))
+        if self.collection is None:
+            return
+
+        try:
+            await self.collection.update_one(
+                {"key": key},
+                {"$set": {"result": result, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"OCR cache write failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.memory.get_stats()
+        stats["persistent"] = self.collection is not None
+        stats["persistent_hits"] = self.persistent_hits
+        return stats
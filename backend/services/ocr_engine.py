@@ -0,0 +1,222 @@
+import asyncio
+import base64
+import multiprocessing
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.ocr_service import OCRService, ocr_failure_result
+from services.ocr_cache import OCRCache
+
+logger = logging.getLogger(__name__)
+
+# One OCRService per worker process, created on first use inside that process
+_worker_ocr_service: Optional[OCRService] = None
+
+
+def _get_worker_ocr_service() -> OCRService:
+    global _worker_ocr_service
+    if _worker_ocr_service is None:
+        _worker_ocr_service = OCRService()
+    return _worker_ocr_service
+
+
+def _extract_text_job(image_base64: str) -> Dict[str, Any]:
+    return _get_worker_ocr_service().extract_text_from_base64(image_base64)
+
+
+def _extract_shared_image_job(name: str, shape: Tuple[int, ...], dtype: str) -> Dict[str, Any]:
+    """OCR an image the parent placed in shared memory, so its pixels never go through the pipe"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        cv_image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        try:
+            return _get_worker_ocr_service().extract_text_from_image(cv_image)
+        finally:
+            del cv_image
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # An abandoned preprocessing variant still holds a view; the mapping goes when it does
+            pass
+
+
+def _text_regions_job(image_base64: str) -> List[Dict]:
+    return _get_worker_ocr_service().get_text_regions(image_base64)
+
+
+class AsyncOCREngine:
+    """Runs OCRService work in a process pool so OCR never blocks the event loop"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+        cache: Optional[OCRCache] = None
+    ):
+        self.max_workers = max_workers or int(os.getenv("OCR_MAX_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+        self.max_concurrency = max_concurrency or int(os.getenv("OCR_MAX_CONCURRENCY", self.max_workers))
+        self.job_timeout = job_timeout or float(os.getenv("OCR_JOB_TIMEOUT", "30"))
+        self.start_method = os.getenv("OCR_MP_START_METHOD", "spawn")
+        self.cache = cache or OCRCache()
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool lazily so importing this module never forks"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+            logger.info(f"OCR process pool started: {self.max_workers} workers, max concurrency {self.max_concurrency}")
+        return self._executor
+
+    async def _run(self, fn: Callable, *args, on_done: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Run a job in the pool under the concurrency limit.
+
+        The concurrency slot is held until the worker actually finishes: a job that
+        times out or is cancelled while already running keeps its slot until the
+        process is free again, so the pool is never oversubscribed. `on_done`
+        runs at that same point, when nothing can use the job's inputs anymore.
+        """
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+
+        def release(_=None):
+            loop.call_soon_threadsafe(self._release_slot, on_done)
+
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenProcessPool:
+                logger.warning("OCR process pool was broken, restarting it")
+                self._executor = None
+                future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release_slot(on_done)
+            raise
+
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(result), timeout=self.job_timeout)
+        except BrokenProcessPool:
+            self._executor = None
+            raise
+        finally:
+            if future.done() or future.cancel():
+                release()
+            else:
+                # Abandoned job: keep the slot until the worker is free and drop its result
+                future.add_done_callback(release)
+                result.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def _release_slot(self, on_done: Optional[Callable[[], None]] = None):
+        self._in_flight -= 1
+        self._semaphore.release()
+        if on_done is not None:
+            on_done()
+
+    async def _run_on_shared_image(self, cv_image: np.ndarray) -> Dict[str, Any]:
+        """
+        OCR a decoded image in the pool without pickling it.
+
+        A 4 MP BGR page is about 12 MB of pixels; it is copied once into a
+        shared memory block the worker maps, instead of being serialized
+        through the pool's pipe. The block is freed when the worker is done.
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(1, cv_image.nbytes))
+
+        def free():
+            shm.close()
+            shm.unlink()
+
+        try:
+            np.ndarray(cv_image.shape, dtype=cv_image.dtype, buffer=shm.buf)[...] = cv_image
+        except BaseException:
+            free()
+            raise
+        return await self._run(
+            _extract_shared_image_job, shm.name, cv_image.shape, cv_image.dtype.str, on_done=free
+        )
+
+    @staticmethod
+    def _cache_key(image_base64: str) -> Optional[str]:
+        try:
+            return OCRCache.make_key(base64.b64decode(image_base64))
+        except Exception:
+            return None
+
+    async def extract_text(self, image_base64: str) -> Dict[str, Any]:
+        """
+        Async counterpart of OCRService.extract_text_from_base64.
+
+        Results are cached by image content, so the same page uploaded again
+        never reaches Tesseract.
+        """
+        cache_key = await asyncio.to_thread(self._cache_key, image_base64)
+        return await self._extract_cached(cache_key, lambda: self._run(_extract_text_job, image_base64))
+
+    async def extract_text_from_image(self, cv_image: np.ndarray, cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """Async counterpart of OCRService.extract_text_from_image for an already decoded image"""
+        return await self._extract_cached(cache_key, lambda: self._run_on_shared_image(cv_image))
+
+    async def _extract_cached(self, cache_key: Optional[str], run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        if cache_key:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit for image {cache_key[:12]}")
+                return cached
+
+        try:
+            result = await run()
+            if cache_key:
+                await self.cache.set(cache_key, result)
+            return result
+        except asyncio.TimeoutError:
+            logger.error(f"OCR job timed out after {self.job_timeout:.0f}s")
+            error = f"OCR timed out after {self.job_timeout:.0f}s"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"OCR job failed: {str(e)}")
+            error = str(e)
+
+        return ocr_failure_result(error)
+
+    async def get_text_regions(self, image_base64: str) -> List[Dict]:
+        """Async counterpart of OCRService.get_text_regions"""
+        try:
+            return await self._run(_text_regions_job, image_base64)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting text regions: {str(e)}")
+            return []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "job_timeout": self.job_timeout,
+            "cache": self.cache.get_stats()
+        }
+
+    def shutdown(self):
+        """Stop the worker processes, cancelling jobs that have not started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("OCR process pool stopped")
@@ -7,15 +7,222 @@ import io
 import tempfile
 import os
 import logging
-from typing import Optional, Dict, List
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict, List, Tuple
+
+try:
+    import tesserocr
+except ImportError:  # optional: needs the tesseract C++ library at build time
+    tesserocr = None
 
 logger = logging.getLogger(__name__)
 
+
+def ocr_failure_result(error: str) -> Dict[str, any]:
+    """Result returned when OCR could not run at all"""
+    return {
+        "extracted_text": "",
+        "confidence_scores": [],
+        "preprocessing_used": "none",
+        "success": False,
+        "error": error
+    }
+
+
+class OCRBackend:
+    """Minimal Tesseract interface used by OCRService"""
+    
+    name = "base"
+    
+    def image_to_data(self, image: np.ndarray, psm: int = 3) -> Dict[str, List]:
+        """Word-level results in pytesseract's Output.DICT layout (text, conf, left, top, width, height)"""
+        raise NotImplementedError
+    
+    def image_to_string(self, image: np.ndarray, psm: int = 3) -> str:
+        raise NotImplementedError
+
+
+class PytesseractBackend(OCRBackend):
+    """Runs the tesseract CLI once per call (spawns a process and re-encodes the image)"""
+    
+    name = "pytesseract"
+    
+    def image_to_data(self, image: np.ndarray, psm: int = 3) -> Dict[str, List]:
+        return pytesseract.image_to_data(
+            image,
+            config=f'--psm {psm} --oem 3',
+            output_type=pytesseract.Output.DICT
+        )
+    
+    def image_to_string(self, image: np.ndarray, psm: int = 3) -> str:
+        return pytesseract.image_to_string(image, config=f'--psm {psm} --oem 3')
+
+
+class TesserocrBackend(OCRBackend):
+    """
+    Long-lived in-process Tesseract engine via the C API.
+    
+    Each thread keeps its own PyTessBaseAPI handle, so the traineddata is loaded
+    once per thread and images are handed over as raw numpy buffers.
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self, lang: str = "eng"):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+        # Fail fast (missing tessdata etc.) so the caller can fall back
+        self._get_api()
+    
+    def _get_api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, oem=tesserocr.OEM.DEFAULT)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+    
+    def _set_image(self, image: np.ndarray, psm: int):
+        if image.ndim == 3:
+            # Tesseract expects RGB byte order for 3-channel buffers
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+        
+        api = self._get_api()
+        api.SetPageSegMode(psm)
+        api.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, image.strides[0])
+        return api
+    
+    def image_to_data(self, image: np.ndarray, psm: int = 3) -> Dict[str, List]:
+        api = self._set_image(image, psm)
+        api.Recognize()
+        
+        data = {"text": [], "conf": [], "left": [], "top": [], "width": [], "height": []}
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+        
+        level = tesserocr.RIL.WORD
+        for word in tesserocr.iterate_level(iterator, level):
+            bbox = word.BoundingBox(level)
+            if bbox is None:
+                continue
+            x1, y1, x2, y2 = bbox
+            data["text"].append(word.GetUTF8Text(level) or "")
+            data["conf"].append(word.Confidence(level))
+            data["left"].append(x1)
+            data["top"].append(y1)
+            data["width"].append(x2 - x1)
+            data["height"].append(y2 - y1)
+        return data
+    
+    def image_to_string(self, image: np.ndarray, psm: int = 3) -> str:
+        return self._set_image(image, psm).GetUTF8Text()
+    
+    def close(self):
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+
+
+def create_ocr_backend(name: Optional[str] = None) -> OCRBackend:
+    """
+    Build the OCR backend named by `name` or OCR_BACKEND.
+    
+    "auto" (the default) prefers tesserocr and falls back to pytesseract when it
+    is not installed or cannot load its language data.
+    """
+    name = (name or os.getenv("OCR_BACKEND", "auto")).lower()
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend(lang=os.getenv("OCR_LANG", "eng"))
+        except Exception as e:
+            if name == "tesserocr" or tesserocr is not None:
+                logger.warning(f"tesserocr backend unavailable, falling back to pytesseract: {str(e)}")
+    return PytesseractBackend()
+
+
+class _BestResultSelector:
+    """Keeps the best OCR result seen so far and reports when the target is reached"""
+    
+    def __init__(self, target_word_count: int, target_confidence: float):
+        self.target_word_count = target_word_count
+        self.target_confidence = target_confidence
+        self.best = {
+            "extracted_text": "",
+            "confidence_scores": [],
+            "preprocessing_used": "original",
+            "success": False,
+            "word_count": 0
+        }
+    
+    def offer(self, result: Optional[Dict]) -> bool:
+        """Consider the next result in preference order; True means stop trying more variants"""
+        if not result:
+            return False
+        
+        # Update best result if this method found more text with good confidence
+        if result["word_count"] > self.best["word_count"] and result["confidence_scores"]:
+            if result["average_confidence"] > 40:  # Minimum average confidence threshold
+                self.best = dict(result, success=True)
+                return (
+                    self.target_word_count > 0 and
+                    result["word_count"] >= self.target_word_count and
+                    result["average_confidence"] >= self.target_confidence
+                )
+        return False
+
+class _MemoryBudget:
+    """Byte budget shared by concurrently running variants; one variant may always run"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+    
+    @contextmanager
+    def reserve(self, size: int):
+        with self._condition:
+            while self.used and self.used + size > self.limit:
+                self._condition.wait()
+            self.used += size
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used -= size
+                self._condition.notify_all()
+
 class OCRService:
     """Enhanced OCR service with multiple processing techniques"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[OCRBackend] = None):
         self.supported_formats = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif']
+        self.backend = backend or create_ocr_backend()
+        # "sequential" runs the preprocessing variants one after another,
+        # "parallel" runs them on a thread pool (tesseract runs out of process)
+        self.pipeline_mode = os.getenv("OCR_PIPELINE_MODE", "parallel").lower()
+        self.pipeline_workers = int(os.getenv("OCR_PIPELINE_WORKERS", "2"))
+        # Stop trying further variants once one reaches both targets (0 words disables)
+        self.target_word_count = int(os.getenv("OCR_TARGET_WORD_COUNT", "5"))
+        self.target_confidence = float(os.getenv("OCR_TARGET_CONFIDENCE", "80"))
+        # Upper bound on preprocessed variant buffers alive at once in parallel mode
+        self.variant_memory_budget = int(float(os.getenv("OCR_VARIANT_MEMORY_BUDGET_MB", "64")) * 1024 * 1024)
+        # "full_page" OCRs whole-page variants, "regions" detects text blocks first
+        # and OCRs only those crops (falls back to full page when detection is unhelpful)
+        self.ocr_strategy = os.getenv("OCR_STRATEGY", "full_page").lower()
+        self.max_text_blocks = int(os.getenv("OCR_MAX_TEXT_BLOCKS", "12"))
+        self._pipeline_executor: Optional[ThreadPoolExecutor] = None
         
     def extract_text_from_base64(self, image_base64: str) -> Dict[str, any]:
         """
@@ -29,75 +236,37 @@ class OCRService:
                 - success: Boolean indicating if OCR was successful
         """
         try:
-            # Decode base64 image
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
+            # Decode base64 image straight into a BGR array
+            cv_image = self._decode_image(base64.b64decode(image_base64))
+        except Exception as e:
+            logger.error(f"OCR extraction failed: {str(e)}")
+            return ocr_failure_result(str(e))
+        
+        return self.extract_text_from_image(cv_image)
+    
+    def extract_text_from_image(self, cv_image: np.ndarray) -> Dict[str, any]:
+        """Same as extract_text_from_base64 for an already decoded BGR image"""
+        try:
+            # One grayscale buffer is shared by every grayscale-based variant
+            gray = self._convert_to_grayscale(cv_image)
             
-            # Convert PIL image to OpenCV format
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Try multiple preprocessing techniques
-            preprocessing_methods = [
-                ("original", cv_image),
-                ("grayscale", self._convert_to_grayscale(cv_image)),
-                ("threshold", self._apply_threshold(cv_image)),
-                ("noise_removal", self._remove_noise(cv_image)),
-                ("enhanced", self._enhance_image(cv_image))
-            ]
-            
-            best_result = {
-                "extracted_text": "",
-                "confidence_scores": [],
-                "preprocessing_used": "original",
-                "success": False,
-                "word_count": 0
-            }
+            if self.ocr_strategy == "regions":
+                region_result = self._extract_text_from_regions(gray)
+                if region_result is not None:
+                    return region_result
             
-            for method_name, processed_image in preprocessing_methods:
-                try:
-                    # Extract text with confidence data
-                    data = pytesseract.image_to_data(
-                        processed_image, 
-                        config='--psm 6 --oem 3',
-                        output_type=pytesseract.Output.DICT
-                    )
-                    
-                    # Filter out low confidence and empty text
-                    filtered_text = []
-                    confidence_scores = []
-                    
-                    for i, text in enumerate(data['text']):
-                        confidence = int(data['conf'][i])
-                        if confidence > 30 and text.strip():  # Only include confident detections
-                            filtered_text.append(text.strip())
-                            confidence_scores.append(confidence)
-                    
-                    extracted_text = " ".join(filtered_text)
-                    word_count = len(filtered_text)
-                    
-                    # Update best result if this method found more text with good confidence
-                    if word_count > best_result["word_count"] and confidence_scores:
-                        avg_confidence = sum(confidence_scores) / len(confidence_scores)
-                        if avg_confidence > 40:  # Minimum average confidence threshold
-                            best_result = {
-                                "extracted_text": extracted_text,
-                                "confidence_scores": confidence_scores,
-                                "preprocessing_used": method_name,
-                                "success": True,
-                                "word_count": word_count,
-                                "average_confidence": avg_confidence
-                            }
-                    
-                    logger.info(f"OCR method '{method_name}': {word_count} words, avg confidence: {avg_confidence if confidence_scores else 0:.1f}")
-                    
-                except Exception as method_error:
-                    logger.warning(f"OCR method '{method_name}' failed: {str(method_error)}")
-                    continue
+            preprocessing_methods = self._preprocessing_variants(cv_image, gray)
+            
+            if self.pipeline_mode == "parallel" and self.pipeline_workers > 1:
+                best_result, methods_completed = self._run_parallel(preprocessing_methods)
+            else:
+                best_result, methods_completed = self._run_sequential(preprocessing_methods)
+            del gray
             
             # Fallback: simple text extraction without confidence filtering
             if not best_result["success"]:
                 try:
-                    simple_text = pytesseract.image_to_string(cv_image, config='--psm 6 --oem 3').strip()
+                    simple_text = self.backend.image_to_string(cv_image, psm=6).strip()
                     if simple_text:
                         best_result = {
                             "extracted_text": simple_text,
@@ -110,53 +279,273 @@ class OCRService:
                 except Exception as fallback_error:
                     logger.error(f"Fallback OCR failed: {str(fallback_error)}")
             
+            best_result["pipeline"] = {
+                "mode": self.pipeline_mode,
+                "backend": self.backend.name,
+                "methods_completed": methods_completed,
+                "early_exit": methods_completed < len(preprocessing_methods)
+            }
             return best_result
             
         except Exception as e:
             logger.error(f"OCR extraction failed: {str(e)}")
+            return ocr_failure_result(str(e))
+    
+    def _get_pipeline_executor(self) -> ThreadPoolExecutor:
+        if self._pipeline_executor is None:
+            self._pipeline_executor = ThreadPoolExecutor(
+                max_workers=self.pipeline_workers, thread_name_prefix="ocr-variant"
+            )
+        return self._pipeline_executor
+    
+    @staticmethod
+    def detect_text_blocks(gray: np.ndarray) -> Dict[str, any]:
+        """
+        Fast text detection with morphology, no OCR involved.
+        
+        Character strokes are found with a morphological gradient, smeared into
+        lines and paragraphs with a wide closing kernel, and each resulting
+        contour becomes a block. Returns the blocks in reading order as
+        (x, y, width, height, line_count) plus the share of ink that falls
+        inside a block, which is low when the page also holds drawings.
+        """
+        height, width = gray.shape[:2]
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+        _, ink = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        
+        # Join characters into lines and close small gaps between lines of a paragraph
+        kernel_width = max(9, width // 60)
+        kernel_height = max(3, height // 300)
+        connected = cv2.morphologyEx(
+            ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, kernel_height))
+        )
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        blocks = []
+        min_height = max(8, height // 200)
+        block_mask = np.zeros_like(ink)
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if h < min_height or w < min_height:
+                continue
+            # Text blocks are dense with strokes; thin rules and sparse doodles are not
+            if cv2.countNonZero(ink[y:y + h, x:x + w]) < 0.1 * w * h:
+                continue
+            
+            pad = max(4, h // 10) if h < 4 * min_height else 6
+            x0, y0 = max(0, x - pad), max(0, y - pad)
+            x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+            
+            # Count text lines from the row profile to pick a page segmentation mode
+            rows = ink[y:y + h, x:x + w].any(axis=1).astype(np.int8)
+            line_count = max(1, int(np.count_nonzero(np.diff(rows) == 1)) + int(rows[0]))
+            blocks.append((x0, y0, x1 - x0, y1 - y0, line_count))
+            block_mask[y0:y1, x0:x1] = 255
+        
+        # Reading order: top to bottom, then left to right within a band
+        band = max(1, height // 50)
+        blocks.sort(key=lambda b: (b[1] // band, b[0]))
+        
+        total_ink = cv2.countNonZero(ink)
+        text_ink = cv2.countNonZero(cv2.bitwise_and(ink, block_mask))
+        return {
+            "blocks": blocks,
+            "text_coverage": text_ink / total_ink if total_ink else 0.0,
+            "block_area_ratio": cv2.countNonZero(block_mask) / float(width * height)
+        }
+    
+    @staticmethod
+    def _words_from_data(data: Dict[str, List], offset_x: int = 0, offset_y: int = 0) -> List[Dict]:
+        """Confident words from image_to_data output, with boxes in page coordinates"""
+        words = []
+        for i, text in enumerate(data['text']):
+            confidence = int(data['conf'][i])
+            if confidence > 30 and text.strip():
+                words.append({
+                    "text": text.strip(),
+                    "confidence": confidence,
+                    "bbox": {
+                        "x": data['left'][i] + offset_x,
+                        "y": data['top'][i] + offset_y,
+                        "width": data['width'][i],
+                        "height": data['height'][i]
+                    }
+                })
+        return words
+    
+    def _ocr_block(self, gray: np.ndarray, block: Tuple[int, int, int, int, int]) -> List[Dict]:
+        x, y, w, h, line_count = block
+        # Single lines read best as PSM 7, paragraphs as a uniform block (PSM 6)
+        psm = 7 if line_count == 1 else 6
+        try:
+            data = self.backend.image_to_data(gray[y:y + h, x:x + w], psm=psm)
+            return self._words_from_data(data, x, y)
+        except Exception as e:
+            logger.warning(f"OCR of text block at ({x}, {y}) failed: {str(e)}")
+            return []
+    
+    def _extract_text_from_regions(self, gray: np.ndarray) -> Optional[Dict[str, any]]:
+        """
+        Two-stage OCR: detect text blocks, then OCR only those crops concurrently.
+        
+        Returns None when detection finds nothing useful (no blocks, too many
+        fragments, or blocks covering nearly the whole page) or the crops read
+        poorly, so the caller can fall back to the full-page pipeline.
+        """
+        detection = self.detect_text_blocks(gray)
+        blocks = detection["blocks"]
+        if not blocks or len(blocks) > self.max_text_blocks or detection["block_area_ratio"] > 0.85:
+            logger.info(f"Text region detection not usable ({len(blocks)} blocks), using full-page OCR")
+            return None
+        
+        if self.pipeline_workers > 1 and len(blocks) > 1:
+            block_words = list(self._get_pipeline_executor().map(lambda block: self._ocr_block(gray, block), blocks))
+        else:
+            block_words = [self._ocr_block(gray, block) for block in blocks]
+        
+        regions = [word for words in block_words for word in words]
+        confidence_scores = [word["confidence"] for word in regions]
+        average_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+        if average_confidence <= 40:
+            logger.info(f"Text regions read poorly (avg confidence {average_confidence:.1f}), using full-page OCR")
+            return None
+        
+        logger.info(f"OCR text regions: {len(blocks)} blocks, {len(regions)} words, avg confidence: {average_confidence:.1f}")
+        return {
+            "extracted_text": "\n".join(" ".join(word["text"] for word in words) for words in block_words if words),
+            "confidence_scores": confidence_scores,
+            "preprocessing_used": "text_regions",
+            "success": True,
+            "word_count": len(regions),
+            "average_confidence": average_confidence,
+            "text_regions": regions,
+            "text_coverage": detection["text_coverage"],
+            "pipeline": {
+                "mode": "regions",
+                "backend": self.backend.name,
+                "blocks": len(blocks)
+            }
+        }
+    
+    def _decode_image(self, image_data: bytes) -> np.ndarray:
+        """Decode encoded image bytes to a BGR array without keeping intermediate copies"""
+        image = Image.open(io.BytesIO(image_data))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+    
+    def _preprocessing_variants(self, cv_image: np.ndarray, gray: np.ndarray) -> List[Tuple[str, int, Callable]]:
+        """
+        Preprocessing variants in order of preference as (name, extra bytes, factory).
+        
+        Factories build their image only when the variant runs, so at most the
+        variants currently being OCR'd are alive next to the source and grayscale
+        buffers. "original" and "grayscale" reuse those buffers and cost nothing extra.
+        """
+        return [
+            ("original", 0, lambda: cv_image),
+            ("grayscale", 0, lambda: gray),
+            ("threshold", gray.nbytes, lambda: self._apply_threshold(gray)),
+            ("noise_removal", cv_image.nbytes, lambda: self._remove_noise(cv_image)),
+            ("enhanced", 2 * gray.nbytes, lambda: self._enhance_image(gray))
+        ]
+    
+    def _run_variant(self, method_name: str, make_image: Callable[[], np.ndarray]) -> Optional[Dict]:
+        """Preprocess and OCR a single variant, returning its scored words or None on failure"""
+        try:
+            processed_image = make_image()
+            
+            # Extract text with confidence data
+            data = self.backend.image_to_data(processed_image, psm=6)
+            del processed_image
+            
+            # Filter out low confidence and empty text
+            filtered_text = []
+            confidence_scores = []
+            
+            for i, text in enumerate(data['text']):
+                confidence = int(data['conf'][i])
+                if confidence > 30 and text.strip():  # Only include confident detections
+                    filtered_text.append(text.strip())
+                    confidence_scores.append(confidence)
+            
+            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
+            logger.info(f"OCR method '{method_name}': {len(filtered_text)} words, avg confidence: {avg_confidence:.1f}")
+            
             return {
-                "extracted_text": "",
-                "confidence_scores": [],
-                "preprocessing_used": "none",
-                "success": False,
-                "error": str(e)
+                "extracted_text": " ".join(filtered_text),
+                "confidence_scores": confidence_scores,
+                "preprocessing_used": method_name,
+                "word_count": len(filtered_text),
+                "average_confidence": avg_confidence
             }
+            
+        except Exception as method_error:
+            logger.warning(f"OCR method '{method_name}' failed: {str(method_error)}")
+            return None
+    
+    def _run_sequential(self, preprocessing_methods: List[Tuple[str, int, Callable]]) -> Tuple[Dict, int]:
+        selector = _BestResultSelector(self.target_word_count, self.target_confidence)
+        for completed, (method_name, _, make_image) in enumerate(preprocessing_methods, start=1):
+            if selector.offer(self._run_variant(method_name, make_image)):
+                return selector.best, completed
+        return selector.best, len(preprocessing_methods)
+    
+    def _run_budgeted_variant(self, budget: _MemoryBudget, method_name: str, cost: int, make_image: Callable) -> Optional[Dict]:
+        with budget.reserve(cost):
+            return self._run_variant(method_name, make_image)
+    
+    def _run_parallel(self, preprocessing_methods: List[Tuple[str, int, Callable]]) -> Tuple[Dict, int]:
+        """
+        Run the variants concurrently but fold their results in list order, so the
+        chosen result (and the early-exit point) is exactly what sequential mode picks.
+        
+        Variants only start while their buffers fit in the memory budget.
+        """
+        selector = _BestResultSelector(self.target_word_count, self.target_confidence)
+        budget = _MemoryBudget(self.variant_memory_budget)
+        futures = [
+            self._get_pipeline_executor().submit(self._run_budgeted_variant, budget, method_name, cost, make_image)
+            for method_name, cost, make_image in preprocessing_methods
+        ]
+        
+        completed = 0
+        try:
+            for future in futures:
+                completed += 1
+                if selector.offer(future.result()):
+                    break
+        finally:
+            # Variants that have not started yet are dropped once a target is hit
+            for future in futures[completed:]:
+                future.cancel()
+        
+        return selector.best, completed
     
     def _convert_to_grayscale(self, image: np.ndarray) -> np.ndarray:
         """Convert image to grayscale"""
         return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    def _apply_threshold(self, image: np.ndarray) -> np.ndarray:
-        """Apply binary thresholding"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    def _apply_threshold(self, gray: np.ndarray) -> np.ndarray:
+        """Apply binary thresholding to a grayscale image"""
         # Use Otsu's thresholding
         _, threshold = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         return threshold
     
     def _remove_noise(self, image: np.ndarray) -> np.ndarray:
-        """Remove noise using morphological operations"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Apply noise removal
-        kernel = np.ones((1, 1), np.uint8)
-        image = cv2.dilate(image, kernel, iterations=1)
-        image = cv2.erode(image, kernel, iterations=1)
-        # Apply Gaussian blur
-        image = cv2.GaussianBlur(image, (5, 5), 0)
-        return image
-    
-    def _enhance_image(self, image: np.ndarray) -> np.ndarray:
-        """Enhance image contrast and sharpness"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
+        """Remove noise with a Gaussian blur"""
+        # The former 1x1 dilate/erode pair was an identity operation and only cost two copies
+        return cv2.GaussianBlur(image, (5, 5), 0)
+    
+    def _enhance_image(self, gray: np.ndarray) -> np.ndarray:
+        """Enhance contrast and sharpness of a grayscale image"""
         # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         enhanced = clahe.apply(gray)
         
         # Sharpen the image
         kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-        sharpened = cv2.filter2D(enhanced, -1, kernel)
-        
-        return sharpened
+        return cv2.filter2D(enhanced, -1, kernel)
     
     def validate_image(self, image_base64: str) -> Dict[str, any]:
         """
@@ -183,32 +572,16 @@ class OCRService:
         Get text regions with bounding boxes (useful for UI highlighting)
         """
         try:
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            cv_image = self._decode_image(base64.b64decode(image_base64))
             
-            # Get bounding box data
-            data = pytesseract.image_to_data(
-                cv_image, 
-                output_type=pytesseract.Output.DICT
-            )
+            if self.ocr_strategy == "regions":
+                result = self._extract_text_from_regions(self._convert_to_grayscale(cv_image))
+                if result is not None:
+                    return result["text_regions"]
             
-            regions = []
-            for i, text in enumerate(data['text']):
-                confidence = int(data['conf'][i])
-                if confidence > 30 and text.strip():
-                    regions.append({
-                        "text": text.strip(),
-                        "confidence": confidence,
-                        "bbox": {
-                            "x": data['left'][i],
-                            "y": data['top'][i],
-                            "width": data['width'][i],
-                            "height": data['height'][i]
-                        }
-                    })
-            
-            return regions
+            # Get bounding box data
+            data = self.backend.image_to_data(cv_image)
+            return self._words_from_data(data)
             
         except Exception as e:
             logger.error(f"Error getting text regions: {str(e)}")
@@ -0,0 +1,204 @@
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 4
+_PRIME = (1 << 31) - 1
+
+# Grouping, factorial, absolute value and root signs change the problem ("(3+4)*2" is not "3+4*2"),
+# so they are kept as tokens alongside the operators
+_MATH_SYMBOLS = r"[+\-*/=^<>%()\[\]{}!|\u221a\u222b\u2211\u220f\u03c0\u00b1]"
+_TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|" + _MATH_SYMBOLS)
+_MATH_TOKEN = re.compile(r"\d+(?:\.\d+)?|" + _MATH_SYMBOLS)
+
+# Instruction words that change the wording of a question but not the problem
+FILLER_WORDS = frozenset("""
+    a an and are be by calculate can compute could determine do does evaluate explain find for
+    given help how i in is it me of on please question problem show solve tell
+    that the this to what whats with work you
+""".split())
+
+# Different words for the same thing; every other content word must match exactly,
+# so "maximum" never reuses the answer to "minimum"
+EQUIVALENT_WORDS = {
+    "max": "maximum", "maximise": "maximum", "maximize": "maximum", "largest": "maximum",
+    "greatest": "maximum", "biggest": "maximum", "highest": "maximum",
+    "min": "minimum", "minimise": "minimum", "minimize": "minimum", "smallest": "minimum",
+    "least": "minimum", "lowest": "minimum",
+    "whats": "what", "thats": "that",
+}
+
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.int64)
+_PERM_B = _rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.int64)
+
+
+def question_tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return [token for token in _TOKEN.findall(text) if token not in FILLER_WORDS]
+
+
+def math_signature(tokens: List[str]) -> str:
+    """
+    Numbers, operators and brackets in order. Questions only match when these
+    are identical, so "2x + 5 = 15" never reuses the answer to "2x + 5 = 17".
+    """
+    return " ".join(token for token in tokens if _MATH_TOKEN.fullmatch(token))
+
+
+def content_words(tokens: List[str]) -> FrozenSet[str]:
+    """Words left after filler removal, with equivalent wording and plurals folded together"""
+    words = set()
+    for token in tokens:
+        if _MATH_TOKEN.fullmatch(token):
+            continue
+        token = EQUIVALENT_WORDS.get(token, token)
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        words.add(token)
+    return frozenset(words)
+
+
+def same_problem(text_a: str, text_b: str, min_similarity: float) -> bool:
+    """
+    Whether two texts, such as the OCR of two photos, pose the same problem:
+    identical, non-empty math signatures and a token Jaccard similarity of at
+    least `min_similarity`, which absorbs small OCR differences.
+    """
+    tokens_a, tokens_b = question_tokens(text_a), question_tokens(text_b)
+    signature = math_signature(tokens_a)
+    if not signature or signature != math_signature(tokens_b):
+        return False
+    words_a, words_b = set(tokens_a), set(tokens_b)
+    return len(words_a & words_b) / len(words_a | words_b) >= min_similarity
+
+
+def shingles(tokens: List[str]) -> Set[str]:
+    """Unigrams plus bigrams, so very short questions still get a signature"""
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(features: Set[str]) -> np.ndarray:
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little") % _PRIME for f in features),
+        dtype=np.int64,
+        count=len(features)
+    )
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME).min(axis=0)
+
+
+class QuestionIndex:
+    """
+    In-memory MinHash/LSH index of answered text questions.
+
+    Questions are reduced to tokens without filler words, shingled and
+    MinHashed; banding the signature (16 bands of 4 rows) makes candidate
+    lookup independent of the index size. Candidates must share subject and
+    math signature, and are ranked by estimated Jaccard similarity. A match
+    must also have the same content words (see content_words): rewording
+    may only add or drop filler or swap equivalent words, since a single
+    differing word ("maximum" / "minimum") can change the problem while
+    barely moving the similarity.
+    """
+
+    def __init__(self, threshold: float = 0.75, max_entries: int = 50000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple, np.ndarray, FrozenSet[str]]]" = OrderedDict()
+        self._buckets: Dict[Tuple, Set[str]] = defaultdict(set)
+        self.queries = 0
+        self.matches = 0
+        self.rejected_wording = 0
+
+    @staticmethod
+    def _signature(question: str) -> Optional[Tuple[str, np.ndarray, FrozenSet[str]]]:
+        tokens = question_tokens(question)
+        if not tokens:
+            return None
+        return math_signature(tokens), minhash(shingles(tokens)), content_words(tokens)
+
+    @staticmethod
+    def _band_keys(scope: Tuple, signature: np.ndarray) -> List[Tuple]:
+        return [
+            scope + (band, signature[band * BAND_ROWS:(band + 1) * BAND_ROWS].tobytes())
+            for band in range(NUM_PERMUTATIONS // BAND_ROWS)
+        ]
+
+    def add(self, doubt_id: str, question: str, subject: str):
+        computed = self._signature(question)
+        if computed is None:
+            return
+        guard, signature, words = computed
+        self.remove(doubt_id)
+
+        scope = (subject, guard)
+        self._entries[doubt_id] = (scope, signature, words)
+        for key in self._band_keys(scope, signature):
+            self._buckets[key].add(doubt_id)
+
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, doubt_id: str):
+        entry = self._entries.pop(doubt_id, None)
+        if entry is None:
+            return
+        scope, signature, _ = entry
+        for key in self._band_keys(scope, signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doubt_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def query(self, question: str, subject: str) -> Optional[Tuple[str, float]]:
+        """Most similar indexed question as (doubt_id, similarity), if above the threshold"""
+        self.queries += 1
+        computed = self._signature(question)
+        if computed is None:
+            return None
+        guard, signature, words = computed
+
+        candidates = set()
+        for key in self._band_keys((subject, guard), signature):
+            candidates |= self._buckets.get(key, set())
+
+        best_id, best_similarity = None, self.threshold
+        rejected = False
+        for doubt_id in candidates:
+            _, candidate_signature, candidate_words = self._entries[doubt_id]
+            similarity = float(np.mean(candidate_signature == signature))
+            if similarity < best_similarity:
+                continue
+            if candidate_words != words:
+                rejected = True
+                continue
+            best_id, best_similarity = doubt_id, similarity
+
+        self.rejected_wording += rejected
+
+        if best_id is None:
+            return None
+        self.matches += 1
+        return best_id, best_similarity
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "queries": self.queries,
+            "matches": self.matches,
+            "rejected_wording": self.rejected_wording
+        }
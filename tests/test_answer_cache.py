@@ -0,0 +1,28 @@
+import asyncio
+
+from models.doubt import DoubtAnswer, LLMUsage
+from services.answer_cache import AnswerCache, served_answer
+
+USAGE = LLMUsage(
+    tier="flash", model="gemini-2.0-flash", max_tokens=2048, difficulty="easy",
+    latency_ms=812.0, input_tokens=120, output_tokens=340
+)
+
+
+def test_cache_hits_carry_no_usage():
+    async def scenario():
+        cache = AnswerCache()
+        key = cache.make_key("Mathematics", "What is 2 + 2?", "2")
+        await cache.set(key, DoubtAnswer(solution="4", steps=["2 + 2 = 4"], usage=USAGE), "mathematics", "2")
+
+        hit = await cache.get(key)
+        assert hit.solution == "4" and hit.usage is None
+        assert cache.make_key("mathematics", "  what is 2 + 2? ", "2") == key
+        assert cache.make_key("mathematics", "what is 2 + 2?", "1") != key
+
+    asyncio.run(scenario())
+
+
+def test_reused_answer_drops_the_original_usage():
+    answer = served_answer(DoubtAnswer(solution="4", steps=[], usage=USAGE).dict())
+    assert answer.solution == "4" and answer.usage is None
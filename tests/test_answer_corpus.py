@@ -0,0 +1,26 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.check_answer_corpus import check, corpus_paths
+from services.answer_parser import parse_answer
+
+PATHS = corpus_paths()
+
+
+def test_corpus_is_present():
+    assert PATHS
+
+
+@pytest.mark.parametrize("path", PATHS, ids=lambda path: os.path.basename(path)[:-3])
+def test_corpus_answer_parses_to_its_golden_structure(path):
+    with open(path, encoding="utf-8") as handle:
+        parsed = parse_answer(handle.read())
+    with open(path[:-3] + ".json", encoding="utf-8") as handle:
+        expected = json.load(handle)
+
+    assert parsed.steps == expected["steps"]
+    assert parsed.final_answer == expected["final_answer"]
+    # Whole and streamed (chunks of 1, 7 and 64 characters) parses match the golden file exactly
+    assert check(path, [1, 7, 64]) == []
@@ -0,0 +1,34 @@
+import pytest
+
+from services.image_normalizer import ImageNormalizer
+
+fitz = pytest.importorskip("fitz")
+
+
+def make_pdf(*sizes):
+    document = fitz.open()
+    for width, height in sizes:
+        page = document.new_page(width=width, height=height)
+        page.insert_text((20, 40), "Solve 2x + 3 = 7", fontsize=12)
+    return document.tobytes()
+
+
+def test_huge_page_is_rendered_within_the_pixel_cap(monkeypatch):
+    monkeypatch.setenv("IMAGE_OCR_MAX_PIXELS", "1000000")
+    # 14400 points square: 40000 x 40000 pixels at 200 DPI
+    pages = ImageNormalizer().load_pdf(make_pdf((14400, 14400)), max_pages=1)
+    height, width = pages[0].array.shape[:2]
+    assert width * height <= 1000000
+    assert pages[0].original_size == (width, height)
+
+
+def test_small_page_keeps_the_render_dpi(monkeypatch):
+    monkeypatch.setenv("PDF_RENDER_DPI", "144")
+    monkeypatch.setenv("IMAGE_OCR_MAX_PIXELS", "4000000")
+    pages = ImageNormalizer().load_pdf(make_pdf((360, 720), (720, 360)), max_pages=2)
+    assert [page.array.shape[:2] for page in pages] == [(1440, 720), (720, 1440)]
+
+
+def test_too_many_pages_are_rejected_before_rendering():
+    with pytest.raises(ValueError, match="Maximum allowed: 1"):
+        ImageNormalizer().load_pdf(make_pdf((100, 100), (100, 100)), max_pages=1)
@@ -0,0 +1,46 @@
+import pytest
+
+from services.image_payload import ImagePayloadPolicy
+
+PROSE = "A shopkeeper buys pens at five rupees each and sells them at seven rupees. How many must he sell to earn one hundred rupees profit?"
+
+
+def ocr(text, confidence=95.0):
+    return {"extracted_text": text, "average_confidence": confidence}
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.setenv("IMAGE_TEXT_ONLY_ENABLED", "true")
+    return ImagePayloadPolicy()
+
+
+def test_text_only_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("IMAGE_TEXT_ONLY_ENABLED", raising=False)
+    assert ImagePayloadPolicy().text_only_blocker("", ocr(PROSE), 1.0) == "text-only mode disabled"
+
+
+def test_confident_prose_page_can_go_as_text(policy):
+    assert policy.text_only_blocker("", ocr(PROSE), 1.0) is None
+    assert policy.text_only_blocker("", ocr("A train travels 120 km in 2 hours. Find its average speed."), 1.0) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Solve for the value of x when x2 + 5x + 6 = 0 holds",
+    "Find the value of (a+b)2 when a and b are both three",
+    "Show that the sum of the series is finite where a1 is one",
+])
+def test_flattened_exponents_keep_the_image(policy, text):
+    assert policy.text_only_blocker("", ocr(text), 1.0) == "possible flattened exponent or subscript"
+
+
+def test_equation_heavy_page_keeps_the_image(policy):
+    blocker = policy.text_only_blocker("", ocr("Simplify 3 * 4 + 12 / 6 - 2 = ?"), 1.0)
+    assert blocker.endswith("of the OCR words are formula")
+
+
+def test_other_blockers(policy):
+    assert policy.text_only_blocker("", ocr(PROSE, confidence=60), 1.0) == "OCR confidence 60"
+    assert policy.text_only_blocker("", ocr("Solve it"), 1.0) == "too few OCR words"
+    assert policy.text_only_blocker("", ocr(PROSE), 0.5) == "text blocks hold 50% of the ink"
+    assert policy.text_only_blocker("Use the figure", ocr(PROSE), 1.0) == "refers to a figure"
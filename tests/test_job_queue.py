@@ -0,0 +1,190 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+
+from services.job_queue import DoubtJobQueue, JobWorkerPool
+
+
+class AsyncCollection:
+    """Awaitable facade over a mongomock collection, covering what DoubtJobQueue uses"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert_one(self, document):
+        return self.collection.insert_one(document)
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return self.collection.find_one_and_update(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return self.collection.update_one(*args, **kwargs)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setenv("DOUBT_JOB_MAX_ATTEMPTS", "2")
+    monkeypatch.setenv("DOUBT_JOB_RETRY_DELAY_SECONDS", "0")
+    db = SimpleNamespace(doubt_jobs=AsyncCollection(mongomock.MongoClient().db.doubt_jobs))
+    return DoubtJobQueue(db)
+
+
+def expire_lease(queue, job):
+    queue.collection.collection.update_one(
+        {"id": job["id"]}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+
+def test_claim_leases_the_job_to_one_worker(queue):
+    async def scenario():
+        await queue.enqueue("doubt-1", {"bypass_cache": True})
+        job = await queue.claim("worker-a")
+        assert job["doubt_id"] == "doubt-1"
+        assert job["status"] == "running" and job["worker_id"] == "worker-a" and job["attempts"] == 1
+        assert job["payload"] == {"bypass_cache": True}
+        assert await queue.claim("worker-b") is None
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_reclaimed_and_old_worker_loses_it(queue):
+    async def scenario():
+        await queue.enqueue("doubt-1")
+        first = await queue.claim("worker-a")
+        expire_lease(queue, first)
+
+        second = await queue.claim("worker-b")
+        assert second["id"] == first["id"]
+        assert second["worker_id"] == "worker-b" and second["attempts"] == 2
+        assert not await queue.renew(first)
+        assert await queue.renew(second)
+
+        # The stale worker's completion must not touch the new lease
+        await queue.complete(first)
+        assert (await queue.get_job("doubt-1"))["status"] == "running"
+
+    asyncio.run(scenario())
+
+
+def test_release_gives_the_attempt_back(queue):
+    async def scenario():
+        await queue.enqueue("doubt-1")
+        job = await queue.claim("worker-a")
+        await queue.release(job)
+
+        released = await queue.get_job("doubt-1")
+        assert released["status"] == "queued" and released["attempts"] == 0
+        again = await queue.claim("worker-b")
+        assert again["attempts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_fail_retries_then_gives_up_after_max_attempts(queue):
+    async def scenario():
+        await queue.enqueue("doubt-1")
+        job = await queue.claim("worker-a")
+        assert await queue.fail(job, "boom")
+        assert (await queue.get_job("doubt-1"))["status"] == "queued"
+
+        job = await queue.claim("worker-a")
+        assert job["attempts"] == 2
+        assert not await queue.fail(job, "boom again")
+        failed = await queue.get_job("doubt-1")
+        assert failed["status"] == "failed" and failed["last_error"] == "boom again"
+        assert await queue.claim("worker-a") is None
+
+    asyncio.run(scenario())
+
+
+def test_retry_waits_for_backoff(queue):
+    async def scenario():
+        queue.retry_delay = 60
+        await queue.enqueue("doubt-1")
+        job = await queue.claim("worker-a")
+        assert await queue.fail(job, "boom")
+        assert await queue.claim("worker-a") is None
+
+    asyncio.run(scenario())
+
+
+def test_worker_pool_gives_up_after_max_attempts(queue):
+    async def scenario():
+        attempts = []
+        gave_up = asyncio.Event()
+
+        async def handler(job):
+            attempts.append(job["attempts"])
+            raise RuntimeError("model unavailable")
+
+        async def on_give_up(job, error):
+            assert error == "model unavailable"
+            gave_up.set()
+
+        pool = JobWorkerPool(queue, handler, on_give_up=on_give_up, concurrency=2, poll_interval=0.01)
+        await queue.enqueue("doubt-1")
+        pool.start()
+        try:
+            await asyncio.wait_for(gave_up.wait(), timeout=5)
+        finally:
+            await pool.stop()
+
+        assert attempts == [1, 2]
+        assert pool.failed == 1 and pool.processed == 0
+        assert (await queue.get_job("doubt-1"))["status"] == "failed"
+
+    asyncio.run(scenario())
+
+
+def test_worker_pool_gives_up_on_a_job_whose_lease_keeps_expiring(queue):
+    async def scenario():
+        handled = []
+        gave_up = asyncio.Event()
+
+        async def handler(job):
+            handled.append(job)
+
+        async def on_give_up(job, error):
+            gave_up.set()
+
+        await queue.enqueue("doubt-1")
+        for worker in ("crashed-1", "crashed-2"):
+            expire_lease(queue, await queue.claim(worker))
+
+        pool = JobWorkerPool(queue, handler, on_give_up=on_give_up, concurrency=1, poll_interval=0.01)
+        pool.start()
+        try:
+            await asyncio.wait_for(gave_up.wait(), timeout=5)
+        finally:
+            await pool.stop()
+
+        assert handled == []
+        assert (await queue.get_job("doubt-1"))["last_error"] == "Job lease expired too many times"
+
+    asyncio.run(scenario())
+
+
+def test_worker_pool_releases_the_job_when_stopped(queue):
+    async def scenario():
+        started = asyncio.Event()
+
+        async def handler(job):
+            started.set()
+            await asyncio.sleep(3600)
+
+        pool = JobWorkerPool(queue, handler, concurrency=1, poll_interval=0.01)
+        await queue.enqueue("doubt-1")
+        pool.start()
+        await asyncio.wait_for(started.wait(), timeout=5)
+        await pool.stop()
+
+        released = await queue.get_job("doubt-1")
+        assert released["status"] == "queued" and released["attempts"] == 0
+
+    asyncio.run(scenario())
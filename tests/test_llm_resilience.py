@@ -0,0 +1,211 @@
+import asyncio
+
+import pytest
+
+from services import llm_resilience
+from services.llm_resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged_call
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_then_admits_a_single_trial_call(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open" and breaker.opens == 1
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.refused == 1
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Only the trial goes through while it is in flight
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opens == 2
+
+    clock.now += 9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+
+
+def test_ignored_trial_lets_another_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock.now += 10
+
+    breaker.before_call()
+    breaker.record_ignored()
+    assert breaker.state == "half_open"
+    breaker.before_call()
+
+
+def test_breaker_opens_on_failure_rate_over_the_window(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=10, window=4)
+    for outcome in (False, True, True, False):
+        breaker.record_success() if outcome else breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker()
+    assert tracker.percentile(0.9) is None
+    for seconds in range(1, 11):
+        tracker.record(seconds)
+    assert tracker.percentile(0.9) == 10
+    assert tracker.percentile(0.5, min_samples=20) is None
+
+
+async def settle():
+    """Let cancelled calls finish unwinding and run their done callbacks"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class Calls:
+    """Scripted calls: each `call()` takes the next (delay, result or exception)"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        delay, outcome = self.script[self.started]
+        self.started += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class HedgeSlots:
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.taken = 0
+        self.released = 0
+
+    def __call__(self):
+        if not self.available:
+            return None
+        self.taken += 1
+
+        def release():
+            self.released += 1
+        return release
+
+
+def test_fast_primary_never_starts_a_hedge():
+    async def scenario():
+        calls = Calls((0, "primary"))
+        slots = HedgeSlots()
+        assert await hedged_call(calls, 0.05, slots) == ("primary", False)
+        assert calls.started == 1 and slots.taken == 0
+
+    asyncio.run(scenario())
+
+
+def test_hedge_wins_cancels_the_primary_and_releases_its_slot():
+    async def scenario():
+        calls = Calls((1, "primary"), (0, "hedge"))
+        slots = HedgeSlots()
+        assert await hedged_call(calls, 0.01, slots) == ("hedge", True)
+        await settle()
+        assert calls.cancelled == 1
+        assert slots.taken == 1 and slots.released == 1
+
+    asyncio.run(scenario())
+
+
+def test_primary_wins_cancels_the_hedge_and_releases_its_slot():
+    async def scenario():
+        calls = Calls((0.03, "primary"), (1, "hedge"))
+        slots = HedgeSlots()
+        assert await hedged_call(calls, 0.01, slots) == ("primary", False)
+        await settle()
+        assert calls.cancelled == 1
+        assert slots.released == 1
+
+    asyncio.run(scenario())
+
+
+def test_both_failing_raises_the_first_error():
+    async def scenario():
+        first, second = RuntimeError("primary failed"), RuntimeError("hedge failed")
+        calls = Calls((0.03, first), (0.05, second))
+        slots = HedgeSlots()
+        with pytest.raises(RuntimeError) as raised:
+            await hedged_call(calls, 0.01, slots)
+        assert raised.value is first
+        assert slots.released == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_call_falls_back_to_the_other():
+    async def scenario():
+        calls = Calls((0.02, RuntimeError("primary failed")), (0.03, "hedge"))
+        assert await hedged_call(calls, 0.01, HedgeSlots()) == ("hedge", True)
+
+    asyncio.run(scenario())
+
+
+def test_no_hedge_without_spare_capacity():
+    async def scenario():
+        calls = Calls((0.03, "primary"))
+        assert await hedged_call(calls, 0.01, HedgeSlots(available=False)) == ("primary", False)
+        assert calls.started == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_caller_cancels_both_calls():
+    async def scenario():
+        calls = Calls((1, "primary"), (1, "hedge"))
+        slots = HedgeSlots()
+        task = asyncio.create_task(hedged_call(calls, 0.01, slots))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await settle()
+        assert calls.cancelled == 2 and slots.released == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,315 @@
+import asyncio
+import time
+from collections import Counter
+
+import pytest
+
+from services.fair_queue import FairQueue
+from services.llm_scheduler import LLMScheduler, SchedulerRejected
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 rate limit exceeded")
+        self.retry_after = retry_after
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    def make(**env):
+        defaults = {"LLM_MAX_CONCURRENCY": "2", "LLM_MAX_QUEUE_WAIT_SECONDS": "5", "LLM_DEMO_MAX_CONCURRENCY": "1"}
+        for name, value in dict(defaults, **env).items():
+            monkeypatch.setenv(name, value)
+        return LLMScheduler()
+    return make
+
+
+def drain(queue: FairQueue, count: int, eligible=lambda flow: True):
+    served = []
+    for _ in range(count):
+        popped = queue.pop(eligible)
+        if popped is None:
+            break
+        flow, waiter = popped
+        waiter.set_result(None)
+        served.append(flow)
+    return served
+
+
+def test_flooding_flow_does_not_starve_others():
+    async def scenario():
+        queue = FairQueue()
+        for _ in range(50):
+            queue.push("flood")
+        for _ in range(5):
+            queue.push("quiet")
+
+        # Equal weights: the quiet flow is served alternately, not after the flood
+        assert Counter(drain(queue, 10)) == {"flood": 5, "quiet": 5}
+
+    asyncio.run(scenario())
+
+
+def test_backlogged_flows_share_in_proportion_to_weight():
+    async def scenario():
+        queue = FairQueue(weights={"paid": 3.0, "demo_user": 0.5})
+        for flow in ("paid", "free", "demo_user"):
+            for _ in range(100):
+                queue.push(flow)
+
+        assert Counter(drain(queue, 90)) == {"paid": 60, "free": 20, "demo_user": 10}
+
+    asyncio.run(scenario())
+
+
+def test_ineligible_flows_are_skipped_but_keep_their_place():
+    async def scenario():
+        queue = FairQueue()
+        first = queue.push("demo_user")
+        queue.push("user")
+
+        assert drain(queue, 1, eligible=lambda flow: flow != "demo_user") == ["user"]
+        assert not first.done()
+        assert queue.depth("demo_user") == 1
+        assert drain(queue, 1) == ["demo_user"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiters_leave_the_queue():
+    async def scenario():
+        queue = FairQueue(max_per_flow=2)
+        waiter = queue.push("user")
+        queue.push("user")
+        assert queue.push("user") is None
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert queue.depth("user") == 1
+        assert drain(queue, 5) == ["user"]
+
+    asyncio.run(scenario())
+
+
+def test_demo_traffic_is_capped_and_users_still_get_in(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_CONCURRENCY="3")
+        release = asyncio.Event()
+        peak_demo = 0
+
+        async def call(flow):
+            nonlocal peak_demo
+            async with scheduler.slot(flow=flow):
+                peak_demo = max(peak_demo, scheduler._demo_active)
+                await release.wait()
+
+        demo_calls = [asyncio.create_task(call("demo_user")) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        assert scheduler._active == 1 and scheduler._demo_active == 1
+
+        user_call = asyncio.create_task(call("user-1"))
+        await asyncio.sleep(0.01)
+        assert scheduler._active == 2
+
+        release.set()
+        await asyncio.gather(user_call, *demo_calls)
+        assert peak_demo == 1
+        assert scheduler._active == 0 and scheduler._demo_active == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_as_it_is_granted_gives_the_slot_back(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_CONCURRENCY="1")
+        deadline = time.monotonic() + 5
+        await scheduler._acquire(deadline, "user-a")
+
+        waiting = asyncio.create_task(scheduler._acquire(deadline, "user-b"))
+        await asyncio.sleep(0.01)
+        assert scheduler._queue.depth() == 1
+
+        # Granting and cancelling happen before the waiter gets to run again
+        scheduler._release("user-a")
+        assert scheduler._active == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert scheduler._active == 0
+        assert scheduler._queue.depth() == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_wait_timeout_rejects_and_releases_nothing(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_CONCURRENCY="1", LLM_MAX_QUEUE_WAIT_SECONDS="0.05")
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(flow="user-a"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        with pytest.raises(SchedulerRejected):
+            async with scheduler.slot(flow="user-b"):
+                pass
+
+        assert scheduler.rejected == 1
+        await asyncio.sleep(0)
+        assert scheduler._queue.depth() == 0
+        release.set()
+        await holder
+        assert scheduler._active == 0
+
+    asyncio.run(scenario())
+
+
+def test_active_returns_to_zero_after_failures_and_cancellations(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_CONCURRENCY="3")
+
+        async def call(index):
+            async def work():
+                await asyncio.sleep(0.001 * (index % 5))
+                if index % 3 == 0:
+                    raise ValueError("bad answer")
+                return index
+            return await scheduler.run(work, flow=f"user-{index % 4}")
+
+        tasks = [asyncio.create_task(call(index)) for index in range(40)]
+        await asyncio.sleep(0.002)
+        for task in tasks[::7]:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert scheduler._active == 0 and scheduler._demo_active == 0
+        assert scheduler._queue.depth() == 0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_pauses_and_retries(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_RETRIES="2")
+        attempts = []
+
+        async def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RateLimited(retry_after=0.1)
+            return "answer"
+
+        assert await scheduler.run(flaky, flow="user-a") == "answer"
+        assert scheduler.rate_limited == 1 and scheduler.retries == 1
+        # The retry waited out the provider's Retry-After
+        assert attempts[1] - attempts[0] >= 0.09
+        assert scheduler._active == 0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_gives_up_after_max_retries(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_RETRIES="1")
+
+        async def limited():
+            raise RateLimited(retry_after=0.01)
+
+        with pytest.raises(RateLimited):
+            await scheduler.run(limited, flow="user-a")
+        assert scheduler.rate_limited == 2 and scheduler.retries == 1
+        assert scheduler._active == 0
+
+    asyncio.run(scenario())
+
+
+def test_other_errors_are_not_retried(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler()
+        calls = 0
+
+        async def broken():
+            nonlocal calls
+            calls += 1
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await scheduler.run(broken, flow="user-a")
+        assert calls == 1 and scheduler.retries == 0
+
+    asyncio.run(scenario())
+
+
+def test_extra_slot_only_when_it_delays_nobody(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_CONCURRENCY="2")
+
+        release_extra = scheduler.try_extra_slot("user-a")
+        assert release_extra is not None and scheduler._active == 1
+        release_extra()
+        assert scheduler._active == 0
+
+        hold = asyncio.Event()
+
+        async def call(flow):
+            async with scheduler.slot(flow=flow):
+                await hold.wait()
+
+        calls = [asyncio.create_task(call(f"user-{n}")) for n in range(3)]
+        await asyncio.sleep(0.01)
+        # Full, with a waiter queued
+        assert scheduler.try_extra_slot("user-a") is None
+
+        hold.set()
+        await asyncio.gather(*calls)
+        scheduler.pause(60)
+        assert scheduler.try_extra_slot("user-a") is None
+        assert scheduler._active == 0
+
+    asyncio.run(scenario())
+
+
+def test_extra_slot_release_hands_the_slot_to_a_waiter(make_scheduler):
+    async def scenario():
+        scheduler = make_scheduler(LLM_MAX_CONCURRENCY="1")
+        release_extra = scheduler.try_extra_slot("user-a")
+        assert scheduler.try_extra_slot("user-b") is None
+
+        entered = asyncio.Event()
+
+        async def call():
+            async with scheduler.slot(flow="user-b"):
+                entered.set()
+
+        waiting = asyncio.create_task(call())
+        await asyncio.sleep(0.01)
+        assert not entered.is_set()
+        release_extra()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert entered.is_set() and scheduler._active == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_flows_are_forgotten_under_sustained_load():
+    async def scenario():
+        queue = FairQueue()
+        # One flow stays backlogged throughout, so the queue never empties
+        for _ in range(5):
+            queue.push("busy")
+        for user in range(2000):
+            queue.push(f"user-{user}")
+            drain(queue, 2)
+            await asyncio.sleep(0)
+            while queue.depth("busy") < 5:
+                queue.push("busy")
+
+        assert len(queue._finish_tags) < 200
+        assert "busy" in queue._finish_tags
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+from services.question_index import QuestionIndex, content_words, question_tokens
+
+
+def make_index(*questions):
+    index = QuestionIndex(threshold=0.75)
+    for number, question in enumerate(questions):
+        index.add(f"doubt-{number}", question, "mathematics")
+    return index
+
+
+def test_rewording_with_filler_words_matches():
+    index = make_index("What is the area of a circle with radius 5?")
+    match = index.query("Find the area of circle of radius 5", "mathematics")
+    assert match is not None and match[0] == "doubt-0"
+
+
+def test_different_numbers_never_match():
+    index = make_index("Solve 2x + 5 = 15")
+    assert index.query("Solve 2x + 5 = 17", "mathematics") is None
+
+
+def test_maximum_and_minimum_do_not_match():
+    index = make_index("Find the maximum of f(x) = x^2 - 4x + 1 on the interval 0 to 5")
+    assert index.query("Find the minimum of f(x) = x^2 - 4x + 1 on the interval 0 to 5", "mathematics") is None
+    assert index.rejected_wording == 1
+
+
+def test_antonym_pairs_do_not_match():
+    pairs = [
+        ("Is the function f(x) = x^3 - 3x increasing on the interval 1 to 4",
+         "Is the function f(x) = x^3 - 3x decreasing on the interval 1 to 4"),
+        ("Find the upper bound of the sequence a(n) = 1/n + 2",
+         "Find the lower bound of the sequence a(n) = 1/n + 2"),
+        ("Find the greatest common divisor of 84 and 36",
+         "Find the least common multiple of 84 and 36"),
+        ("Find the inner radius of a ring with area 50 and width 2",
+         "Find the outer radius of a ring with area 50 and width 2"),
+    ]
+    for indexed, asked in pairs:
+        assert make_index(indexed).query(asked, "mathematics") is None, asked
+        assert make_index(asked).query(indexed, "mathematics") is None, indexed
+
+
+def test_equivalent_wording_matches():
+    index = make_index("Find the maximum value of f(x) = 6x - x^2")
+    assert index.query("What is the largest value of f(x) = 6x - x^2?", "mathematics") is not None
+
+
+def test_content_words_fold_equivalents_and_plurals():
+    assert content_words(question_tokens("the smallest roots")) == content_words(question_tokens("minimum root"))
+    assert content_words(question_tokens("maximum")) != content_words(question_tokens("minimum"))
+
+
+def test_other_subject_does_not_match():
+    index = make_index("What is the area of a circle with radius 5?")
+    assert index.query("What is the area of a circle with radius 5?", "physics") is None
+
+
+def test_brackets_and_factorials_change_the_problem():
+    pairs = [
+        ("Evaluate (3+4)*2", "Evaluate 3+4*2"),
+        ("Compute 5!", "compute 5"),
+        ("Find [2.5] + 3", "Find 2.5 + 3"),
+        ("Simplify |3 - 7| + 2", "Simplify 3 - 7 + 2"),
+        ("Evaluate √16 + 9", "Evaluate 16 + 9"),
+    ]
+    for indexed, asked in pairs:
+        assert make_index(indexed).query(asked, "mathematics") is None, asked
+        assert make_index(asked).query(indexed, "mathematics") is None, indexed
+
+
+def test_same_brackets_still_match():
+    index = make_index("Evaluate (3+4)*2")
+    assert index.query("Please evaluate ( 3 + 4 ) * 2", "mathematics") is not None
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_result():
+    async def scenario():
+        group = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def answer():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"solution": "x = 5"}
+
+        waiters = [asyncio.create_task(group.do("key", answer)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert group.get_stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_callers_share_one_error():
+    async def scenario():
+        group = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            raise RuntimeError("provider down")
+
+        waiters = [asyncio.create_task(group.do("key", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(group) == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_one_waiter_does_not_cancel_the_shared_call():
+    async def scenario():
+        group = SingleFlight()
+        release = asyncio.Event()
+        finished = False
+
+        async def answer():
+            nonlocal finished
+            await release.wait()
+            finished = True
+            return 42
+
+        first = asyncio.create_task(group.do("key", answer))
+        second = asyncio.create_task(group.do("key", answer))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        release.set()
+
+        assert await second == 42
+        assert finished
+
+    asyncio.run(scenario())
+
+
+def test_call_keeps_running_when_every_waiter_is_cancelled():
+    async def scenario():
+        group = SingleFlight()
+        release = asyncio.Event()
+        finished = asyncio.Event()
+
+        async def answer():
+            await release.wait()
+            finished.set()
+            return 42
+
+        waiter = asyncio.create_task(group.do("key", answer))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await asyncio.wait_for(finished.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert len(group) == 0
+
+    asyncio.run(scenario())
+
+
+def test_calls_after_completion_start_a_new_flight():
+    async def scenario():
+        group = SingleFlight()
+        calls = 0
+
+        async def answer():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await group.do("key", answer) == 1
+        assert await group.do("key", answer) == 2
+        assert await group.do("other", answer) == 3
+
+    asyncio.run(scenario())